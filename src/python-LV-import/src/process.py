@@ -4,10 +4,15 @@ import io
 import json
 import os
 import codecs
-from utils import map, cache, check, geocode, delim, counters
+from utils import map, cache, check, geocode, schedule, gazetteer, delim, counters
 import logging
 import shutil
+import time
 logging.basicConfig(level=logging.INFO)
+try: # geocoding cache shared with the other datasets, when pyeufacility is installed
+    from pyeufacility.geocache import GeocodeCache
+except ImportError:
+    GeocodeCache = None
 
 # File where merged output from several input files is collected.
 # Follows https://webgate.ec.europa.eu/fpfis/wikis/pages/viewpage.action?spaceKey=GISCO&title=Education+services+in+Europe
@@ -37,22 +42,55 @@ else:
     delimReplacer = delim.DelimReplacer("|", ",")
     delimReplacer.replace(inFileName, csvFileName)
 
-# Importing files into ./ceche/<id-field-value>.json
+# Importing records into ./cache/cache.sqlite (keyed by <id-field-value>)
 limitProcessed = 999999999
 mapper   = map.Mapper(mapFileName)
 cacher   = cache.Cacher()
-geocoder = geocode.Geocoder('azure')
+# Addresses already geocoded (by any dataset) are read from the shared geocoding
+# cache, unless GEOCODER_CACHE is set to "off" (or to the path of another cache)
+geocache = None
+if os.environ.get("GEOCODER_CACHE", "").lower() != "off":
+    if GeocodeCache is not None:
+        geocache = GeocodeCache(os.environ.get("GEOCODER_CACHE") or None)
+    else:
+        logging.info("pyeufacility not installed: no shared geocoding cache")
+# Geocoding transactions are counted in ./quota.json and every run is
+# planned within the monthly quota left (GEOCODER_QUOTA); records geocoded more
+# than GEOCODER_MAXAGE days ago are geocoded again when the quota allows
+ledger = schedule.Ledger(limit = int(os.environ.get("GEOCODER_QUOTA", 25000)))
+scheduler = schedule.Scheduler(ledger, maxAge = int(os.environ.get("GEOCODER_MAXAGE", 365)))
+# Geocoder settings can be overridden by environment variables, e.g. to use the
+# offline engine (GEOCODER_ENGINE=gazetteer), a local server (GEOCODER_URL), more
+# threads or a lower requests-per-second limit
+geocoder = geocode.Geocoder(os.environ.get("GEOCODER_ENGINE", "azure"), url = os.environ.get("GEOCODER_URL"),
+    workers = int(os.environ.get("GEOCODER_WORKERS", 8)),
+    rate = float(os.environ.get("GEOCODER_RATE", 0)) or None, cache = geocache, ledger = ledger)
+if geocoder.gazetteer is not None:
+    # Offline index of the addresses already geocoded: the harmonised data
+    # (GAZETTEER_SOURCES, CSV files separated by os.pathsep) and the cache
+    sources = os.environ.get("GAZETTEER_SOURCES")
+    for fileName in sources.split(os.pathsep) if sources else gazetteer.sources:
+        if os.path.exists(fileName):
+            geocoder.gazetteer.loadCsv(fileName)
+        else:
+            logging.error("Gazetteer source {} not found".format(fileName))
+    for item in cacher.items():
+        if geocoder.exists(item):
+            geocoder.parse(item)
+            geocoder.gazetteer.add(item)
+    logging.info("Gazetteer: {} addresses indexed".format(geocoder.gazetteer.size))
 checker  = check.Checker()
 cnt = counters.Counters()
-cnt.multiReset(("processed", "created", "loaded", "geocodedBefore", "geocodedNow", "geocodedFail"))
+cnt.multiReset(("processed", "created", "loaded", "geocodedBefore", "geocodedOffline", "geocodedNow", "geocodedFail"))
 geocodedFailIds = []
+toGeocode = {} # records to (re)geocode, planned and resolved concurrently after the loop
 logging.info("Processing/merging stage: opening {} for processing".format(csvFileName))
 with io.open(csvFileName, mode="r", encoding="utf-8-sig") as inData:
     rdr = csv.DictReader(inData)
     mapper.check(rdr.fieldnames)
     for row in rdr:
         id = mapper.id(row)
-        if cacher.valid(id): # File data["id"].json exists and can be loaded
+        if cacher.valid(id): # Record data["id"] exists in the cache and can be loaded
             data = cacher.load(id)
             dataNew = mapper.empty() # create fields listed in field-map.json
             if not mapper.map(dataNew, row): # do mapping
@@ -66,34 +104,51 @@ with io.open(csvFileName, mode="r", encoding="utf-8-sig") as inData:
             if not mapper.map(data, row): # do mapping
                 logging.error("Mapping errors: {}".format(data["errors-map"]))
             cnt.created += 1
-        # logging.debug("Saving to {}\n{}".format(id, str(data)))
-        cacher.save(id, data)
 
-        if not geocoder.exists(data): # Previously geocoded data found
-            if geocoder.geocode(data):
-                cnt.geocodedNow += 1
-            else:
-                logging.error("Geocoding failed: for ID {}: {}".format(data["id"], data["errors-geocoding"]))
-                cnt.geocodedFail += 1
-                geocodedFailIds.append(id)
-            cacher.save(id, data)
-        else:
+        if geocoder.exists(data) and not data.get("geo_date"): # geocoded before dates were kept: aged from now
+            data["geo_date"] = time.strftime("%Y-%m-%d")
+        cacher.save(id, data) # serialised now: parsed values below are not cached
+        if geocoder.exists(data): # Previously geocoded data found
             geocoder.parse(data)
             cnt.geocodedBefore += 1
+        if scheduler.priority(data) is not None: # not geocoded yet, poor quality or stale
+            toGeocode[id] = data
 
         if not checker.check(data): # checks
             logging.error("Failed checks: {}" + '; '.join(data["errors-check"]))
 
         cnt.processed += 1
         if cnt.processed % 100 == 0:
-            logging.info("\t{} records processed, {} geocoded".format(cnt.processed, cnt.geocodedNow))
+            logging.info("\t{} records processed, {} to geocode".format(cnt.processed, len(toGeocode)))
         if cnt.processed >= limitProcessed:
             break
+if geocoder.gazetteer is not None: # located offline first: no quota used
+    for id in list(toGeocode):
+        if geocoder.geocodeOffline(toGeocode[id]):
+            cacher.save(id, toGeocode.pop(id))
+            cnt.geocodedOffline += 1
+planned, deferred = scheduler.plan(toGeocode)
+logging.info("Geocoding stage: {} records to geocode with {} threads".format(len(planned), geocoder.workers))
+for id, success in zip(planned, geocoder.geocodeAll([toGeocode[id] for id in planned])):
+    data = toGeocode[id]
+    if success:
+        cnt.geocodedNow += 1
+    elif success is None: # quota exhausted meanwhile (e.g. by retries)
+        deferred.append(id)
+        continue
+    else:
+        logging.error("Geocoding failed: for ID {}: {}".format(data["id"], data["errors-geocoding"]))
+        cnt.geocodedFail += 1
+        geocodedFailIds.append(id)
+    cacher.save(id, data) # written back by batches
 logging.info("Processing/merging stage finished. {} records processed:\n\t" \
-    "cache: {} loaded, {} created\n\tgeocoding: {} reused, {} geocoded, {} failed.".format(
-    cnt.processed, cnt.loaded, cnt.created, cnt.geocodedBefore, cnt.geocodedNow, cnt.geocodedFail))
+    "cache: {} loaded, {} created\n\tgeocoding: {} reused, {} located offline, {} geocoded, {} failed, " \
+    "{} deferred to the next run.".format(cnt.processed, cnt.loaded, cnt.created, cnt.geocodedBefore,
+    cnt.geocodedOffline, cnt.geocodedNow, cnt.geocodedFail, len(deferred)))
 if len(geocodedFailIds) > 0:
     logging.info("Geocoding failed: {}".format(','.join(geocodedFailIds)))
+if geocache is not None:
+    geocache.close() # logs the hit/miss statistics
 logging.info("Output stage: opening {} for writing".format(outFileName))
 cnt.processed = 0
 with io.open(outFileName, mode="w", encoding="utf-8", newline='') as outData:
@@ -108,4 +163,5 @@ with io.open(outFileName, mode="w", encoding="utf-8", newline='') as outData:
         if cnt.processed >= limitProcessed:
             break
 logging.info("Output stage finished. {} records processed.".format(cnt.processed))
+cacher.close()
 logging.info("End.".format(cnt.processed))
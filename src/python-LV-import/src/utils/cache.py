@@ -3,44 +3,118 @@ import os
 import io
 import json
 import glob
+import sqlite3
 
 class Cacher(object):
-    def __init__(self, cacheDir = '.' + os.path.sep + 'cache'):
+    # Records are stored as JSON strings in a single SQLite database
+    # <cacheDir>/cache.sqlite instead of one <id>.json file per record.
+    # Saved records are buffered and upserted by batches inside one transaction;
+    # call flush() (or close(), or use the cacher as a context manager) so that
+    # the last batch is written.
+    def __init__(self, cacheDir = '.' + os.path.sep + 'cache', batchSize = 500):
         self.cacheDir = cacheDir
         if not os.path.exists(self.cacheDir):
             os.makedirs(self.cacheDir)
+        self.dbFile = os.path.join(self.cacheDir, "cache.sqlite")
+        self.batchSize = batchSize
+        self.pending = {}
+        self.last = (None, None)
+        self.db = sqlite3.connect(self.dbFile)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS records (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self.db.commit()
+        self.importFiles()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def importFiles(self):
+        # One-off import of a cache made of <id>.json files by previous versions
+        if self.db.execute("SELECT 1 FROM records LIMIT 1").fetchone() is not None:
+            return
+        paths = glob.glob(os.path.join(self.cacheDir, "*.json"))
+        if len(paths) == 0:
+            return
+        logging.info("Importing {} cache files from {}".format(len(paths), self.cacheDir))
+        for path in paths:
+            id = os.path.splitext(os.path.basename(path))[0]
+            try:
+                with io.open(path, mode="r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if not isinstance(data, dict) or "id" not in data: # not a record, e.g. a quota ledger
+                    logging.info("File {} is not a record, not imported".format(path))
+                    continue
+                self.save(id, data)
+            except Exception as e:
+                logging.error("File {} cannot be loaded, error\n{}".format(path, str(e)))
+        self.flush()
 
     def file(self, id):
-        return os.path.join(self.cacheDir, id + ".json")
+        return "{}#{}".format(self.dbFile, id)
 
     def remove(self, id):
-        if self.exists(id):
-            os.remove(self.file(id))
+        self.pending.pop(id, None)
+        if self.last[0] == id:
+            self.last = (None, None)
+        with self.db:
+            self.db.execute("DELETE FROM records WHERE id = ?", (id,))
 
     def save(self, id, data):
-        with io.open(self.file(id), mode="w", encoding="utf-8", newline='') as f:
-            json.dump(data, f, ensure_ascii=False)
+        # Serialised now: later changes to data are not saved unless saved again
+        self.pending[id] = json.dumps(data, ensure_ascii=False)
+        if self.last[0] == id:
+            self.last = (None, None)
+        if len(self.pending) >= self.batchSize:
+            self.flush()
+
+    def flush(self):
+        if len(self.pending) == 0:
+            return
+        with self.db: # one transaction per batch
+            self.db.executemany("INSERT INTO records (id, data) VALUES (?, ?) " \
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data", self.pending.items())
+        self.pending = {}
+
+    def close(self):
+        self.flush()
+        self.db.close()
+
+    def read(self, id):
+        if id in self.pending:
+            return self.pending[id]
+        row = self.db.execute("SELECT data FROM records WHERE id = ?", (id,)).fetchone()
+        return row[0] if row is not None else None
 
     def exists(self, id):
-        return os.path.exists(self.file(id))
+        return id in self.pending or \
+            self.db.execute("SELECT 1 FROM records WHERE id = ?", (id,)).fetchone() is not None
 
     def valid(self, id):
-        if not self.exists(id):
+        # The record parsed is kept, so that load(id) right after does not read it again
+        raw = self.read(id)
+        if raw is None:
             return False
         try:
-            self.load(id)
+            self.last = (id, json.loads(raw))
         except Exception as e:
-            logging.error("File {} cannot be loaded, error\n{}".format(self.file(id), str(e)))
+            logging.error("Record {} cannot be loaded, error\n{}".format(self.file(id), str(e)))
             return False
         return True
 
     def load(self, id):
-        # New
-        if self.exists(id):
-            with io.open(self.file(id), mode="r", encoding="utf-8") as f:
-                return json.load(f)
+        if self.last[0] == id:
+            data, self.last = self.last[1], (None, None)
+            return data
+        raw = self.read(id)
+        if raw is not None:
+            return json.loads(raw)
 
     def items(self):
-        for path in glob.glob(os.path.join(self.cacheDir, "*.json")):
-            with io.open(path, mode="r", encoding="utf-8") as f:
-                yield json.load(f)
+        # Streamed in the order of the ids
+        self.flush()
+        for (raw,) in self.db.execute("SELECT data FROM records ORDER BY id"):
+            yield json.loads(raw)
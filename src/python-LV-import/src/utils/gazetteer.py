@@ -0,0 +1,143 @@
+import logging
+import os
+import io
+import re
+import csv
+import threading
+import unicodedata
+
+# Default sources: the harmonised healthcare facilities of all countries
+sources = [os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "..",
+    "data", "healthcare", "csv", "all.csv")]
+
+# Terminal key of the street tries (not a character of a normalised name)
+END = "$"
+
+def normalise(text):
+    # Lowercase, no accents, no punctuation, single blanks
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[\W_]+", " ", text.lower()).strip()
+
+def normalisePostcode(postcode, cc):
+    # "LV-1050", "lv 1050" and "1050" are the same postcode in LV
+    code = re.sub(r"[\W_]+", "", str(postcode or "")).upper()
+    if cc and code.startswith(cc.upper()) and len(code) > len(cc):
+        code = code[len(cc):]
+    return code
+
+class Gazetteer(object):
+    # Offline geocoder built from records already geocoded (street, house_number,
+    # postcode, city -> lat, lon), e.g. the harmonised data and the LV cache:
+    # - exact addresses: hash of (cc, city, street, house_number),
+    # - streets: one character trie of the street names per (cc, city), whose
+    #   ends hold the centroid of the addresses of the street,
+    # - postcodes: centroid of the addresses of (cc, postcode).
+    # Results are shaped as the Azure results (type "Point Address", "Street" or
+    # "Geography"), so that Geocoder.parse gives the matching geo_qual.
+    def __init__(self):
+        self.addresses = {}
+        self.streets = {}
+        self.postcodes = {}
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def centroid(self, sums):
+        return {"lat": sums[0] / sums[2], "lon": sums[1] / sums[2]}
+
+    def accumulate(self, table, key, lat, lon):
+        sums = table.get(key)
+        if sums is None:
+            table[key] = [lat, lon, 1]
+        else:
+            sums[0] += lat
+            sums[1] += lon
+            sums[2] += 1
+
+    def add(self, data):
+        # Records geocoded at the level of the city or region (geo_qual 3) are
+        # too coarse for any of the indexes
+        try:
+            lat, lon = float(data["lat"]), float(data["lon"])
+            qual = int(float(data.get("geo_qual") or -1))
+        except (KeyError, TypeError, ValueError):
+            return False
+        if lat != lat or lon != lon or qual == 3:
+            return False
+        cc = (data.get("cc") or "").upper()
+        city = normalise(data.get("city"))
+        street = normalise(data.get("street"))
+        number = normalise(data.get("house_number"))
+        postcode = normalisePostcode(data.get("postcode"), cc)
+        with self.lock:
+            if postcode:
+                self.accumulate(self.postcodes, (cc, postcode), lat, lon)
+            if city and street:
+                node = self.streets.setdefault((cc, city), {})
+                for c in street:
+                    node = node.setdefault(c, {})
+                self.accumulate(node, END, lat, lon)
+                if number and qual != 2: # a street-level location is not the address
+                    self.accumulate(self.addresses, (cc, city, street, number), lat, lon)
+            self.size += 1
+        return True
+
+    def loadCsv(self, fileName, delimiter = ","):
+        count = 0
+        with io.open(fileName, mode="r", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f, delimiter = delimiter):
+                count += self.add(row)
+        logging.info("Gazetteer: {} addresses loaded from {}".format(count, fileName))
+        return count
+
+    def street(self, cc, city, street):
+        # Street of the trie matching the name, or the only street starting with
+        # it (e.g. "brivibas" for "brivibas iela"); returns (name, sums)
+        node = self.streets.get((cc, city))
+        if node is None:
+            return None, None
+        for c in street:
+            node = node.get(c)
+            if node is None:
+                return None, None
+        name = street
+        while END not in node:
+            if len(node) != 1:
+                return None, None # ambiguous prefix
+            c, node = next(iter(node.items()))
+            name += c
+        return name, node[END]
+
+    def result(self, type, sums, street = None, number = None, postcode = None, city = None):
+        address = {}
+        if street: address["streetName"] = street
+        if number: address["streetNumber"] = number
+        if postcode: address["postalCode"] = postcode
+        if city: address["municipality"] = city
+        return {"type": type, "id": "gazetteer", "score": sums[2], # number of addresses located
+            "address": address, "position": self.centroid(sums)}
+
+    def geocode(self, data):
+        # Best local result for the address fields of the record, or None
+        cc = (data.get("cc") or "").upper()
+        city = normalise(data.get("city"))
+        street = normalise(data.get("street"))
+        number = normalise(data.get("house_number"))
+        postcode = normalisePostcode(data.get("postcode"), cc)
+        with self.lock:
+            return self.lookup(data, cc, city, street, number, postcode)
+
+    def lookup(self, data, cc, city, street, number, postcode):
+        if city and street:
+            name, sums = self.street(cc, city, street)
+            if sums is not None:
+                exact = self.addresses.get((cc, city, name, number)) if number else None
+                if exact is not None:
+                    return self.result("Point Address", exact, data.get("street"), data.get("house_number"),
+                        data.get("postcode"), data.get("city"))
+                return self.result("Street", sums, data.get("street"), None, data.get("postcode"), data.get("city"))
+        if postcode:
+            sums = self.postcodes.get((cc, postcode))
+            if sums is not None:
+                return self.result("Geography", sums, postcode = data.get("postcode"), city = data.get("city"))
+        return None
@@ -3,10 +3,14 @@ import logging
 import os
 import io
 import json
+import time
+import threading
 # import urllib.request
-# import urllib.parse
+import urllib.parse
 # import urllib.request
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from utils.gazetteer import Gazetteer
 
 engines = {
     # Azure engine needs subscription key.
@@ -15,6 +19,11 @@ engines = {
     # At the moment of writing, 25,000 free transactions/month, then €0.422 per 1,000 transactions.
     "azure": {
         "url": "https://atlas.microsoft.com/search/address/json?subscription-key=<subscription-key>&api-version=1.0&countrySet=LV&limit=1&query=#{query}"
+    },
+    # Offline engine: addresses are located from the records already geocoded
+    # (see utils/gazetteer.py), and only the misses are sent to the fallback engine.
+    "gazetteer": {
+        "fallback": "azure"
     }
 }
 geoQual = {
@@ -25,12 +34,100 @@ geoQual = {
     "Geography": 3
 }
 
+# HTTP statuses worth retrying: throttled or temporarily unavailable
+retryStatus = (429, 500, 502, 503, 504)
+
+class QuotaExceeded(Exception):
+    # Raised by the quota ledger (utils.schedule) instead of sending a request
+    pass
+
+class RateLimiter(object):
+    # Spaces the requests of all threads so that at most rate requests
+    # per second are sent (no limit when rate is None or 0)
+    def __init__(self, rate = None):
+        self.interval = 1.0 / rate if rate else 0
+        self.next = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if self.interval == 0:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next, now)
+            self.next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
 class Geocoder(object):
-    def __init__(self, engine):
+    # url: overrides the engine URL template, e.g. to point to a local server
+    # workers: number of threads of geocodeAll; rate: requests per second
+    # retries, backoff: attempts on throttling/server errors, waiting
+    # backoff * 2^attempt seconds in between (or as the server tells)
+    # cache: shared geocoding cache (pyeufacility.geocache.GeocodeCache) looked up
+    # by address before any request, so that an address is geocoded only once
+    # ledger: quota ledger (utils.schedule.Ledger) charged once per address, as
+    # planned by utils.schedule.Scheduler: retries are not charged again
+    # gazetteer: index of the offline engine (an empty one by default)
+    def __init__(self, engine, url = None, workers = 8, rate = None, retries = 5, backoff = 0.5, timeout = 10,
+                 cache = None, ledger = None, gazetteer = None):
         # engine: one from engines
         if not engine in engines:
-            raise "Unknown engine {}".format(engine)
-        self.engine = engines[engine]
+            raise Exception("Unknown engine {}".format(engine))
+        self.gazetteer = None
+        if "fallback" in engines[engine]:
+            self.gazetteer = gazetteer or Gazetteer()
+            engine = engines[engine]["fallback"]
+        self.name = engine
+        self.engine = dict(engines[engine])
+        if url:
+            self.engine["url"] = url
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.cache = cache
+        self.ledger = ledger
+        self.http = None
+        self.lock = threading.Lock()
+
+    def session(self):
+        # One session shared by all threads: its pool keeps up to workers
+        # connections alive
+        with self.lock:
+            if self.http is None:
+                self.http = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+                self.http.mount("http://", adapter)
+                self.http.mount("https://", adapter)
+        return self.http
+
+    def request(self, query):
+        # The query is percent-encoded as a whole (UTF-8): characters such as "&",
+        # "#" or "+" of an address no longer cut or alter the query string. The
+        # cache is still keyed by the address as given, not by the encoded query
+        url = self.engine["url"].replace("#{query}", urllib.parse.quote(query))
+        if self.ledger is not None:
+            self.ledger.charge() # raises QuotaExceeded rather than exceeding the quota
+        for attempt in range(self.retries + 1):
+            self.limiter.wait()
+            try:
+                response = self.session().get(url, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt
+            else:
+                if response.status_code not in retryStatus or attempt == self.retries:
+                    response.raise_for_status()
+                    return response.json()
+                delay = self.backoff * 2 ** attempt
+                retryAfter = response.headers.get("Retry-After")
+                if retryAfter and retryAfter.isdigit():
+                    delay = max(delay, int(retryAfter))
+            logging.warning("Geocoder request failed (attempt {}), retrying in {}s".format(attempt + 1, delay))
+            time.sleep(delay)
 
     def exists(self, data):
         return "georesult" in data and data["georesult"]
@@ -61,22 +158,68 @@ class Geocoder(object):
             data["geo_qual"] = geoQual[georesult["type"]]
 
 
+    def geocodeOffline(self, data):
+        # Locates the record from the gazetteer, unless its result is not better
+        # than the current one; returns True when located
+        if self.gazetteer is None:
+            return False
+        query = {"address": data.get("address"), "cc": data.get("cc")}
+        try:
+            self.parseAddress(query) # the address as given, not as geocoded before
+        except Exception:
+            pass
+        if not (query.get("street") or query.get("postcode")):
+            query.update({field: data.get(field) for field in ("street", "house_number", "postcode", "city")})
+        georesult = self.gazetteer.geocode(query)
+        if georesult is None:
+            return False
+        if self.exists(data) and geoQual[georesult["type"]] >= geoQual.get(data["georesult"]["type"], 9):
+            return False
+        data["georesult"] = georesult
+        data["geo_date"] = time.strftime("%Y-%m-%d")
+        self.parse(data)
+        data["errors-geocoding"] = ""
+        return True
+
     def geocode(self, data):
+        # Returns True when geocoded, False when failed and None when deferred
+        # (quota exhausted); records already geocoded are geocoded again
+        # (e.g. poor quality), not read from the cache. The records are located
+        # offline (geocodeOffline) beforehand, so that no quota is planned for them
         errors = []
         try:
-            url = self.engine["url"].replace("#{query}", data["address"])
-            gcResponse = requests.get(url).json()
-            if len(gcResponse["results"]) == 0:
-                raise Exception("Geocoder found no matches")
-            bestResult = gcResponse["results"][0]
+            bestResult = None
+            if self.cache is not None and not self.exists(data):
+                bestResult = self.cache.get(data["address"], self.name, data.get("cc"))
+            if bestResult is None:
+                gcResponse = self.request(data["address"])
+                if len(gcResponse["results"]) == 0:
+                    raise Exception("Geocoder found no matches")
+                bestResult = gcResponse["results"][0]
+                if self.cache is not None:
+                    self.cache.put(data["address"], self.name, data.get("cc"), bestResult)
             data["georesult"] = bestResult
+            data["geo_date"] = time.strftime("%Y-%m-%d")
             self.parse(data)
+            if self.gazetteer is not None: # located offline next time
+                self.gazetteer.add(data)
+        except QuotaExceeded as e:
+            data["errors-geocoding"] = str(e)
+            return None
         except Exception as e:
             logging.error(e)
             errors.append(str(e))
         data["errors-geocoding"]  = "; ".join(errors)
         return len(errors) == 0
 
+    def geocodeAll(self, records):
+        # Geocodes all records concurrently (in place); returns the list of
+        # their statuses (see geocode), in the same order
+        if len(records) == 0:
+            return []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(self.geocode, records))
+
 
     # Custom address parser fine-tuned to addresses coming from
     # https://viis.lv/Pages/Institutions/Search.aspx
@@ -0,0 +1,97 @@
+import logging
+import os
+import io
+import json
+import time
+import threading
+from utils.geocode import geoQual, QuotaExceeded
+
+# Quality of the results worth geocoding again: the worst type of geoQual
+# (e.g. "Geography") and the unknown types (-1)
+poorQual = (max(geoQual.values()), -1)
+
+class Ledger(object):
+    # Persistent count of the geocoder transactions per calendar month, stored
+    # in <fileName> as {"2026-10": 1234, ...}, so that all runs of a month share
+    # the same budget of limit transactions (25,000 free Azure transactions/month).
+    # The ledger is kept out of the cache folder, whose *.json files are records
+    default = os.path.join('.', 'quota.json')
+    legacy = os.path.join('.', 'cache', 'quota.json')
+
+    def __init__(self, fileName = default, limit = 25000):
+        self.fileName = fileName
+        self.limit = limit
+        self.lock = threading.Lock()
+        self.counts = {}
+        if fileName == self.default and not os.path.exists(fileName) and os.path.exists(self.legacy):
+            os.replace(self.legacy, self.fileName) # ledger of previous versions
+        if os.path.exists(self.fileName):
+            with io.open(self.fileName, mode="r", encoding="utf-8") as f:
+                self.counts = json.load(f)
+
+    def period(self):
+        return time.strftime("%Y-%m")
+
+    def used(self):
+        return self.counts.get(self.period(), 0)
+
+    def remaining(self):
+        return max(0, self.limit - self.used())
+
+    def charge(self, count = 1):
+        # Called before the request of an address: refused (QuotaExceeded) rather than
+        # exceeding the quota, and written at once so that a crash loses nothing
+        with self.lock:
+            period = self.period()
+            if self.counts.get(period, 0) + count > self.limit:
+                raise QuotaExceeded("Geocoding quota of {} transactions for {} exhausted".format(self.limit, period))
+            self.counts[period] = self.counts.get(period, 0) + count
+            self.save()
+
+    def save(self):
+        folder = os.path.dirname(self.fileName)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        tmpName = self.fileName + ".tmp"
+        with io.open(tmpName, mode="w", encoding="utf-8") as f:
+            json.dump(self.counts, f, indent = 2, sort_keys = True)
+        os.replace(tmpName, self.fileName) # never left half-written
+
+class Scheduler(object):
+    # Plans the geocoding of a run within the remaining quota of the ledger:
+    # records never geocoded first, then those geocoded with a poor quality,
+    # then those geocoded more than maxAge days ago; the others are deferred
+    # to the next run. A record costs one transaction, the geocoder charging
+    # an address once whatever its retries
+    NEW, POOR, STALE = 0, 1, 2
+
+    def __init__(self, ledger, maxAge = 365):
+        self.ledger = ledger
+        self.maxAge = maxAge
+
+    def priority(self, data):
+        # None when the record needs no geocoding
+        georesult = data.get("georesult")
+        if not georesult:
+            return self.NEW
+        if geoQual.get(georesult.get("type"), -1) in poorQual:
+            return self.POOR
+        date = data.get("geo_date")
+        if self.maxAge and date and \
+            time.time() - time.mktime(time.strptime(date, "%Y-%m-%d")) > self.maxAge * 86400:
+            return self.STALE
+        return None
+
+    def plan(self, records):
+        # records: {id: data}; returns the ids to geocode now and the ids
+        # deferred, by priority then in the order of the records
+        candidates = [(self.priority(data), n, id) for n, (id, data) in enumerate(records.items())]
+        candidates = sorted(c for c in candidates if c[0] is not None)
+        budget = self.ledger.remaining()
+        planned = [id for (_, _, id) in candidates[:budget]]
+        deferred = [id for (_, _, id) in candidates[budget:]]
+        counts = [sum(1 for c in candidates if c[0] == p) for p in (self.NEW, self.POOR, self.STALE)]
+        logging.info("Geocoding plan: {} new, {} poor quality, {} stale records; {} of {} transactions " \
+            "left this month: {} planned, {} deferred".format(*counts, budget, self.ledger.limit,
+            len(planned), len(deferred)))
+        return planned, deferred
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scripts are run from src (e.g. "python process.py"): utils is imported from there
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
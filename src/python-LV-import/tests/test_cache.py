@@ -0,0 +1,78 @@
+import io
+import json
+import os
+import sqlite3
+
+import pytest
+
+import utils.cache
+from utils.cache import Cacher
+
+@pytest.fixture
+def cacheDir(tmp_path):
+    return str(tmp_path / "cache")
+
+def test_roundtrip_single_parse(cacheDir, monkeypatch):
+    with Cacher(cacheDir) as cacher:
+        cacher.save("A1", {"id": "A1", "name": "Skola"})
+        cacher.flush()
+        parsed = []
+        loads = json.loads
+        monkeypatch.setattr(utils.cache.json, "loads", lambda raw: parsed.append(raw) or loads(raw))
+        assert cacher.valid("A1")
+        assert cacher.load("A1") == {"id": "A1", "name": "Skola"}
+        assert len(parsed) == 1 # valid() parses, load() right after reuses it
+        assert not cacher.valid("B2")
+        assert cacher.load("B2") is None
+
+def test_saved_after_valid(cacheDir):
+    # A record saved again between valid() and load() is not read stale
+    with Cacher(cacheDir) as cacher:
+        cacher.save("A1", {"id": "A1", "v": 1})
+        assert cacher.valid("A1")
+        cacher.save("A1", {"id": "A1", "v": 2})
+        assert cacher.load("A1") == {"id": "A1", "v": 2}
+
+def test_batch_flushed_on_close(cacheDir):
+    cacher = Cacher(cacheDir, batchSize = 3)
+    for n in range(5):
+        cacher.save("A{}".format(n), {"id": "A{}".format(n)})
+    db = sqlite3.connect(os.path.join(cacheDir, "cache.sqlite"))
+    assert db.execute("SELECT COUNT(*) FROM records").fetchone()[0] == 3 # one batch written
+    cacher.close()
+    assert db.execute("SELECT COUNT(*) FROM records").fetchone()[0] == 5
+    db.close()
+    with Cacher(cacheDir) as cacher:
+        assert cacher.exists("A4") and cacher.load("A4") == {"id": "A4"}
+
+def test_upsert(cacheDir):
+    with Cacher(cacheDir, batchSize = 1) as cacher:
+        cacher.save("A1", {"id": "A1", "v": 1})
+        cacher.save("A1", {"id": "A1", "v": 2})
+        assert [item["v"] for item in cacher.items()] == [2]
+        cacher.remove("A1")
+        assert not cacher.exists("A1")
+
+def test_items_ordered(cacheDir):
+    with Cacher(cacheDir, batchSize = 2) as cacher:
+        for id in ["C3", "A1", "B2", "D4", "AA"]:
+            cacher.save(id, {"id": id})
+        assert [item["id"] for item in cacher.items()] == ["A1", "AA", "B2", "C3", "D4"]
+
+def test_import_legacy_files(cacheDir):
+    os.makedirs(cacheDir)
+    for id in ["A1", "B2"]:
+        with io.open(os.path.join(cacheDir, id + ".json"), mode="w", encoding="utf-8") as f:
+            json.dump({"id": id}, f)
+    with io.open(os.path.join(cacheDir, "quota.json"), mode="w", encoding="utf-8") as f:
+        json.dump({"2026-10": 12}, f) # a quota ledger, not a record
+    with io.open(os.path.join(cacheDir, "broken.json"), mode="w", encoding="utf-8") as f:
+        f.write("{")
+    with Cacher(cacheDir) as cacher:
+        assert [item["id"] for item in cacher.items()] == ["A1", "B2"]
+    # imported once only: not again when the database has records
+    os.remove(os.path.join(cacheDir, "A1.json"))
+    with io.open(os.path.join(cacheDir, "C3.json"), mode="w", encoding="utf-8") as f:
+        json.dump({"id": "C3"}, f)
+    with Cacher(cacheDir) as cacher:
+        assert [item["id"] for item in cacher.items()] == ["A1", "B2"]
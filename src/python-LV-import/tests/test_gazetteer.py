@@ -0,0 +1,99 @@
+import pytest
+
+from utils.gazetteer import Gazetteer, normalise, normalisePostcode
+from utils.geocode import Geocoder
+
+def row(street = "Brīvības iela", number = "19", postcode = "LV-1010", city = "Rīga", lat = 56.95, lon = 24.11,
+        qual = 1, cc = "LV"):
+    # Shaped as a row of the harmonised data
+    return {"street": street, "house_number": number, "postcode": postcode, "city": city,
+        "lat": str(lat), "lon": str(lon), "geo_qual": str(qual), "cc": cc}
+
+def query(street = None, number = None, postcode = None, city = "RĪGA", cc = "LV"):
+    return {"street": street, "house_number": number, "postcode": postcode, "city": city, "cc": cc}
+
+@pytest.fixture
+def gazetteer():
+    gazetteer = Gazetteer()
+    gazetteer.add(row())
+    gazetteer.add(row(number = "21", lat = 56.97, lon = 24.13))
+    gazetteer.add(row("Gaujas iela", "3", "LV 1050", lat = 56.90, lon = 24.00))
+    gazetteer.add(row("Gaujas iela", "5", "1050", lat = 56.92, lon = 24.02))
+    return gazetteer
+
+def test_normalise():
+    assert normalise("  BRĪVĪBAS  iela, 19-a ") == "brivibas iela 19 a"
+    assert normalise(None) == ""
+    assert [normalisePostcode(p, "LV") for p in ("LV-1050", "lv 1050", "1050")] == ["1050"] * 3
+    assert normalisePostcode("LV", "LV") == "LV"
+
+def test_exact(gazetteer):
+    result = gazetteer.geocode(query("BRĪVĪBAS IELA", "19"))
+    assert result["type"] == "Point Address" and result["score"] == 1
+    assert result["position"] == {"lat": 56.95, "lon": 24.11}
+    # the address as queried
+    assert result["address"] == {"streetName": "BRĪVĪBAS IELA", "streetNumber": "19", "municipality": "RĪGA"}
+
+def test_street_prefix(gazetteer):
+    # the only street of the city starting with the name
+    result = gazetteer.geocode(query("Brivibas", "7"))
+    assert result["type"] == "Street" and result["score"] == 2
+    assert result["position"] == pytest.approx({"lat": 56.96, "lon": 24.12})
+    assert gazetteer.geocode(query("brivibas", "21"))["type"] == "Point Address"
+    assert gazetteer.street("LV", "riga", "brivibas") == ("brivibas iela", [56.95 + 56.97, 24.11 + 24.13, 2])
+
+def test_street_ambiguous(gazetteer):
+    gazetteer.add(row("Brīvības gatve", "200", "LV-1039", lat = 56.98, lon = 24.20))
+    assert gazetteer.street("LV", "riga", "brivibas") == (None, None)
+    assert gazetteer.geocode(query("Brīvības")) is None
+    assert gazetteer.geocode(query("Brīvības iela"))["type"] == "Street"
+    # another city, another trie
+    assert gazetteer.geocode(query("Brīvības iela", city = "Jūrmala")) is None
+
+@pytest.mark.parametrize("postcode", ["LV-1050", "lv 1050", "1050"])
+def test_postcode(gazetteer, postcode):
+    result = gazetteer.geocode(query(postcode = postcode, city = None))
+    assert result["type"] == "Geography" and result["score"] == 2
+    assert result["position"] == pytest.approx({"lat": 56.91, "lon": 24.01})
+    assert result["address"] == {"postalCode": postcode}
+    # postcodes of another country do not match
+    assert gazetteer.geocode(query(postcode = postcode, city = None, cc = "EE")) is None
+
+def test_postcode_fallback(gazetteer):
+    # unknown street: located at the postcode centroid
+    assert gazetteer.geocode(query("Dzirnavu iela", "1", "LV-1050"))["type"] == "Geography"
+    assert gazetteer.geocode(query("Dzirnavu iela", "1", "LV-9999")) is None
+
+def test_coarse_rejected():
+    gazetteer = Gazetteer()
+    assert gazetteer.add(row(qual = 3)) is False
+    assert gazetteer.add(row(lat = "")) is False
+    assert gazetteer.add({"street": "Brīvības iela", "city": "Rīga"}) is False
+    assert gazetteer.size == 0 and gazetteer.postcodes == {} and gazetteer.streets == {}
+    assert gazetteer.geocode(query("Brīvības iela", "19", "LV-1010")) is None
+
+def test_street_level_not_address():
+    # a record located at the street is not the location of its address
+    gazetteer = Gazetteer()
+    assert gazetteer.add(row(qual = 2)) is True
+    assert gazetteer.addresses == {}
+    assert gazetteer.geocode(query("Brīvības iela", "19"))["type"] == "Street"
+
+def test_load_csv(tmp_path):
+    fileName = tmp_path / "all.csv"
+    fileName.write_text("street;house_number;postcode;city;lat;lon;geo_qual;cc\n"
+        "Brīvības iela;19;LV-1010;Rīga;56.95;24.11;1;LV\n"
+        "Brīvības iela;;LV-1010;Rīga;56.96;24.12;3;LV\n", encoding = "utf-8")
+    gazetteer = Gazetteer()
+    assert gazetteer.loadCsv(str(fileName), delimiter = ";") == 1
+    assert gazetteer.geocode(query("Brīvības iela", "19"))["position"] == {"lat": 56.95, "lon": 24.11}
+
+@pytest.mark.parametrize("street, number, postcode, qual", [
+    ("Brīvības iela", "19", None, 1), ("Brīvības", "7", None, 2), (None, None, "LV-1050", 3)])
+def test_geo_qual(gazetteer, street, number, postcode, qual):
+    # the results are parsed as the Azure results
+    geocoder = Geocoder("gazetteer", gazetteer = gazetteer)
+    data = {"id": "1", "address": "", "cc": "LV", "street": street, "house_number": number,
+        "postcode": postcode, "city": "Rīga"}
+    assert geocoder.geocodeOffline(data) is True
+    assert data["geo_qual"] == qual and data["geo_type"] == ("Point Address", "Street", "Geography")[qual - 1]
@@ -0,0 +1,159 @@
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import utils.geocode
+from utils.geocode import Geocoder
+from utils.schedule import Ledger
+
+def azureResult(type = "Point Address", lat = 56.95, lon = 24.11):
+    # Shaped as a result of the Azure Maps search address response
+    return {"type": type, "id": "LV/PAD/p0/123", "score": 9.8,
+        "address": {"streetName": "Brīvības iela", "streetNumber": "19", "postalCode": "LV-1010",
+                    "municipality": "Rīga", "countryCode": "LV"},
+        "position": {"lat": lat, "lon": lon}}
+
+class Stub(object):
+    # Local server mimicking Azure Maps: replies with the queued (status, headers,
+    # body) responses, then with the default one; records the queries received
+    def __init__(self):
+        self.responses = []
+        self.default = (200, {}, {"summary": {"numResults": 1}, "results": [azureResult()]})
+        self.queries = []
+        self.times = []
+        self.lock = threading.Lock()
+        stub = self
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    stub.queries.append(urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)["query"][0])
+                    stub.times.append(time.monotonic())
+                    status, headers, body = stub.responses.pop(0) if stub.responses else stub.default
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                for (key, value) in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+            def log_message(self, *args):
+                pass
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = "http://127.0.0.1:{}/search/address/json?api-version=1.0&query=#{{query}}".format(
+            self.server.server_address[1])
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def stub():
+    stub = Stub()
+    yield stub
+    stub.close()
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # backoff delays recorded instead of waited
+    sleeps = []
+    monkeypatch.setattr(utils.geocode.time, "sleep", sleeps.append)
+    return sleeps
+
+def record(address = "BRĪVĪBAS IELA 19, RĪGA, LV-1010", id = "1"):
+    return {"id": id, "address": address, "cc": "LV"}
+
+def test_parse(stub):
+    geocoder = Geocoder("azure", url = stub.url)
+    data = record()
+    assert geocoder.geocode(data) is True
+    assert (data["lat"], data["lon"], data["geo_qual"]) == (56.95, 24.11, 1)
+    assert (data["street"], data["house_number"], data["postcode"], data["city"]) == \
+        ("Brīvības iela", "19", "LV-1010", "Rīga")
+    assert data["geo_date"] == time.strftime("%Y-%m-%d") and data["errors-geocoding"] == ""
+
+@pytest.mark.parametrize("type, qual", [("Street", 2), ("Geography", 3), ("POI", -1)])
+def test_parse_quality(stub, type, qual):
+    stub.default = (200, {}, {"results": [azureResult(type)]})
+    data = record()
+    assert Geocoder("azure", url = stub.url).geocode(data) is True
+    assert data["geo_qual"] == qual
+
+def test_no_match(stub):
+    stub.default = (200, {}, {"results": []})
+    data = record()
+    assert Geocoder("azure", url = stub.url).geocode(data) is False
+    assert "no matches" in data["errors-geocoding"]
+
+def test_query_encoding(stub):
+    # the address reaches the server as given, whatever its characters
+    address = "Rīgas iela 1/3 & 5 #2, K+2, RĪGA"
+    geocoder = Geocoder("azure", url = stub.url)
+    assert geocoder.geocode(record(address)) is True
+    assert stub.queries == [address]
+
+def test_query_cache_key(stub):
+    # the shared cache is keyed by the address as given, not the encoded query
+    class Cache(object):
+        def __init__(self):
+            self.keys = []
+        def get(self, address, engine, country):
+            return None
+        def put(self, address, engine, country, result):
+            self.keys.append((address, engine, country))
+    cache = Cache()
+    address = "Rīgas iela 1 & 3, RĪGA"
+    assert Geocoder("azure", url = stub.url, cache = cache).geocode(record(address)) is True
+    assert cache.keys == [(address, "azure", "LV")]
+
+def test_retry_backoff(stub, sleeps):
+    stub.responses = [(503, {}, {}), (429, {"Retry-After": "3"}, {}), (500, {}, {}), (429, {}, {})]
+    geocoder = Geocoder("azure", url = stub.url, retries = 5, backoff = 0.5)
+    data = record()
+    assert geocoder.geocode(data) is True
+    # exponential backoff, or longer as told by the server
+    assert sleeps == [0.5, 3, 2.0, 4.0]
+    assert len(stub.queries) == 5 and data["geo_qual"] == 1
+
+def test_retry_exhausted(stub, sleeps):
+    stub.default = (503, {}, {})
+    data = record()
+    assert Geocoder("azure", url = stub.url, retries = 2, backoff = 0.1).geocode(data) is False
+    assert len(stub.queries) == 3 and sleeps == [0.1, 0.2]
+    assert "503" in data["errors-geocoding"]
+
+def test_no_retry_client_error(stub, sleeps):
+    stub.default = (400, {}, {})
+    assert Geocoder("azure", url = stub.url).geocode(record()) is False
+    assert len(stub.queries) == 1 and sleeps == []
+
+def test_rate_limit(stub):
+    geocoder = Geocoder("azure", url = stub.url, workers = 4, rate = 20)
+    records = [record(id = str(n)) for n in range(10)]
+    assert geocoder.geocodeAll(records) == [True] * 10
+    times = sorted(stub.times)
+    # at most 20 requests per second, whatever the number of threads
+    assert times[-1] - times[0] >= 9 / 20 - 0.02
+    assert all(b - a >= 1 / 20 - 0.02 for (a, b) in zip(times, times[1:]))
+
+def test_quota_deferred(stub, tmp_path):
+    ledger = Ledger(str(tmp_path / "quota.json"), limit = 2)
+    geocoder = Geocoder("azure", url = stub.url, workers = 1, ledger = ledger)
+    records = [record(id = str(n)) for n in range(3)]
+    assert geocoder.geocodeAll(records) == [True, True, None]
+    assert "quota" in records[2]["errors-geocoding"] and "lat" not in records[2]
+    assert len(stub.queries) == 2 and ledger.used() == 2
+
+def test_quota_retries_charged_once(stub, sleeps, tmp_path):
+    # the scheduler plans one transaction per record: the retries of an address
+    # are not charged again
+    stub.responses = [(503, {}, {}), (429, {}, {}), (200, {}, stub.default[2]), (500, {}, {})]
+    ledger = Ledger(str(tmp_path / "quota.json"), limit = 2)
+    geocoder = Geocoder("azure", url = stub.url, workers = 1, ledger = ledger)
+    assert geocoder.geocodeAll([record(id = "1"), record(id = "2")]) == [True, True]
+    assert len(stub.queries) == 5 and ledger.used() == 2
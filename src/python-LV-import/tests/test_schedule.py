@@ -0,0 +1,72 @@
+import json
+import os
+import time
+
+import pytest
+
+from utils.geocode import QuotaExceeded
+from utils.schedule import Ledger, Scheduler
+
+def geocoded(type = "Point Address", days = 0):
+    date = time.strftime("%Y-%m-%d", time.localtime(time.time() - days * 86400))
+    return {"georesult": {"type": type}, "geo_date": date}
+
+def test_priority(tmp_path):
+    scheduler = Scheduler(Ledger(str(tmp_path / "quota.json")), maxAge = 365)
+    assert scheduler.priority({}) == scheduler.NEW
+    assert scheduler.priority({"georesult": None}) == scheduler.NEW
+    # geo_qual 3 (the worst type) and -1 (unknown types)
+    assert scheduler.priority(geocoded("Geography")) == scheduler.POOR
+    assert scheduler.priority(geocoded("POI")) == scheduler.POOR
+    assert scheduler.priority(geocoded(days = 400)) == scheduler.STALE
+    # good enough and recent: nothing to do
+    assert scheduler.priority(geocoded()) is None
+    assert scheduler.priority(geocoded("Street", days = 300)) is None
+    assert Scheduler(scheduler.ledger, maxAge = 0).priority(geocoded(days = 4000)) is None
+    assert scheduler.NEW < scheduler.POOR < scheduler.STALE
+
+def test_plan_order(tmp_path):
+    scheduler = Scheduler(Ledger(str(tmp_path / "quota.json")))
+    records = {"stale": geocoded(days = 400), "poor3": geocoded("Geography"), "ok": geocoded(),
+        "new1": {}, "poor-1": geocoded("POI"), "new2": {"georesult": {}}}
+    planned, deferred = scheduler.plan(records)
+    # by priority, then in the order of the records
+    assert planned == ["new1", "new2", "poor3", "poor-1", "stale"] and deferred == []
+
+def test_plan_deferred(tmp_path):
+    ledger = Ledger(str(tmp_path / "quota.json"), limit = 5)
+    ledger.charge(2)
+    records = {"stale": geocoded(days = 400), "poor": geocoded("Geography"), "new1": {}, "new2": {}}
+    planned, deferred = Scheduler(ledger).plan(records)
+    assert planned == ["new1", "new2", "poor"] and deferred == ["stale"]
+    ledger.charge(3)
+    assert Scheduler(ledger).plan(records) == ([], ["new1", "new2", "poor", "stale"])
+
+def test_ledger_persistent(tmp_path):
+    fileName = str(tmp_path / "quota.json")
+    ledger = Ledger(fileName, limit = 3)
+    ledger.charge()
+    ledger.charge(2)
+    with pytest.raises(QuotaExceeded):
+        ledger.charge()
+    assert ledger.used() == 3 and ledger.remaining() == 0
+    # shared by the following runs of the month, not by the next month
+    ledger = Ledger(fileName, limit = 5)
+    assert ledger.used() == 3 and ledger.remaining() == 2
+    with open(fileName, encoding = "utf-8") as f:
+        assert json.load(f) == {ledger.period(): 3}
+    ledger.period = lambda: "2099-01"
+    assert ledger.used() == 0 and ledger.remaining() == 5
+
+def test_ledger_legacy(tmp_path, monkeypatch):
+    # the ledger of previous versions, in the cache folder, is moved out of it
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("cache")
+    period = time.strftime("%Y-%m")
+    with open(os.path.join("cache", "quota.json"), "w", encoding = "utf-8") as f:
+        json.dump({period: 7}, f)
+    ledger = Ledger()
+    assert ledger.used() == 7
+    assert os.path.exists("quota.json") and not os.path.exists(os.path.join("cache", "quota.json"))
+    ledger.charge()
+    assert Ledger().used() == 8
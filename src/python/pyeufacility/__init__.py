@@ -8,7 +8,8 @@ Initialisation module of facility configuration programs.
 
 *require*:      :mod:`os`
 
-*call*:         :mod:`pyeudatnat`
+*call*:         :mod:`pyeudatnat` (on first access to :data:`FACACCESS` or
+                :data:`CCACCESS`)
 
 **Contents**
 """
@@ -17,10 +18,9 @@ Initialisation module of facility configuration programs.
 # *since*:        Mon Apr  6 18:30:09 2020
 
 #%%
+import os
 from os import path as osp
 
-from pyeudatnat import COUNTRIES
-
 
 PACKNAME            = 'pyeufacility' # this package...
 """Name of this package.
@@ -48,52 +48,42 @@ VALIDATE            = 'validate'
 #%%
 
 __all__             = ['config', HARMONISE, VALIDATE]#analysis:ignore
+__all__.extend([fac['code'] for (key, fac) in FACILITIES.items() if key!='Oth'])
 
 
 #%%
 
-FACACCESS           = []
-CCACCESS            = {__fac:[] for __fac in FACILITIES.keys() if __fac!='Oth'}
-
-for __fac in FACILITIES.keys():
-    if __fac=='Oth':    continue
-    # for a given facility
-    __cfac = FACILITIES[__fac]['code']
-    # check facilities' metadata
-    __path = PACKPATH
-    for __fmt in ['json', 'py']:
-        __fsrc = osp.join(__path, '%s.%s' % (__cfac, __fmt))
+def __discover():
+    """Scan the package directory for the facilities' and countries' metadata
+    (either JSON or py files) available.
+    """
+    from pyeudatnat import COUNTRIES
+    facaccess = []
+    ccaccess = {fac:[] for fac in FACILITIES.keys() if fac!='Oth'}
+    for fac in ccaccess.keys():
+        # for a given facility
+        cfac = FACILITIES[fac]['code']
+        # check facilities' metadata
+        if any(osp.isfile(osp.join(PACKPATH, '%s.%s' % (cfac, fmt))) for fmt in ['json', 'py']):
+            facaccess.append(fac)
+        # check countries' metadata
+        path = osp.join(PACKPATH, cfac)
+        if not osp.isfile(osp.join(path,'__init__.py')):
+            continue
         try:
-            assert osp.exists(__fsrc) and osp.isfile(__fsrc)
-        except AssertionError:     pass
-        else:
-            FACACCESS.append(__fac)
-            break
-    # check countries' metadata
-    __path = osp.join(PACKPATH, __fac)
-    try:
-        assert osp.exists(__path) and osp.isdir(__path)
-    except AssertionError:
-        continue
-    try:
-        __finit = osp.join(__path,'__init__.py')
-        assert osp.exists(__finit) and osp.isfile(__finit)
-    except AssertionError:
-        continue
-    __all__.append(__cfac)
-    # add metadata files to module
-    for __cc in COUNTRIES.keys():
-        __src = '%s%s' % (__cc, __cfac)
-        for __fmt in ['json', 'py']:
-            __fsrc = osp.join(__path, '%s.%s' % (__src, __fmt))
-            try:
-                assert osp.exists(__fsrc) and osp.isfile(__fsrc)
-            except AssertionError:     pass
-            else:
-                CCACCESS[__fac].append(__cc)
-                break
-
-try:
-    del(__fac, __cfac, __path)
-    del(__cc, __src, __fmt, __fsrc, __finit)
-except: pass
+            files = set(os.listdir(path))
+        except OSError:
+            continue
+        ccaccess[fac].extend([cc for cc in COUNTRIES.keys()
+                              if any('%s%s.%s' % (cc, cfac, fmt) in files for fmt in ['json', 'py'])])
+    return facaccess, ccaccess
+
+
+def __getattr__(name):
+    # facilities and countries available are discovered on first access only
+    if name in ('FACACCESS', 'CCACCESS'):
+        facaccess, ccaccess = __discover()
+        globals().update({'FACACCESS': facaccess, 'CCACCESS': ccaccess})
+        return globals()[name]
+    raise AttributeError("module '%s' has no attribute '%s'" % (__name__, name))
+
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _accessibility
+
+Module implementing accessibility measures of the harmonised facilities over
+population grids, e.g. the GISCO 1 km grid of the EU population: distance to
+the nearest facility and two-step floating catchment area (2SFCA) ratios.
+
+**Description**
+
+The population grid is read from a local delimited text file by chunks of cells;
+the cells are located either by geographical coordinates (:data:`lat`/:data:`lon`
+columns), by `EPSG:3035` coordinates of their centroids (:data:`x`/:data:`y`
+columns) or by their GISCO identifiers (e.g., `CRS3035RES1000mN2684000E4334000`,
+in the `GRD_ID` column). The chunks are dispatched over a pool of processes,
+each holding the spatial index of the (filtered) facilities (see
+:class:`~pyeufacility.query.FacilityIndex`), and the results are appended in
+order to the output file, so that memory stays bounded whatever the size of
+the grid.
+
+The 2SFCA ratios (e.g., of beds to population) are computed in two passes over
+the grid. First, the population of the cells within the catchment of every
+facility, weighted by a distance decay, is summed into the demand of the
+facility, whose ratio is its supply (e.g., :data:`cap_beds`) over its demand.
+Then, the ratios of the facilities whose catchment covers a cell, weighted
+likewise, are summed into the accessibility of the cell. Within a chunk, the
+pairs (facility, cell) closer than the catchment are found at once as a sparse
+distance matrix between the KD-trees of the facilities and of the cells, so
+that memory is bounded by the chunk size and the catchment.
+
+**Dependencies**
+
+*require*:      :mod:`os`, :mod:`collections`, :mod:`concurrent`,
+                :mod:`numpy`, :mod:`pandas`, :mod:`scipy`
+
+*call*:         :mod:`pyeufacility.query`, :mod:`pyeufacility.geometry`,
+                :mod:`pyeufacility.stream`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 19:10:36 2026
+
+#%%
+
+import os
+import logging
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from scipy.spatial import cKDTree
+
+try:
+    from optparse import OptionParser
+except ImportError:
+    logging.warning('\n! inline command deactivated !')
+
+from pyeufacility.query import loadFacilityIndex
+from pyeufacility.geometry import fromLAEA, toCartesian, chordToMetres, metresToChord
+from pyeufacility.stream import readChunks, ChunkWriter
+
+CHUNKSIZE       = 200000
+"""Default number of grid cells per chunk.
+"""
+
+GRIDID          = 'GRD_ID'
+"""Column of the GISCO identifiers of the grid cells.
+"""
+
+GRIDPATTERN     = r'CRS3035RES(\d+)m?N(\d+)E(\d+)'
+"""Pattern of the GISCO identifiers: resolution and northing/easting of the lower
+left corner of the cell.
+"""
+
+NEAREST         = ['nearest_id', 'nearest_dist']
+"""Output columns: identifier of and distance (in metres) to the nearest facility.
+"""
+
+CATCHMENT       = 50000.
+"""Default catchment (in metres) of the 2SFCA.
+"""
+
+POPULATION      = 'TOT_P'
+"""Default population column of the grid.
+"""
+
+ACCESS          = 'access'
+"""Output column of the 2SFCA accessibility ratios.
+"""
+
+DECAYS          = {'binary':        lambda d, d0: np.ones_like(d),
+                   'linear':        lambda d, d0: 1 - d / d0,
+                   'gaussian':      lambda d, d0: (np.exp(-0.5 * (d / d0)**2) - np.exp(-0.5))
+                                                  / (1 - np.exp(-0.5)),
+                   'exponential':   lambda d, d0: np.exp(-3 * d / d0)
+                   }
+"""Distance decay functions of the 2SFCA, given the distance :data:`d` and the
+catchment :data:`d0` (the original 2SFCA is `binary`).
+"""
+
+
+#%%
+#==============================================================================
+# Function gridLocations
+#==============================================================================
+
+def gridLocations(cells, latlon = None, xy = None, gridid = GRIDID):
+    """Return the geographical coordinates (in degrees) of the centroids of grid
+    cells.
+
+        >>> lat, lon = gridLocations(cells, latlon = ['lat', 'lon'], xy = ['x', 'y'],
+                                     gridid = GRIDID)
+
+    The columns :data:`latlon` are used first when present, then the `EPSG:3035`
+    columns :data:`xy`, then the GISCO identifiers :data:`gridid`.
+    """
+    latlon, xy = latlon or ['lat', 'lon'], xy or ['x', 'y']
+    if all(c in cells.columns for c in latlon):
+        return (pd.to_numeric(cells[latlon[0]], errors = 'coerce').to_numpy(dtype = float),
+                pd.to_numeric(cells[latlon[1]], errors = 'coerce').to_numpy(dtype = float))
+    elif all(c in cells.columns for c in xy):
+        return fromLAEA(pd.to_numeric(cells[xy[0]], errors = 'coerce').to_numpy(dtype = float),
+                        pd.to_numeric(cells[xy[1]], errors = 'coerce').to_numpy(dtype = float))
+    elif gridid in cells.columns:
+        ids = cells[gridid].astype(str).str.extract(GRIDPATTERN, expand = True).astype(float)
+        res, north, east = ids[0].to_numpy(), ids[1].to_numpy(), ids[2].to_numpy()
+        return fromLAEA(east + res / 2, north + res / 2)
+    raise IOError("Grid cells not located - columns %s, %s or '%s' not found" % (latlon, xy, gridid))
+
+
+#%%
+#==============================================================================
+# Function nearestService
+#==============================================================================
+
+__NEAREST       = None
+
+def _initNearest(xyz, ids, options):
+    """Build the KD-tree of the (filtered) facilities once per worker process.
+    """
+    global __NEAREST
+    __NEAREST = (cKDTree(xyz) if len(xyz) else None, ids, options)
+
+
+def _nearestWorker(cells):
+    """Compute the nearest facility of a chunk of grid cells.
+    """
+    tree, ids, options = __NEAREST
+    lat, lon = gridLocations(cells, **options)
+    xyz = toCartesian(lat, lon)
+    valid = ~np.isnan(xyz).any(axis = 1)
+    nearest, dist = np.full(len(cells), None, dtype = object), np.full(len(cells), np.nan)
+    if tree is not None and valid.any():
+        d, i = tree.query(xyz[valid], k = 1)
+        nearest[valid], dist[valid] = ids[i], chordToMetres(d)
+    cells = cells.copy()
+    if not all(c in cells.columns for c in options.get('latlon') or ['lat', 'lon']):
+        cells['lat'], cells['lon'] = lat, lon
+    cells[NEAREST[0]], cells[NEAREST[1]] = nearest, dist
+    return cells
+
+
+def _mapChunks(func, chunks, workers, initializer, initargs):
+    """Apply :data:`func` to every chunk, possibly over a pool of processes, and
+    yield the results in order; at most twice as many chunks as workers are
+    loaded at any time.
+    """
+    if workers in (None, 1):
+        initializer(*initargs)
+        for chunk in chunks:
+            yield func(chunk)
+        return
+    workers = workers or os.cpu_count()
+    with ProcessPoolExecutor(max_workers = workers, initializer = initializer,
+                             initargs = initargs) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(func, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def nearestService(facility, src, dest, **kwargs):
+    """Compute, for every cell of a population grid, the identifier of and the
+    distance (in metres) to the nearest harmonised facility.
+
+        >>> accessibility.nearestService(facility, src, dest, facilities = None,
+                                         chunksize = CHUNKSIZE, workers = None,
+                                         latlon = None, xy = None, gridid = GRIDID,
+                                         sep = ',', **filters)
+
+    The grid :data:`src` is read and processed by chunks of :data:`chunksize`
+    cells, possibly over :data:`workers` processes (0 for all available cores),
+    and the cells are written to :data:`dest` (CSV) with the additional columns
+    :data:`NEAREST` (and their coordinates when not given as latitude/longitude).
+    The facilities are read from :data:`facilities` (by default the file `all`
+    of the harmonised data), and the remaining keyword arguments filter them
+    (see :meth:`~pyeufacility.query.FacilityIndex.select`), e.g. `emergency = 'yes'`
+    and `min_cap_beds = 100`.
+
+    Returns the number of cells processed.
+    """
+    chunksize = kwargs.pop('chunksize', None) or CHUNKSIZE
+    workers = kwargs.pop('workers', None)
+    try:
+        assert isinstance(chunksize, int) and chunksize > 0
+        assert workers is None or (isinstance(workers, int) and workers >= 0)
+    except:
+        raise TypeError("Wrong CHUNKSIZE or WORKERS number - must be positive integers")
+    options = {k: kwargs.pop(k) for k in ('latlon', 'xy', 'gridid') if kwargs.get(k) is not None}
+    sep = kwargs.pop('sep', ',')
+    index = loadFacilityIndex(facility, src = kwargs.pop('facilities', None))
+    _, pos, _ = index.tree(**kwargs)
+    idcol = index.config.get('index', {}).get('id', {}).get('name', 'id')
+    logging.warning("\n! %s facilities selected for the nearest distance !" % len(pos))
+    chunks = readChunks(src, chunksize, sep = sep)
+    initargs = (index.xyz[pos], index.data[idcol].to_numpy(dtype = object)[pos], options)
+    with ChunkWriter(dest, fmt = 'csv', sep = sep) as writer:
+        for cells in _mapChunks(_nearestWorker, chunks, workers, _initNearest, initargs):
+            writer.write(cells)
+    return writer.count
+
+
+#==============================================================================
+# Function accessService
+#==============================================================================
+
+__ACCESS        = None
+
+def _initAccess(xyz, ratio, options):
+    """Build the KD-tree of the facilities once per worker process.
+    """
+    global __ACCESS
+    __ACCESS = (cKDTree(xyz), ratio, options)
+
+
+def _catchmentPairs(cells):
+    """Return the sparse pairs (facility, cell) of a chunk of grid cells closer
+    than the catchment, with their decay weights, and the population of the cells.
+    """
+    tree, _, options = __ACCESS
+    lat, lon = gridLocations(cells, **options['grid'])
+    pop = pd.to_numeric(cells[options['population']], errors = 'coerce').fillna(0).to_numpy(dtype = float)
+    xyz = toCartesian(lat, lon)
+    valid = np.flatnonzero(~np.isnan(xyz).any(axis = 1))
+    if len(valid) == 0:
+        return np.empty(0, dtype = np.int64), np.empty(0, dtype = np.int64), np.empty(0), pop
+    pairs = tree.sparse_distance_matrix(cKDTree(xyz[valid]), metresToChord(options['catchment']),
+                                        output_type = 'ndarray')
+    fac, cell, d = pairs['i'].astype(np.int64), valid[pairs['j']], chordToMetres(pairs['v'])
+    weight = DECAYS[options['decay']](d, options['catchment'])
+    return fac, cell, weight, pop
+
+
+def _demandWorker(cells):
+    """Sum the weighted population of a chunk of grid cells within the catchment
+    of every facility (first step).
+    """
+    ratio = __ACCESS[1]
+    fac, cell, weight, pop = _catchmentPairs(cells)
+    return np.bincount(fac, weights = weight * pop[cell], minlength = len(ratio))
+
+
+def _accessWorker(cells):
+    """Sum the weighted ratios of the facilities whose catchment covers every cell
+    of a chunk of grid cells (second step).
+    """
+    ratio, options = __ACCESS[1], __ACCESS[2]
+    fac, cell, weight, _ = _catchmentPairs(cells)
+    cells = cells.copy()
+    cells[options['access']] = np.bincount(cell, weights = weight * ratio[fac], minlength = len(cells))
+    return cells
+
+
+def accessService(facility, src, dest, **kwargs):
+    """Compute the two-step floating catchment area (2SFCA) accessibility of every
+    cell of a population grid to the supply of the harmonised facilities.
+
+        >>> accessibility.accessService(facility, src, dest, facilities = None,
+                                        supply = 'cap_beds', population = POPULATION,
+                                        catchment = CATCHMENT, decay = 'binary',
+                                        chunksize = CHUNKSIZE // 4, workers = None,
+                                        catchments = None, latlon = None, xy = None,
+                                        gridid = GRIDID, sep = ',', **filters)
+
+    The supply :data:`supply` of every facility is divided by the population
+    :data:`population` of the grid cells within :data:`catchment` metres, weighted
+    by the distance :data:`decay` (any function in :data:`DECAYS`); then, the
+    ratios of the facilities within :data:`catchment` metres of every cell are
+    summed (with the same weights) into its accessibility, written to :data:`dest`
+    (CSV) in the column :data:`ACCESS` (supply per inhabitant). When
+    :data:`catchments` is set, the demand and ratio of every facility are also
+    saved there (CSV).
+
+    Other arguments are as in :meth:`nearestService`. Returns the number of cells
+    processed.
+    """
+    chunksize = kwargs.pop('chunksize', None) or CHUNKSIZE // 4
+    workers = kwargs.pop('workers', None)
+    try:
+        assert isinstance(chunksize, int) and chunksize > 0
+        assert workers is None or (isinstance(workers, int) and workers >= 0)
+    except:
+        raise TypeError("Wrong CHUNKSIZE or WORKERS number - must be positive integers")
+    decay = kwargs.pop('decay', None) or 'binary'
+    catchment = kwargs.pop('catchment', None) or CATCHMENT
+    try:
+        assert decay in DECAYS
+        assert isinstance(catchment, (int, float)) and catchment > 0
+    except:
+        raise IOError("Wrong DECAY or CATCHMENT - must be any from the list %s and a positive distance"
+                      % list(DECAYS.keys()))
+    options = {'grid': {k: kwargs.pop(k) for k in ('latlon', 'xy', 'gridid') if kwargs.get(k) is not None},
+               'population': kwargs.pop('population', None) or POPULATION,
+               'access': ACCESS, 'catchment': float(catchment), 'decay': decay}
+    sep, catchments = kwargs.pop('sep', ','), kwargs.pop('catchments', None)
+    index = loadFacilityIndex(facility, src = kwargs.pop('facilities', None))
+    cfg = index.config.get('index', {})
+    supply = kwargs.pop('supply', None) or cfg.get('beds', {}).get('name', 'cap_beds')
+    if supply not in index.data.columns:
+        raise IOError("Supply column '%s' not found" % supply)
+    _, pos, _ = index.tree(**kwargs)
+    values = pd.to_numeric(index.data[supply], errors = 'coerce').to_numpy(dtype = float)[pos]
+    # facilities with no supply do not compete for the population
+    pos, values = pos[values > 0], values[values > 0]
+    if len(pos) == 0:
+        raise IOError("No facility with positive supply '%s' selected" % supply)
+    logging.warning("\n! %s facilities selected for the 2SFCA !" % len(pos))
+    xyz = index.xyz[pos]
+    # first step: demand and ratio of every facility
+    demand = np.zeros(len(pos))
+    for d in _mapChunks(_demandWorker, readChunks(src, chunksize, sep = sep), workers,
+                        _initAccess, (xyz, demand, options)):
+        demand += d
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        ratio = np.where(demand > 0, values / demand, 0.)
+    if catchments is not None:
+        idcol = cfg.get('id', {}).get('name', 'id')
+        pd.DataFrame({idcol: index.data[idcol].to_numpy()[pos], supply: values,
+                      'demand': demand, 'ratio': ratio}).to_csv(catchments, index = False, sep = sep)
+    # second step: accessibility of every cell
+    with ChunkWriter(dest, fmt = 'csv', sep = sep) as writer:
+        for cells in _mapChunks(_accessWorker, readChunks(src, chunksize, sep = sep), workers,
+                                _initAccess, (xyz, ratio, options)):
+            writer.write(cells)
+    return writer.count
+
+
+#%%
+#==============================================================================
+# Main functions
+#==============================================================================
+
+def __main():
+    """Parse and check the command line with default arguments.
+    """
+    parser = OptionParser(                                                  \
+        description=                                                        \
+    """Compute the nearest facility, or the 2SFCA accessibility, of every cell
+    of a population grid.""",
+        usage=                                                              \
+    """usage:         accessibility facility <grid> <dest>
+    facility :        Type of service.
+    <grid> :          population grid file (CSV).
+    <dest> :          output file (CSV)."""                                 \
+                        )
+
+    parser.add_option("-w", "--workers", action="store", dest="workers",
+                      type="int", help="number of worker processes (0: all cores).",
+                      default=None)
+    parser.add_option("-n", "--chunksize", action="store", dest="chunksize",
+                      type="int", help="number of grid cells per chunk.",
+                      default=None)
+    parser.add_option("-e", "--emergency", action="store_true", dest="emergency",
+                      help="emergency facilities only.",
+                      default=False)
+    parser.add_option("-b", "--beds", action="store", dest="beds",
+                      type="int", help="minimum number of beds.",
+                      default=None)
+    parser.add_option("-a", "--access", action="store_true", dest="access",
+                      help="2SFCA accessibility of the beds instead of nearest distance.",
+                      default=False)
+    parser.add_option("-d", "--catchment", action="store", dest="catchment",
+                      type="float", help="2SFCA catchment (in metres).",
+                      default=None)
+    parser.add_option("-f", "--decay", action="store", dest="decay",
+                      help="2SFCA distance decay (any of %s)." % list(DECAYS.keys()),
+                      default=None)
+    parser.add_option("-p", "--population", action="store", dest="population",
+                      help="population column of the grid.",
+                      default=None)
+    (opts, args) = parser.parse_args()
+
+    if len(args) < 3:
+        parser.error("facility, grid and output files are required.")
+    facility, src, dest = args[:3]
+
+    filters = {'emergency': 'yes' if opts.emergency else None, 'min_cap_beds': opts.beds}
+    if opts.access is True:
+        accessService(facility, src, dest, workers = opts.workers, chunksize = opts.chunksize,
+                      catchment = opts.catchment, decay = opts.decay,
+                      population = opts.population, **filters)
+    else:
+        nearestService(facility, src, dest, workers = opts.workers, chunksize = opts.chunksize,
+                       **filters)
+
+if __name__ == '__main__':
+    __main()
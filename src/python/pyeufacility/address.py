@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _address
+
+Module implementing vectorised splitters of address strings, e.g. patterns like
+"street number, postcode city", shared by the country-specific modules.
+
+**Description**
+
+All splitters operate on whole :class:`pandas.Series` through the `str` accessor
+instead of calling :meth:`pandas.DataFrame.apply` row-wise, and return the very
+same fields as the former row-wise country methods (e.g., `AThcs.split_address`),
+including the way these handle strings with no separator. Missing values are
+processed as empty strings.
+
+**Dependencies**
+
+*require*:      :mod:`numpy`, :mod:`pandas`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 13:05:52 2026
+
+#%%
+
+import numpy as np
+import pandas as pd
+
+COMMA           = r'\s*,\s*'
+BLANKS          = r'\s+'
+
+
+#%%
+#==============================================================================
+# Generic vectorised operations
+#==============================================================================
+
+def _strings(s):
+    # missing values as empty strings, positional index (see _reindex)
+    return pd.Series(s).fillna('').astype(str).reset_index(drop = True)
+
+
+def _reindex(index, *args):
+    for a in args:
+        a.index = index
+    return args if len(args) > 1 else args[0]
+
+
+def splitComma(s):
+    """Split strings at their first comma: the left part, and the right part with
+    all further commas replaced by blanks.
+
+        >>> left, right = splitComma(s)
+    """
+    mem = _strings(s).str.split(COMMA)
+    return mem.str[0], mem.str[1:].str.join(' ')
+
+
+def popLast(src, dest):
+    """Where :data:`dest` is empty and :data:`src` longer than one character, move
+    the last non-blank character of :data:`src` onto :data:`dest`, trailing blanks
+    being dropped; when no such character is left, truncate :data:`src` to one
+    character only.
+
+        >>> src, dest = popLast(src, dest)
+    """
+    src, dest = src.copy(), dest.copy()
+    mask = (dest == '') & (src.str.len() > 1)
+    stripped = src[mask].str.rstrip()
+    found = stripped.str.len() > 1
+    idx, nidx = found.index[found], found.index[~found]
+    dest.loc[idx] = stripped[idx].str[-1]
+    src.loc[idx] = stripped[idx].str[:-1]
+    src.loc[nidx] = src[nidx].str[:1]
+    return src, dest
+
+
+def splitLastToken(s):
+    """Split strings at blanks into all tokens but the last (joined with single
+    blanks) and the last token.
+
+        >>> head, last = splitLastToken(s)
+    """
+    toks = s.str.split(BLANKS)
+    return toks.str[:-1].str.join(' '), toks.str[-1].str.strip()
+
+
+def splitFirstToken(s):
+    """Split strings at blanks into the first token and all others (joined with
+    single blanks).
+
+        >>> first, tail = splitFirstToken(s)
+    """
+    toks = s.str.split(BLANKS)
+    return toks.str[0].str.strip(), toks.str[1:].str.join(' ')
+
+
+def isNumber(s, first = True, numeric = True):
+    """Check whether strings start (:data:`first` set to True) or end (:data:`first`
+    set to False) with a digit, or are numeric (when :data:`numeric` is True).
+
+        >>> mask = isNumber(s, first = True, numeric = True)
+    """
+    char = s.str[:1] if first is True else s.str[-1:]
+    mask = char.str.isdigit()
+    if numeric is True:
+        mask |= s.str.isnumeric()
+    return mask.fillna(False).astype(bool)
+
+
+def joinTokens(s, mask):
+    """Split strings at blanks and join, for every string, the non-empty tokens
+    for which :data:`mask` (a function of the tokens) holds, each token being
+    preceded by a blank; also return the join of the other tokens.
+
+        >>> selected, others = joinTokens(s, mask = isNumber)
+    """
+    toks = s.str.split(BLANKS).explode().str.strip()
+    # every string yields at least one token: the positions of the first
+    # tokens are used to concatenate the tokens string-wise
+    start = np.flatnonzero(~toks.index.duplicated())
+    empty, sel = (toks == '').to_numpy(), mask(toks).to_numpy()
+    toks = (' ' + toks).to_numpy(dtype = object)
+    join = lambda m: pd.Series(np.add.reduceat(np.where(m & ~empty, toks, ''), start),
+                               index = s.index, dtype = object)
+    return join(sel), join(~sel)
+
+
+#%%
+#==============================================================================
+# Address splitters
+#==============================================================================
+
+def splitStreetNumberPostcodeCity(s):
+    """Split addresses formatted like "street number, postcode city".
+
+        >>> df = splitStreetNumberPostcodeCity(s)
+
+    Returns a dataframe with columns `street`, `number`, `postcode` and `city`.
+    """
+    left, right = popLast(*splitComma(s))
+    street, number = splitStreetNumber(left, comma = False)
+    postcode, city = splitPostcodeCity(right, comma = False)
+    # single character address with no separator
+    single = (left.str.len() == 1) & (right == '')
+    street, number = street.where(~single, left), number.where(~single, '')
+    postcode, city = postcode.where(~single, ''), city.where(~single, '')
+    df = pd.concat([street, number, postcode, city], axis = 1,
+                   keys = ['street', 'number', 'postcode', 'city'])
+    return _reindex(pd.Series(s).index, df)
+
+
+def splitStreetNumber(s, comma = True, numeric = True):
+    """Split addresses formatted like "street number" (with possibly some further
+    comma-separated information ignored when :data:`comma` is True); the number
+    must start with a digit, or be numeric when :data:`numeric` is True.
+
+        >>> street, number = splitStreetNumber(s)
+    """
+    if comma is True:
+        left, right = popLast(*splitComma(s))
+    else:
+        left, right = _strings(s), None
+    street, number = splitLastToken(left)
+    isnum = isNumber(number, first = True, numeric = numeric)
+    if right is not None:
+        # single character address with no separator
+        isnum &= ~((left.str.len() == 1) & (right == ''))
+    return _reindex(pd.Series(s).index, street.where(isnum, left), number.where(isnum, ''))
+
+
+def splitPostcodeCity(s, comma = True):
+    """Split addresses formatted like "postcode city" (following some further
+    comma-separated information when :data:`comma` is True, e.g. "canton, postcode
+    city").
+
+        >>> postcode, city = splitPostcodeCity(s)
+    """
+    if comma is True:
+        right, left = popLast(*splitComma(s)[::-1])
+    else:
+        right, left = _strings(s), None
+    postcode, city = splitFirstToken(right)
+    isnum = postcode.str.isnumeric().fillna(False).astype(bool)
+    postcode, city = postcode.where(isnum, ''), city.where(isnum, right)
+    if left is not None:
+        # single character address with no separator
+        single = (right.str.len() == 1) & (left == '')
+        postcode, city = postcode.where(~single, ''), city.where(~single, right)
+    return _reindex(pd.Series(s).index, postcode, city)
+
+
+def splitStreetCommaNumber(s):
+    """Split addresses formatted like "street, number".
+
+        >>> street, number = splitStreetCommaNumber(s)
+
+    When the part following the comma is not a number, the number is missing
+    (NaN) and the whole first part is kept as the street.
+    """
+    street, number = popLast(*splitComma(s))
+    isnum = isNumber(number, first = True)
+    # note: the first part is joined character-wise, like the former BG method
+    # ', '.join(street)
+    street = street.str.join(', ').where(isnum, street)
+    return _reindex(pd.Series(s).index, street, number.where(isnum, np.nan))
+
+
+def splitTokensAddress(s):
+    """Split addresses formatted like "street number ..., postcode city ..." where
+    tokens are dispatched depending on whether they contain numbers or not.
+
+        >>> df = splitTokensAddress(s)
+
+    Returns a dataframe with columns `street`, `number`, `postcode` and `city`;
+    like the former LT method, all fields start with a blank when not empty.
+    """
+    right, left = popLast(*splitComma(s)[::-1])
+    postcode, city = joinTokens(right, lambda t: isNumber(t, first = False))
+    number, street = joinTokens(left, lambda t: isNumber(t, first = True))
+    df = pd.concat([street, number, postcode, city], axis = 1,
+                   keys = ['street', 'number', 'postcode', 'city'])
+    # single character addresses with no separator
+    df.loc[(right.str.len() == 1) & (left == ''), :] = ''
+    df.loc[(right.str.len() == 1) & (left == ''), 'number'] = right
+    df.loc[(left.str.len() == 1) & (right == ''), :] = ''
+    df.loc[(left.str.len() == 1) & (right == ''), 'postcode'] = left
+    return _reindex(pd.Series(s).index, df)
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _aggregate
+
+Module implementing the precomputed aggregates of the harmonised facilities by
+country, NUTS region and cell of the regular European grids, so that dashboards
+and maps read a small table instead of scanning the harmonised data.
+
+**Description**
+
+The harmonised table (by default the file `all` in the `csv` folder) is read
+once, and for every level of aggregation the facilities are binned at once:
+the keys of the regions (or grid cells) are factorised and the counts, the sums
+of the capacities (e.g., :data:`cap_beds` and :data:`cap_prac`) and the numbers
+of public/private facilities are computed with :meth:`numpy.bincount`. The grid
+cells are those of the GISCO grids in `EPSG:3035` (e.g., `CRS3035RES10000mN2680000E4330000`)
+at the resolutions :data:`GRIDRES`, and the NUTS regions are read from the
+`nuts0..3` columns (see :mod:`pyeufacility.regions`) when present.
+
+The aggregates are stored as one long table with the columns :data:`level`
+(e.g., `cc`, `nuts2` or `grid10km`), :data:`region` (the code of the region or
+cell) and the aggregated values, next to the harmonised data folders (e.g.,
+`data/healthcare/aggregates.csv`).
+
+**Dependencies**
+
+*require*:      :mod:`os`, :mod:`numpy`, :mod:`pandas`
+
+*call*:         :mod:`pyeufacility.config`, :mod:`pyeufacility.geometry`,
+                :mod:`pyeufacility.regions`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 20:31:07 2026
+
+#%%
+
+from os import path as osp
+import logging
+
+import numpy as np
+import pandas as pd
+
+from six import string_types
+
+try:
+    from optparse import OptionParser
+except ImportError:
+    logging.warning('\n! inline command deactivated !')
+
+from pyeufacility import PACKPATH, FACILITIES
+from pyeufacility.config import FACMETADATA
+from pyeufacility.geometry import toLAEA
+from pyeufacility.regions import REGIONS
+
+GRIDRES         = [1000, 10000, 50000]
+"""Resolutions (in metres) of the grids the facilities are aggregated on.
+"""
+
+CAPACITIES      = ['beds', 'prac', 'rooms', 'students', 'enrolled']
+"""Fields of the facility index summed, when present.
+"""
+
+AGGREGATES      = 'aggregates'
+"""Basename of the aggregates table.
+"""
+
+
+#%%
+#==============================================================================
+# Function aggregateFacilityData
+#==============================================================================
+
+def gridCodes(lat, lon, res):
+    """Return the GISCO identifiers of the cells of the `EPSG:3035` grid of
+    resolution :data:`res` (in metres) containing the locations (None when not
+    located).
+    """
+    x, y = toLAEA(lat, lon)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    codes = np.full(len(x), None, dtype = object)
+    east = (np.floor(x[valid] / res) * res).astype(np.int64).astype(str).astype(object)
+    north = (np.floor(y[valid] / res) * res).astype(np.int64).astype(str).astype(object)
+    codes[valid] = 'CRS3035RES%sm' % res + 'N' + north + 'E' + east
+    return codes
+
+
+def aggregateFacilityData(data, config, gridres = None):
+    """Aggregate the harmonised facilities by country, NUTS region (when the
+    regions were assigned) and grid cell.
+
+        >>> aggregates = aggregateFacilityData(data, config, gridres = GRIDRES)
+
+    Returns the long table of the aggregates with the columns `level`, `region`,
+    `count`, the sums of the capacities (named as the harmonised columns, e.g.
+    `cap_beds`) and, when the public/private field is present, `public`,
+    `private` and `public_share` (share of public facilities among those whose
+    status is known).
+    """
+    index = config.get('index', {})
+    name = lambda f: index.get(f, {}).get('name', f)
+    gridres = GRIDRES if gridres is None else gridres
+    # the values binned, computed once for all levels
+    values = {}
+    for f in CAPACITIES:
+        if f in index and name(f) in data.columns:
+            values[name(f)] = pd.to_numeric(data[name(f)], errors = 'coerce').to_numpy(dtype = float)
+    pp = name('PP')
+    if 'PP' in index and pp in data.columns:
+        status = data[pp].astype(object).where(data[pp].notnull(), None).to_numpy()
+        values['public'] = (status == 'public').astype(float)
+        values['private'] = (status == 'private').astype(float)
+    # the keys of every level
+    levels = [(name('cc'), data[name('cc')].to_numpy(dtype = object))] if name('cc') in data.columns else []
+    levels.extend([(r, data[r].to_numpy(dtype = object)) for r in REGIONS if r in data.columns])
+    if name('lat') in data.columns and name('lon') in data.columns:
+        lat = pd.to_numeric(data[name('lat')], errors = 'coerce').to_numpy(dtype = float)
+        lon = pd.to_numeric(data[name('lon')], errors = 'coerce').to_numpy(dtype = float)
+        levels.extend([('grid%skm' % (res // 1000) if res % 1000 == 0 else 'grid%sm' % res,
+                        gridCodes(lat, lon, res)) for res in gridres])
+    tables = []
+    for (level, keys) in levels:
+        labels, uniques = pd.factorize(keys)
+        mask = labels >= 0
+        labels, n = labels[mask], len(uniques)
+        table = {'level': level, 'region': np.asarray(uniques, dtype = object),
+                 'count': np.bincount(labels, minlength = n)}
+        for (col, v) in values.items():
+            table[col] = np.bincount(labels, weights = np.nan_to_num(v[mask]), minlength = n)
+        tables.append(pd.DataFrame(table))
+    aggregates = pd.concat(tables, ignore_index = True) if tables != [] \
+        else pd.DataFrame(columns = ['level', 'region', 'count'])
+    if 'public' in values:
+        known = aggregates['public'] + aggregates['private']
+        aggregates['public_share'] = (aggregates['public'] / known.where(known > 0)).round(4)
+    # sums of integral fields stay integral (nullable), the others are kept as
+    # they are summed
+    for col in [c for c in values if c in aggregates.columns]:
+        s = pd.to_numeric(aggregates[col], errors = 'coerce')
+        if (s.isnull() | (s == s.round())).all():
+            aggregates[col] = s.round().astype('Int64')
+    return aggregates
+
+
+#%%
+#==============================================================================
+# Function aggregateService
+#==============================================================================
+
+def aggregateService(facility, src = None, dest = None, gridres = None):
+    """Compute and store the aggregates of the harmonised data of a facility.
+
+        >>> aggregate.aggregateService(facility, src = None, dest = None, gridres = GRIDRES)
+
+    The harmonised data :data:`src` default to the file `all` of the `csv`
+    folder, and the aggregates :data:`dest` to the file `aggregates.csv` next to
+    the harmonised data folders.
+    """
+    if not isinstance(facility, string_types):
+        raise TypeError("Wrong type for input service - must be the facility type")
+    elif not facility in FACILITIES.keys():
+        raise IOError("Service type not recognised - must be a string in the list '%s'" % list(FACILITIES.keys()))
+    cfg = FACMETADATA[facility]
+    options = cfg.get('options', {})
+    path = osp.join(PACKPATH, cfg.get('path', ''))
+    if src is None:
+        src = osp.join(path, 'csv', 'all.%s' % options.get('fmt', {}).get('csv', 'csv'))
+    try:
+        assert osp.exists(src)
+    except:
+        raise FileNotFoundError("Input file '%s' not found" % src)
+    sep, encoding = options.get('sep', ','), options.get('encoding', 'utf-8')
+    data = pd.read_csv(src, sep = sep, encoding = encoding,
+                       dtype = {cfg.get('index', {}).get('id', {}).get('name', 'id'): str})
+    aggregates = aggregateFacilityData(data, cfg, gridres = gridres)
+    dest = dest or osp.join(path, '%s.csv' % AGGREGATES)
+    aggregates.to_csv(dest, sep = sep, encoding = encoding, index = False)
+    logging.warning("\n! %s aggregates of %s facilities stored in '%s' !" % (len(aggregates), len(data), dest))
+    return aggregates
+
+
+#%%
+#==============================================================================
+# Main functions
+#==============================================================================
+
+run = aggregateService
+
+def __main():
+    """Parse and check the command line with default arguments.
+    """
+    parser = OptionParser(                                                  \
+        description=                                                        \
+    """Aggregate the harmonised data by country, region and grid cell.""",
+        usage=                                                              \
+    """usage:         aggregate facility
+    facility :        Type of service."""                                   \
+                        )
+
+    parser.add_option("-s", "--src", action="store", dest="src",
+                      help="harmonised data file (CSV).",
+                      default=None)
+    parser.add_option("-o", "--dest", action="store", dest="dest",
+                      help="aggregates file (CSV).",
+                      default=None)
+    (opts, args) = parser.parse_args()
+
+    if args in (None, ()):
+        parser.error("facility is required.")
+
+    run(args[0], src = opts.src, dest = opts.dest)
+
+if __name__ == '__main__':
+    __main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _checkpoint
+
+Module implementing the checkpoints of the harmonisation stages: the state of a
+facility instance (data, columns and index) is persisted after every stage so
+that a failed run can be resumed without running again the expensive stages
+(e.g., `locate` geocoding).
+
+**Description**
+
+Checkpoints are stored as pickle files in a `.checkpoint/<country>` folder
+alongside the harmonised outputs, and are keyed by the fingerprint of the
+country's sources (see :meth:`~pyeufacility.manifest.BuildManifest.fingerprint`)
+and by the options of the run: a checkpoint is discarded as soon as any of the
+input data, metadata, hook module or facility configuration changed, or when the
+run options (e.g., geocoder, regions or transforms) differ.
+
+**Dependencies**
+
+*require*:      :mod:`os`, :mod:`pickle`, :mod:`shutil`, :mod:`json`, :mod:`hashlib`
+
+*call*:         :mod:`pyeufacility.manifest`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 15:48:20 2026
+
+#%%
+
+from os import path as osp
+import os
+import logging
+import pickle
+import shutil
+import json
+import hashlib
+
+from pyeufacility.manifest import BuildManifest
+
+CHECKPOINTDIR   = '.checkpoint'
+
+STAGES          = ['load', 'prepare', 'locate', 'format']
+"""Stages after which the state of a facility instance is checkpointed.
+"""
+
+STATE           = ['data', 'cols', 'idx']
+"""Attributes of a facility instance that are checkpointed.
+"""
+
+
+#%%
+#==============================================================================
+# Class Checkpoint
+#==============================================================================
+
+class Checkpoint(object):
+    """Class used to save and restore the state of a facility instance after
+    every harmonisation stage.
+
+        >>> checkpoint = Checkpoint(facility, country)
+        >>> checkpoint.dump('locate', natFacility)
+        >>> stage = checkpoint.restore(natFacility, before = 'format')
+    """
+
+    #/************************************************************************/
+    def __init__(self, facility, country, dest = None, options = None):
+        manifest = BuildManifest(facility)
+        self.facility, self.country = facility, country
+        self.dest = dest or osp.join(manifest.datadir, CHECKPOINTDIR, country)
+        # the states depend on the sources and on the options of the run (e.g.,
+        # geocoder, regions, transforms)
+        self.key = hashlib.sha256(json.dumps({'sources': manifest.fingerprint(country),
+                                              'options': options or {}},
+                                             sort_keys = True, default = repr)
+                                  .encode('utf-8')).hexdigest()
+
+    #/************************************************************************/
+    def file(self, stage):
+        return osp.join(self.dest, '%s.pickle' % stage)
+
+    #/************************************************************************/
+    def dump(self, stage, natFacility):
+        """Persist the state of :data:`natFacility` after :data:`stage`; the file
+        is replaced atomically.
+        """
+        state = {attr: getattr(natFacility, attr) for attr in STATE if hasattr(natFacility, attr)}
+        os.makedirs(self.dest, exist_ok = True)
+        tmp = '%s.tmp' % self.file(stage)
+        with open(tmp, 'wb') as fp:
+            pickle.dump({'key': self.key, 'stage': stage, 'state': state}, fp,
+                        protocol = pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.file(stage))
+
+    #/************************************************************************/
+    def load(self, stage):
+        """Return the state checkpointed after :data:`stage`, or None when it is
+        missing or outdated.
+        """
+        try:
+            with open(self.file(stage), 'rb') as fp:
+                checkpoint = pickle.load(fp)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logging.warning("\n! Checkpoint '%s' corrupted - ignored !" % self.file(stage))
+            return None
+        if checkpoint.get('key') != self.key:
+            logging.warning("\n! Checkpoint '%s' outdated - ignored !" % self.file(stage))
+            return None
+        return checkpoint.get('state')
+
+    #/************************************************************************/
+    def restore(self, natFacility, before = None):
+        """Restore the state of :data:`natFacility` from the last good checkpoint
+        of a stage preceding :data:`before` (any stage when None).
+
+        Returns the stage restored, or None when no checkpoint is available.
+        """
+        order = ['fetch', *STAGES, 'save']
+        stages = STAGES if before not in order                          \
+            else [s for s in STAGES if order.index(s) < order.index(before)]
+        for stage in reversed(stages):
+            state = self.load(stage)
+            if state is None:
+                continue
+            for (attr, value) in state.items():
+                setattr(natFacility, attr, value)
+            logging.warning("\n! State of country '%s' restored from stage '%s' checkpoint !"
+                            % (self.country, stage))
+            return stage
+        return None
+
+    #/************************************************************************/
+    def clear(self):
+        """Remove all the checkpoints of the country.
+        """
+        shutil.rmtree(self.dest, ignore_errors = True)
@@ -16,9 +16,8 @@ integrated data on national facilities.
 
 **Dependencies**
 
-*require*:      :mod:`os`, :mod:`warnings`, :mod:`collections`, :mod:`datetime`
-
-*optional*:     :mod:`json`
+*require*:      :mod:`os`, :mod:`warnings`, :mod:`collections`, :mod:`datetime`,
+                :mod:`json`, :mod:`pickle`
 
 *call*:         :mod:`pyeudatnat`, :mod:`pyeudatnat.meta`, :mod:`pyeudatnat.base`
 
@@ -31,9 +30,13 @@ integrated data on national facilities.
 #%% Settings
 
 from os import path as osp
+import os
 import logging
+import json
+import pickle
+import hashlib
 
-from collections import OrderedDict, Mapping
+from collections import OrderedDict, Mapping, MutableMapping
 from six import string_types
 from copy import deepcopy
 
@@ -54,8 +57,152 @@ from . import FACILITIES, PACKNAME, PACKPATH#analysis:ignore
 
 #%% Global var
 
-FACMETADATA         = {__fac:{} for __fac in FACILITIES.keys() if __fac!='Oth'}
-# dict.fromkeys(list(FACILITIES.keys()), {})
+METACACHE           = osp.join(osp.expanduser('~'), '.cache', PACKNAME, 'metadata.pickle')
+"""Compiled cache of the metadata JSON files (in the user cache folder, not in
+the package tree which may be read-only or shared).
+"""
+
+_METACACHE          = None
+
+FACREGISTRY         = {}
+"""Registry of the classes generated by :meth:`facilityFactory`.
+"""
+
+
+#==============================================================================
+#%% Class MetadataView
+
+class MetadataView(MutableMapping):
+    """Class used to represent a copy-on-write view over (nested) metadata: the
+    original metadata are never modified, changes are stored in the view only.
+
+        >>> view = MetadataView(metadata)
+        >>> view['options']['sep'] = ';' # metadata['options']['sep'] unchanged
+
+    Nested dictionaries are themselves returned as views, other containers (e.g.,
+    lists) are copied when first accessed.
+    """
+
+    #/************************************************************************/
+    def __init__(self, base):
+        self.__base = base
+        self.__local = {}
+        self.__deleted = set()
+
+    def __getitem__(self, key):
+        if key in self.__local:
+            return self.__local[key]
+        elif key in self.__deleted:
+            raise KeyError(key)
+        value = self.__base[key]
+        if isinstance(value, Mapping):
+            value = MetadataView(value)
+        elif isinstance(value, (list, set)):
+            value = deepcopy(value)
+        else:
+            return value
+        # keep the nested view/copy so that further changes are not lost
+        self.__local[key] = value
+        return value
+
+    def __setitem__(self, key, value):
+        self.__local[key] = value
+        self.__deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.__local.pop(key, None)
+        if key in self.__base:
+            self.__deleted.add(key)
+
+    def __iter__(self):
+        for key in self.__base:
+            if key not in self.__deleted:
+                yield key
+        for key in self.__local:
+            if key not in self.__base:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, key):
+        return key in self.__local or (key in self.__base and key not in self.__deleted)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    #/************************************************************************/
+    def to_dict(self):
+        """Return the metadata (including changes) as a plain dictionary.
+        """
+        return {k: v.to_dict() if isinstance(v, MetadataView) else deepcopy(v)
+                for (k, v) in self.items()}
+
+    copy = to_dict
+
+
+#==============================================================================
+#%% Function metadataHash
+
+def metadataHash(metadata, strict = False):
+    """Return a hash of (JSON-serialisable) metadata.
+
+        >>> key = metadataHash(metadata, strict = False)
+
+    Other objects are hashed through their representation, unless :data:`strict`
+    is set to True, in which case a TypeError is raised: e.g., the representation
+    of a callable or an instance changes from one call to the next.
+    """
+    def default(o):
+        if isinstance(o, (MetadataView, MetaDat)):
+            return o.to_dict()
+        elif strict is True:
+            raise TypeError("Object of type '%s' is not JSON serialisable" % type(o).__name__)
+        return repr(o)
+    return hashlib.sha1(json.dumps(metadata, sort_keys = True, default = default)
+                        .encode('utf-8')).hexdigest()
+
+
+#==============================================================================
+#%% Function loadMetadataFile
+
+def loadMetadataFile(src):
+    """Load a metadata JSON file through the compiled (pickled) metadata cache:
+    the file is parsed again only when its modification time or size changed.
+    A copy-on-write view over the cached metadata is returned.
+
+        >>> metadata = loadMetadataFile(src)
+    """
+    global _METACACHE
+    if _METACACHE is None:
+        try:
+            with open(METACACHE, 'rb') as fp:
+                _METACACHE = pickle.load(fp)
+            assert isinstance(_METACACHE, dict)
+        except:
+            # missing, unreadable or corrupted cache: the JSON files are parsed
+            _METACACHE = {}
+    src = osp.abspath(src)
+    stat = os.stat(src)
+    key = (stat.st_mtime_ns, stat.st_size)
+    try:
+        assert _METACACHE[src][0] == key
+    except (KeyError, AssertionError):
+        with open(src, 'r') as fp:
+            _METACACHE[src] = (key, json.load(fp))
+        try:
+            # write a temporary file first: concurrent processes may update the
+            # cache simultaneously
+            tmp = '%s.%s' % (METACACHE, os.getpid())
+            os.makedirs(osp.dirname(METACACHE), exist_ok = True)
+            with open(tmp, 'wb') as fp:
+                pickle.dump(_METACACHE, fp, protocol = pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, METACACHE)
+        except Exception:
+            logging.warning("\n! Metadata cache '%s' could not be updated !" % METACACHE)
+    return MetadataView(_METACACHE[src][1])
 
 
 #==============================================================================
@@ -129,7 +276,7 @@ class MetaDatNatFacility(MetaDatNat):
     """
 
     PROPERTIES = ['provider', 'country', 'lang', 'file', 'path',
-                  'columns', 'index', 'options', 'category', 'date']
+                  'columns', 'index', 'transform', 'options', 'category', 'date']
     #          {'country':{}, 'lang':{}, 'proj':None, 'file':'', 'path':'', 'columns':{}, 'index':[], 'options':{}}
 
     #/************************************************************************/
@@ -158,6 +305,7 @@ class MetaDatNatFacility(MetaDatNat):
                       'path':       '../../data/raw/',
                       'columns':    [ ],
                       'index':      { },
+                      'transform':  [ ],
                       'options':    {
                           'fetch': {},
                           'load': {
@@ -206,6 +354,12 @@ def facilityFactory(*args, **kwargs):
         >>>  NewHCS = facilityFactory(HCS, cc = CC1, coder = {'Bing', yourkey})
         >>>  NewFacility = facilityFactory(cc = CC2, coder = 'GISCO')
 
+    Classes are memoised in :data:`FACREGISTRY` by facility, (country) metadata
+    and options, so that repeated calls with the same arguments return the same
+    class; set :data:`cache` to False to always generate a new class. Classes
+    generated with arguments that are not JSON-serialisable (e.g., callables) are
+    never memoised.
+
     See also
     --------
     :meth:`~pyeudatnat.base.datnatFactory`.
@@ -218,73 +372,112 @@ def facilityFactory(*args, **kwargs):
         assert facility is None or isinstance(facility, (string_types, Mapping, MetaDat))
     except AssertionError:
         raise TypeError("Facility type '%s' not recognised - must be a string" % type(facility))
+    cache = kwargs.pop('cache', True)
     if facility is None:
         config = {}
     elif isinstance(facility, string_types):
         try:
             config = FACMETADATA[facility]
-        except AttributeError:
+        except KeyError:
             raise TypeError("Facility string '%s' not recognised - must be in '%s'" % (facility, list(FACILITIES.keys())))
         else:
-            config = MetaDatEUFacility(deepcopy(config), cat = facility)
+            # plain copy: the copy-on-write views stay internal to pyeufacility
+            config = MetaDatEUFacility(MetadataView(config).to_dict(), cat = facility)
+    elif isinstance(facility, MetadataView):
+        config = MetaDatEUFacility(facility.to_dict())
     elif isinstance(facility, Mapping):
         config = MetaDatEUFacility(facility)
     elif isinstance(facility, MetaDatEUFacility):
         config = facility.copy()
+    # only JSON-serialisable arguments are memoised
+    try:
+        key = (metadataHash(config, strict = True), metadataHash(kwargs, strict = True)) \
+            if cache is True else None
+    except (TypeError, ValueError):
+        key = None
+    if key in FACREGISTRY:
+        return FACREGISTRY[key]
+    # pyeudatnat is handed plain dictionaries, not views (e.g., metadata
+    # loaded with loadMetadataFile)
+    kwargs = {k: v.to_dict() if isinstance(v, MetadataView) else v for (k, v) in kwargs.items()}
     kwargs.update({'cls': { 'meta': MetaDatNatFacility, 'cfg': MetaDatEUFacility}})
-    return datnatFactory(config = config, **kwargs)
+    Facility = datnatFactory(config = config, **kwargs)
+    if key is not None:
+        FACREGISTRY[key] = Facility
+    return Facility
 
 
 #==============================================================================
-#%% Program run when loading the module
-
-# The code below is run when importing/loading the module config. It is used to
-# automatically:
-#   * load the facility configuration file(s) listed in FACMETADATA whenever
-#     it(they) exist(s), e.g. hcs.json is a file in the package directory
-#   * generate this(ese) file(s) in the opposite scenario.
+#%% Function loadFacilityMetadata
 
-for __fac in FACMETADATA.keys():
-    # for a given facility
-    __cfac = FACILITIES[__fac]['code']
+def loadFacilityMetadata(facility):
+    """Load the configuration of a facility from its configuration file (e.g.,
+    hcs.json in the package directory) when it exists, or generate this file
+    from the py-module of the facility otherwise.
 
-    # check facility's configuration file
-    __path = PACKPATH
-    try:
-        __fcfg = osp.join(__path, "%s.json" % __cfac)
-        assert osp.exists(__fcfg) and osp.isfile(__fcfg)
-    except AssertionError:
-        try:
-            __ccfg = osp.join(__path, "%s" % __cfac, "__init__.py")
-            # __ccfg = osp.join(__path, "%s.py" % __cfac)
-            assert osp.exists(__ccfg) and osp.isfile(__ccfg)
-        except AssertionError:
-            logging.warning("\n! No config file available for facility '%s' !" % __fac)
-            continue
-        else:
-            try:
-                imp = import_module('.%s' % __cfac, '%s' % PACKNAME)
-                assert __fac in dir(imp)
-                __info = getattr(imp, __fac, None)
-            except ImportError:
-                logging.warning("\n! Error with py-module for facility '%s' - will proceed without !" % __fac)
-                continue
-            else:
-                logging.warning("\n! Configuration file for facility '%s' will be created !" % __fac)
-                # with open(__fcfg, 'w') as __fp: Json.dump(__info, __fp)
-                __cfg = MetaDatEUFacility(__info, cat = __fac)
-                __cfg.dump(dest = __fcfg, indent = 4) #, sort_keys=True)
+        >>> info = loadFacilityMetadata(facility)
+    """
+    cfac = FACILITIES[facility]['code']
+    fcfg = osp.join(PACKPATH, "%s.json" % cfac)
+    if osp.exists(fcfg) and osp.isfile(fcfg):
+        info = loadMetadataFile(fcfg)
     else:
-        # with open(__fcfg, 'r') as __fp: __info = Json.load(__fp)
-        __cfg = MetaDatEUFacility(cat = __fac)
-        __info = __cfg.load(src = __fcfg)
-    finally:
-        # logging.warning("\n! Loading configuration data for facility '%s' !" % __fac)
-        FACMETADATA[__fac] = deepcopy(__info) # __info.copy()
-        FACMETADATA[__fac].update({"category": FACILITIES[__fac]})
+        ccfg = osp.join(PACKPATH, "%s" % cfac, "__init__.py")
+        if not (osp.exists(ccfg) and osp.isfile(ccfg)):
+            logging.warning("\n! No config file available for facility '%s' !" % facility)
+            return {}
+        try:
+            imp = import_module('.%s' % cfac, '%s' % PACKNAME)
+            assert facility in dir(imp)
+            info = getattr(imp, facility, None)
+        except (ImportError, AssertionError):
+            logging.warning("\n! Error with py-module for facility '%s' - will proceed without !" % facility)
+            return {}
+        logging.warning("\n! Configuration file for facility '%s' will be created !" % facility)
+        MetaDatEUFacility(info, cat = facility).dump(dest = fcfg, indent = 4) #, sort_keys=True)
+        info = MetadataView(info)
+    info.update({"category": FACILITIES[facility]})
+    return info
 
 
-try:
-    del(__fac, __cfac, __path)
-    del(__cfg, __info, __fcfg, __ccfg)
-except: pass
+#==============================================================================
+#%% Class FacilityMetadata
+
+class FacilityMetadata(MutableMapping):
+    """Dictionary of facilities' configurations: the configuration of a given
+    facility is loaded (or generated, see :meth:`loadFacilityMetadata`) on first
+    access only, so that importing the module does not read nor write any file.
+    """
+
+    #/************************************************************************/
+    def __init__(self, facilities):
+        self.__keys = list(facilities)
+        self.__data = {}
+
+    def __getitem__(self, facility):
+        if facility not in self.__keys:
+            raise KeyError(facility)
+        elif facility not in self.__data:
+            self.__data[facility] = loadFacilityMetadata(facility)
+        return self.__data[facility]
+
+    def __setitem__(self, facility, info):
+        if facility not in self.__keys:
+            self.__keys.append(facility)
+        self.__data[facility] = info
+
+    def __delitem__(self, facility):
+        self.__keys.remove(facility)
+        self.__data.pop(facility, None)
+
+    def __iter__(self):
+        return iter(self.__keys)
+
+    def __len__(self):
+        return len(self.__keys)
+
+    def __contains__(self, facility):
+        return facility in self.__keys
+
+
+FACMETADATA         = FacilityMetadata([__fac for __fac in FACILITIES.keys() if __fac!='Oth'])
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _duplicates
+
+Module implementing the detection of near-duplicate facilities, e.g. the same
+hospital reported twice under different identifiers and site names, possibly by
+different countries or sources.
+
+**Description**
+
+Candidate pairs are blocked with a spatial index (k-d tree of the locations on
+the unit sphere), so that only facilities within the search radius are compared
+(near-linear instead of quadratic); facilities with no coordinates are
+blocked on their country and postcode instead. Candidate pairs are then scored
+with the similarity of their names, streets and postcodes (Jaccard index of the
+character trigrams of the normalised strings) and of their locations.
+
+**Dependencies**
+
+*require*:      :mod:`unicodedata`, :mod:`re`, :mod:`numpy`, :mod:`pandas`, :mod:`scipy`
+
+*call*:         :mod:`pyeufacility.config`, :mod:`pyeufacility.geometry`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 18:03:27 2026
+
+#%%
+
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from scipy.spatial import cKDTree
+
+from pyeufacility.geometry import EARTHRADIUS, toCartesian, metresToChord
+
+RADIUS          = 250.
+"""Default search radius (in metres) of the spatial blocking.
+"""
+
+THRESHOLD       = 0.6
+"""Default minimum score of the candidate pairs reported.
+"""
+
+WEIGHTS         = {'name': 0.5, 'street': 0.2, 'postcode': 0.1, 'distance': 0.2}
+"""Weights of the similarities in the score of a pair; the weights of the fields
+missing for a pair are redistributed over the others.
+"""
+
+FIELDS          = ['id', 'name', 'street', 'postcode', 'cc', 'lat', 'lon']
+
+
+#%%
+#==============================================================================
+# String similarity
+#==============================================================================
+
+def normalise(s):
+    """Normalise strings: lowercase, no accent, alphanumeric characters only and
+    single blanks.
+    """
+    s = unicodedata.normalize('NFKD', str(s)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^0-9a-z]+', ' ', s.lower()).strip()
+
+
+def trigrams(s):
+    """Return the set of character trigrams of a string (padded with blanks),
+    or None when the string is empty/missing.
+    """
+    if s is None or (isinstance(s, float) and np.isnan(s)):
+        return None
+    s = normalise(s)
+    if s == '':
+        return None
+    s = '  %s ' % s
+    return frozenset(s[i:i+3] for i in range(len(s) - 2))
+
+
+def similarity(a, b):
+    """Return the Jaccard index of two sets of trigrams, NaN when any is missing.
+    """
+    if a is None or b is None:
+        return np.nan
+    return len(a & b) / len(a | b)
+
+
+#%%
+#==============================================================================
+# Blocking
+#==============================================================================
+
+def nearPairs(lat, lon, radius = RADIUS):
+    """Return the pairs (i, j), i < j, of points within :data:`radius` metres of
+    each other, together with their distance.
+
+        >>> i, j, dist = nearPairs(lat, lon, radius = RADIUS)
+
+    Points are indexed as unit vectors in a k-d tree, so that only the points
+    within the chord matching :data:`radius` are compared; no pair is missed at
+    high latitudes or across the antimeridian.
+    """
+    lat, lon = np.asarray(lat, dtype = float), np.asarray(lon, dtype = float)
+    pos = np.flatnonzero(~(np.isnan(lat) | np.isnan(lon)))
+    # chord of the radius, slightly widened against rounding errors: the exact
+    # distances are filtered below
+    chord = metresToChord(radius) * (1 + 1e-9)
+    pairs = cKDTree(toCartesian(lat[pos], lon[pos])).query_pairs(chord, output_type = 'ndarray') \
+        if len(pos) > 1 else np.empty((0, 2), dtype = np.int64)
+    i, j = pos[pairs[:, 0]], pos[pairs[:, 1]]
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    dist = haversine(lat[i], lon[i], lat[j], lon[j])
+    keep = dist <= radius
+    return i[keep], j[keep], dist[keep]
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Return the great-circle distance (in metres) between points.
+    """
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return 2 * EARTHRADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def keyPairs(keys):
+    """Return the pairs (i, j), i < j, of rows sharing the same (non missing) key.
+    """
+    keys = pd.Series(keys).reset_index(drop = True).dropna()
+    df = pd.DataFrame({'pos': keys.index, 'key': keys.values})
+    m = df.merge(df, on = 'key', suffixes = ('_i', '_j'))
+    m = m[m.pos_i < m.pos_j]
+    return m.pos_i.to_numpy(), m.pos_j.to_numpy()
+
+
+#%%
+#==============================================================================
+# Function findDuplicates
+#==============================================================================
+
+def findDuplicates(df, config = None, radius = RADIUS, threshold = THRESHOLD, weights = None):
+    """Detect the candidate pairs of near-duplicate facilities of a table.
+
+        >>> pairs = findDuplicates(df, config = None, radius = RADIUS,
+                                   threshold = THRESHOLD, weights = None)
+
+    The columns are named after the facility configuration :data:`config` (see
+    :data:`~pyeufacility.config.FACMETADATA`). Returns a dataframe with the ids,
+    country codes and names of both facilities of every pair, their distance (in
+    metres, when located), the similarities and the overall score, sorted by
+    decreasing score.
+    """
+    index = (config or {}).get('index', {})
+    cols = {f: index.get(f, {}).get('name', f) for f in FIELDS}
+    weights = weights or WEIGHTS
+    df = df.reset_index(drop = True)
+    # spatial blocking, and blocking on (country, postcode) for the facilities
+    # with no location
+    i, j, dist = nearPairs(df[cols['lat']], df[cols['lon']], radius = radius)
+    located = df[cols['lat']].notnull() & df[cols['lon']].notnull()
+    keys = df[cols['cc']].astype(str) + '|' + df[cols['postcode']].map(
+        lambda p: normalise(p) if isinstance(p, str) else (None if pd.isnull(p) else str(p)))
+    k_i, k_j = keyPairs(keys.where(~located & df[cols['postcode']].notnull()))
+    i, j = np.concatenate([i, k_i]), np.concatenate([j, k_j])
+    dist = np.concatenate([dist, np.full(len(k_i), np.nan)])
+    # similarities of the candidate pairs, the trigrams being computed once
+    # per facility
+    sims = {'distance': 1. - dist / radius}
+    for field in ('name', 'street', 'postcode'):
+        col = cols[field]
+        if col not in df.columns:
+            sims[field] = np.full(len(i), np.nan)
+            continue
+        grams = df[col].map(trigrams).to_numpy()
+        sims[field] = np.fromiter((similarity(grams[a], grams[b]) for (a, b) in zip(i, j)),
+                                  dtype = float, count = len(i))
+    w = {f: np.where(np.isnan(sims[f]), 0., weights.get(f, 0.)) for f in sims}
+    total = sum(w.values())
+    score = sum(w[f] * np.nan_to_num(sims[f]) for f in sims) / np.where(total > 0, total, 1)
+    pairs = pd.DataFrame({
+        '%s_1' % cols['id']: df[cols['id']].to_numpy()[i],
+        '%s_2' % cols['id']: df[cols['id']].to_numpy()[j],
+        '%s_1' % cols['cc']: df[cols['cc']].to_numpy()[i],
+        '%s_2' % cols['cc']: df[cols['cc']].to_numpy()[j],
+        '%s_1' % cols['name']: df[cols['name']].to_numpy()[i],
+        '%s_2' % cols['name']: df[cols['name']].to_numpy()[j],
+        'distance': dist,
+        **{'%s_sim' % f: sims[f] for f in ('name', 'street', 'postcode')},
+        'score': score
+        })
+    return pairs[pairs.score >= threshold].sort_values('score', ascending = False, kind = 'stable') \
+        .reset_index(drop = True)
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _geocache
+
+Module implementing a persistent cache of the geocoding results, shared by all
+the datasets and runs, so that an address already geocoded is never sent (and
+billed) again, whatever the dataset or the identifier of the record it comes
+from.
+
+**Description**
+
+Results are stored in a SQLite database (by default `~/.cache/pyeufacility/geocodes.sqlite`,
+or the file set in the environment variable `PYEUFACILITY_GEOCACHE`) and keyed
+by the geocoding engine, the country and the normalised address string (see
+:meth:`normaliseAddress`). Results older than :data:`ttl` are expired, and the
+least recently used ones are evicted beyond :data:`maxsize` entries. The cache
+keeps hit/miss statistics.
+
+It only depends on the standard library (but for :meth:`cachedLocate`, which
+imports :mod:`pandas` when called), so that it is also used by the stand-alone
+import scripts (e.g., `python-LV-import`), and it can be shared by several
+threads. In the harmonisation, the `locate` stage is wrapped (see
+:meth:`cachedLocate`) so that only the facilities whose address is not cached
+are geocoded.
+
+**Dependencies**
+
+*require*:      :mod:`os`, :mod:`atexit`, :mod:`re`, :mod:`json`, :mod:`time`, :mod:`sqlite3`,
+                :mod:`threading`, :mod:`unicodedata`
+
+*optional*:     :mod:`pandas` (:meth:`cachedLocate` only)
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 21:24:40 2026
+
+#%%
+
+from os import path as osp
+import os
+import logging
+import atexit
+import re
+import json
+import time
+import sqlite3
+import threading
+import unicodedata
+
+GEOCACHE        = os.environ.get('PYEUFACILITY_GEOCACHE') \
+    or osp.join(osp.expanduser('~'), '.cache', 'pyeufacility', 'geocodes.sqlite')
+"""Default location of the geocoding cache.
+"""
+
+TTL             = 365 * 24 * 3600
+"""Default time-to-live (in seconds) of the cached results.
+"""
+
+MAXSIZE         = 1000000
+"""Default maximum number of cached results.
+"""
+
+TOUCHES         = 1000
+"""Number of hits whose access times are kept in memory before being written.
+"""
+
+PLACE           = ['street', 'number', 'postcode', 'city']
+"""Default fields of the facility index composing the address geocoded.
+"""
+
+__CACHES        = {}
+
+
+#%%
+#==============================================================================
+# Function normaliseAddress
+#==============================================================================
+
+def normaliseAddress(address):
+    """Normalise an address string so that its trivial variants share the same
+    key: no accent, lowercase, punctuation replaced by blanks and single blanks.
+
+        >>> normaliseAddress('Brīvības iela 19,  RĪGA, LV-1010')
+        'brivibas iela 19 riga lv 1010'
+    """
+    if isinstance(address, (list, tuple)):
+        address = ' '.join(str(a) for a in address if a not in (None, ''))
+    address = unicodedata.normalize('NFKD', str(address or ''))
+    address = ''.join(c for c in address if not unicodedata.combining(c))
+    return re.sub(r'[\W_]+', ' ', address.lower()).strip()
+
+
+#==============================================================================
+# Class GeocodeCache
+#==============================================================================
+
+class GeocodeCache(object):
+    """Class used to store and retrieve geocoding results.
+
+        >>> with GeocodeCache(src = GEOCACHE, ttl = TTL, maxsize = MAXSIZE) as cache:
+        ...     result = cache.get(address, engine, country)
+        ...     if result is None:
+        ...         result = geocode(address)
+        ...         cache.put(address, engine, country, result)
+        >>> cache.stats()
+
+    Results are any JSON-serialisable objects, e.g. the raw response of the
+    engine or simply `{'lat': ..., 'lon': ...}`.
+    """
+
+    #/************************************************************************/
+    def __init__(self, src = None, ttl = TTL, maxsize = MAXSIZE):
+        self.src = src or GEOCACHE
+        self.ttl, self.maxsize = ttl, maxsize
+        if osp.dirname(self.src):
+            os.makedirs(osp.dirname(self.src), exist_ok = True)
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(self.src, check_same_thread = False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS geocodes ("
+                        "engine TEXT NOT NULL, country TEXT NOT NULL, address TEXT NOT NULL, "
+                        "result TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL, "
+                        "PRIMARY KEY (engine, country, address))")
+        self.db.execute("CREATE INDEX IF NOT EXISTS geocodes_accessed ON geocodes (accessed)")
+        self.db.commit()
+        self.counts = dict.fromkeys(['hits', 'misses', 'expired', 'puts', 'evicted'], 0)
+        self.touches = {}
+
+    #/************************************************************************/
+    def __enter__(self):
+        return self
+
+    #/************************************************************************/
+    def __exit__(self, *exc):
+        self.close()
+
+    #/************************************************************************/
+    def __len__(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+    #/************************************************************************/
+    @staticmethod
+    def key(address, engine, country):
+        return (str(engine or '').lower(), str(country or '').upper(), normaliseAddress(address))
+
+    #/************************************************************************/
+    def get(self, address, engine, country = None):
+        """Return the result cached for an address, or None (a miss) when it is
+        not cached or expired.
+        """
+        key = self.key(address, engine, country)
+        if key[2] == '':
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.db.execute("SELECT result, created FROM geocodes "
+                                  "WHERE engine = ? AND country = ? AND address = ?", key).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                with self.db:
+                    self.db.execute("DELETE FROM geocodes WHERE engine = ? AND country = ? AND address = ?", key)
+                self.counts['expired'] += 1
+                row = None
+            if row is None:
+                self.counts['misses'] += 1
+                return None
+            self.counts['hits'] += 1
+            # access times are written by batches
+            self.touches[key] = now
+            if len(self.touches) >= TOUCHES:
+                self.flush()
+        return json.loads(row[0])
+
+    #/************************************************************************/
+    def put(self, address, engine, country, result):
+        """Cache the result of an address (replacing any previous one).
+        """
+        key = self.key(address, engine, country)
+        if key[2] == '' or result is None:
+            return
+        now = time.time()
+        with self.lock, self.db:
+            self.db.execute("INSERT INTO geocodes (engine, country, address, result, created, accessed) "
+                            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(engine, country, address) DO UPDATE "
+                            "SET result = excluded.result, created = excluded.created, accessed = excluded.accessed",
+                            (*key, json.dumps(result, ensure_ascii = False), now, now))
+            self.counts['puts'] += 1
+            if self.maxsize is not None and self.counts['puts'] % max(1, self.maxsize // 100) == 0:
+                self.evict()
+
+    #/************************************************************************/
+    def flush(self):
+        """Write the access times of the last hits.
+        """
+        with self.lock:
+            if self.touches == {}:
+                return
+            with self.db:
+                self.db.executemany("UPDATE geocodes SET accessed = ? "
+                                    "WHERE engine = ? AND country = ? AND address = ?",
+                                    [(t, *key) for (key, t) in self.touches.items()])
+            self.touches = {}
+
+    #/************************************************************************/
+    def evict(self):
+        """Remove the expired results, then the least recently used ones beyond
+        :data:`maxsize` entries.
+        """
+        with self.lock:
+            self.flush()
+            with self.db:
+                if self.ttl is not None:
+                    n = self.db.execute("DELETE FROM geocodes WHERE created < ?",
+                                        (time.time() - self.ttl,)).rowcount
+                    self.counts['expired'] += n
+                if self.maxsize is not None:
+                    excess = len(self) - self.maxsize
+                    if excess > 0:
+                        self.db.execute("DELETE FROM geocodes WHERE rowid IN (SELECT rowid FROM geocodes "
+                                        "ORDER BY accessed LIMIT ?)", (excess,))
+                        self.counts['evicted'] += excess
+
+    #/************************************************************************/
+    def stats(self):
+        """Return the hit/miss statistics of the cache since it was opened.
+        """
+        with self.lock:
+            stats = dict(self.counts)
+        lookups = stats['hits'] + stats['misses']
+        stats.update({'size': len(self), 'hit_ratio': stats['hits'] / lookups if lookups else None})
+        return stats
+
+    #/************************************************************************/
+    def close(self):
+        with self.lock:
+            if self.db is None:
+                return
+            self.evict()
+            stats = self.stats()
+            self.db.close()
+            self.db = None
+        logging.warning("\n! Geocoding cache '%s': %s hit(s), %s miss(es), %s result(s) stored !"
+                        % (self.src, stats['hits'], stats['misses'], stats['size']))
+
+
+#%%
+#==============================================================================
+# Function openCache
+#==============================================================================
+
+def openCache(src = None, **kwargs):
+    """Return the cache stored in :data:`src`, opened once per process and
+    closed on exit.
+
+        >>> cache = openCache(src = None, ttl = TTL, maxsize = MAXSIZE)
+    """
+    src = osp.abspath(src or GEOCACHE)
+    if src not in __CACHES:
+        __CACHES[src] = GeocodeCache(src, **kwargs)
+        atexit.register(__CACHES[src].close)
+    return __CACHES[src]
+
+
+#==============================================================================
+# Function cachedLocate
+#==============================================================================
+
+def cachedLocate(cache, locate):
+    """Wrap a :meth:`locate_data` method so that the facilities whose address is
+    cached are located from the cache, and only the others are geocoded (their
+    locations, and any other column added by the geocoder, are then cached).
+
+        >>> locate_data = cachedLocate(cache, locate)
+
+    The address is composed of the fields :data:`place` of the `locate` options
+    (default: :data:`PLACE`), and the engine is the coder of the option `gc`.
+    Data already located are passed through. The facilities located from the
+    cache are passed through `locate` as well, so that its other effects (e.g.,
+    the geometry or the index of the coordinates) and its result are the same
+    as if they had been geocoded.
+    """
+    # only the harmonisation wraps its locate stage: the module itself does not
+    # depend on pandas
+    import pandas as pd
+    def scalar(v):
+        # cached values are JSON scalars, e.g. not geometries
+        v = v.item() if hasattr(v, 'item') else v
+        return v if isinstance(v, (str, int, float, bool)) and not pd.isna(v) else None
+    def locate_data(self, *args, **kwargs):
+        data, idx = self.data, self.idx
+        latlon = kwargs.get('latlon') or [idx.get('lat') or 'lat', idx.get('lon') or 'lon']
+        place = [idx.get(f) for f in kwargs.get('place') or PLACE]
+        place = [c for c in place if isinstance(c, str) and c in data.columns]
+        if place == [] or all(c in data.columns for c in latlon):
+            return locate(self, *args, **kwargs)
+        gc = kwargs.get('gc')
+        engine = next(iter(gc)) if isinstance(gc, dict) and gc != {} else (gc or 'default')
+        country = getattr(self, 'cc', None)
+        addresses = data[place].astype(object).where(data[place].notnull(), '').astype(str) \
+            .agg(' '.join, axis = 1)
+        cached = [cache.get(a, engine, country) for a in addresses]
+        missed = [c is None for c in cached]
+        hits = [not m for m in missed]
+        columns = list(data.columns)
+        def locateSubset(mask):
+            # run locate on the facilities of the mask only; their rows are merged
+            # back by index, which a locate resetting it loses
+            subset = data.loc[mask]
+            self.data = subset.copy()
+            try:
+                res = locate(self, *args, **kwargs)
+            finally:
+                located, self.data = self.data, data
+            if not located.index.equals(subset.index):
+                if len(located) != len(subset):
+                    raise IOError("Located data do not match the facilities geocoded")
+                located = located.set_axis(subset.index, axis = 0)
+            return res, located
+        res, lat, lon = None, latlon[0], latlon[1]
+        if any(missed):
+            res, located = locateSubset(missed)
+            lat, lon = self.idx.get('lat') or lat, self.idx.get('lon') or lon
+            if not (lat in located.columns and lon in located.columns):
+                return res
+            # the columns added by the geocoder (e.g., a quality flag) are cached too
+            cols = [lat, lon] + [c for c in located.columns if c not in columns and c not in (lat, lon)]
+            for col in cols:
+                data[col] = located[col].reindex(data.index)
+            for (a, values) in zip(addresses[missed], located[cols].itertuples(index = False, name = None)):
+                values = [scalar(v) for v in values]
+                if values[0] is not None and values[1] is not None:
+                    cache.put(a, engine, country, {k: v for (k, v) in zip(['lat', 'lon'] + cols[2:], values)
+                                                   if v is not None})
+        if any(hits):
+            found = [c for c in cached if c is not None]
+            for key in {k: None for c in found for k in c}:
+                col = {'lat': lat, 'lon': lon}.get(key, key)
+                if col not in data.columns:
+                    data[col] = float('nan') if col in (lat, lon) else None
+                data.loc[hits, col] = [c.get(key) for c in found]
+            # located already: passed through locate, not geocoded
+            self.idx.update({'lat': lat, 'lon': lon})
+            passed, located = locateSubset(hits)
+            res = passed if not any(missed) else res
+            for col in [c for c in located.columns if c not in columns and c not in (lat, lon)]:
+                if col not in data.columns:
+                    data[col] = located[col].reindex(data.index)
+                else:
+                    # the cached values prevail
+                    data.loc[hits, col] = data.loc[hits, col].combine_first(located[col])
+        self.idx.update({'lat': lat, 'lon': lon})
+        logging.warning("\n! %s facilities located from the geocoding cache, %s geocoded !"
+                        % (sum(hits), sum(missed)))
+        return res
+    return locate_data
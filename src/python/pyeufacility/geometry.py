@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _geometry
+
+Module implementing a vectorised point-in-polygon engine over administrative
+boundaries (e.g., countries), with a spatial index so that large sets of points
+can be tested against detailed boundaries.
+
+**Description**
+
+Boundaries are read from a local GeoJSON file (e.g., the `CNTR_RG_01M_2020_4326`
+countries from GISCO) of (multi)polygons in WGS 84 whose features are identified
+by a property (e.g., `CNTR_ID`). For every boundary, the edges of all its rings
+are indexed by horizontal strips of latitude: a point is then tested (even-odd
+rule) against the few edges of its strip only, after a bounding box prefilter.
+
+It also implements the (ellipsoidal) Lambert Azimuthal Equal Area projection of
+the European grids (`EPSG:3035`), so that grid coordinates are converted with no
+projection library, and the conversions between great-circle distances and
+chord distances on the unit sphere used by the spatial indexes of the locations.
+
+**Dependencies**
+
+*require*:      :mod:`json`, :mod:`numpy`, :mod:`pandas`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 17:12:45 2026
+
+#%%
+
+import json
+
+import numpy as np
+import pandas as pd
+
+STRIP           = 0.1
+"""Height (in degrees) of the strips of latitude used to index the edges.
+"""
+
+CELL            = 1.
+"""Size (in degrees) of the grid cells used to index the bounding boxes.
+"""
+
+BLOCKSIZE       = 2**20
+"""Maximum number of (point, segment) pairs evaluated at once by the distances.
+"""
+
+EARTHRADIUS     = 6371008.8
+"""Mean radius of the Earth (in metres).
+"""
+
+LAEA            = {'a': 6378137., 'f': 1 / 298.257222101,
+                   'lat0': 52., 'lon0': 10., 'x0': 4321000., 'y0': 3210000.}
+"""Parameters of the `EPSG:3035` (ETRS89-LAEA) projection: GRS 80 ellipsoid,
+origin and false easting/northing.
+"""
+
+
+#%%
+#==============================================================================
+# Geodesic conversions
+#==============================================================================
+
+def toCartesian(lat, lon):
+    """Return the 3D unit vectors of locations given in degrees.
+    """
+    phi, lam = np.radians(np.asarray(lat, dtype = float)), np.radians(np.asarray(lon, dtype = float))
+    cphi = np.cos(phi)
+    return np.stack([cphi * np.cos(lam), cphi * np.sin(lam), np.sin(phi)], axis = -1)
+
+
+def chordToMetres(chord):
+    """Convert chord distances on the unit sphere into great-circle distances
+    (in metres).
+    """
+    return 2 * EARTHRADIUS * np.arcsin(np.clip(np.asarray(chord) / 2, 0, 1))
+
+
+def metresToChord(dist):
+    """Convert great-circle distances (in metres) into chord distances on the
+    unit sphere.
+    """
+    return 2 * np.sin(np.minimum(np.asarray(dist, dtype = float) / EARTHRADIUS, np.pi) / 2)
+
+
+#%%
+#==============================================================================
+# LAEA projection
+#==============================================================================
+
+def _authalic(phi, e):
+    sphi = np.sin(phi)
+    return (1 - e**2) * (sphi / (1 - e**2 * sphi**2)
+                         - np.log((1 - e * sphi) / (1 + e * sphi)) / (2 * e))
+
+
+def _laea(params = None):
+    p = dict(LAEA, **(params or {}))
+    e = np.sqrt(p['f'] * (2 - p['f']))
+    phi0, lam0 = np.radians(p['lat0']), np.radians(p['lon0'])
+    qp, q0 = _authalic(np.pi / 2, e), _authalic(phi0, e)
+    beta0 = np.arcsin(q0 / qp)
+    rq = p['a'] * np.sqrt(qp / 2)
+    d = p['a'] * np.cos(phi0) / np.sqrt(1 - e**2 * np.sin(phi0)**2) / (rq * np.cos(beta0))
+    return p, e, lam0, qp, beta0, rq, d
+
+
+def toLAEA(lat, lon, params = None):
+    """Project geographical coordinates (in degrees) onto `EPSG:3035`.
+
+        >>> x, y = toLAEA(lat, lon)
+    """
+    p, e, lam0, qp, beta0, rq, d = _laea(params)
+    phi, dlam = np.radians(np.asarray(lat, dtype = float)), np.radians(np.asarray(lon, dtype = float)) - lam0
+    beta = np.arcsin(np.clip(_authalic(phi, e) / qp, -1, 1))
+    b = rq * np.sqrt(2 / (1 + np.sin(beta0) * np.sin(beta) + np.cos(beta0) * np.cos(beta) * np.cos(dlam)))
+    x = p['x0'] + b * d * np.cos(beta) * np.sin(dlam)
+    y = p['y0'] + b / d * (np.cos(beta0) * np.sin(beta) - np.sin(beta0) * np.cos(beta) * np.cos(dlam))
+    return x, y
+
+
+def fromLAEA(x, y, params = None):
+    """Convert `EPSG:3035` coordinates (in metres) into geographical coordinates
+    (in degrees).
+
+        >>> lat, lon = fromLAEA(x, y)
+    """
+    p, e, lam0, qp, beta0, rq, d = _laea(params)
+    dx, dy = np.asarray(x, dtype = float) - p['x0'], np.asarray(y, dtype = float) - p['y0']
+    rho = np.sqrt((dx / d)**2 + (d * dy)**2)
+    c = 2 * np.arcsin(np.clip(rho / (2 * rq), -1, 1))
+    with np.errstate(invalid = 'ignore', divide = 'ignore'):
+        beta = np.where(rho > 0, np.arcsin(np.clip(np.cos(c) * np.sin(beta0)
+                                                   + d * dy * np.sin(c) * np.cos(beta0) / rho, -1, 1)),
+                        beta0)
+    e2 = e**2
+    phi = beta + (e2 / 3 + 31 * e2**2 / 180 + 517 * e2**3 / 5040) * np.sin(2 * beta)  \
+        + (23 * e2**2 / 360 + 251 * e2**3 / 3780) * np.sin(4 * beta)                  \
+        + 761 * e2**3 / 45360 * np.sin(6 * beta)
+    lam = lam0 + np.arctan2(dx * np.sin(c),
+                            d * rho * np.cos(beta0) * np.cos(c) - d**2 * dy * np.sin(beta0) * np.sin(c))
+    return np.degrees(phi), np.degrees(lam)
+
+
+#%%
+#==============================================================================
+# Function loadBoundaries
+#==============================================================================
+
+def loadBoundaries(src, key = 'CNTR_ID', where = None):
+    """Load the rings of the (multi)polygons of a GeoJSON file, grouped by the
+    value of the property :data:`key` of their features.
+
+        >>> rings = loadBoundaries(src, key = 'CNTR_ID', where = None)
+
+    Only the features whose properties match all the values of the dictionary
+    :data:`where` (e.g., `{'LEVL_CODE': 3}`) are loaded when it is set. Returns a
+    dictionary mapping every identifier onto a list of rings, each as an array
+    of (lon, lat) vertices.
+    """
+    with open(src, 'r', encoding = 'utf-8') as fp:
+        geojson = json.load(fp)
+    features = geojson.get('features', [geojson,]) if isinstance(geojson, dict) else geojson
+    boundaries = {}
+    for feature in features:
+        geom = feature.get('geometry') or {}
+        polygons = [geom.get('coordinates', [])] if geom.get('type') == 'Polygon'       \
+            else geom.get('coordinates', []) if geom.get('type') == 'MultiPolygon'      \
+            else []
+        props = feature.get('properties') or {}
+        if where and any(props.get(k) != v for (k, v) in where.items()):
+            continue
+        code = props.get(key)
+        boundaries.setdefault(code, []).extend([np.asarray(ring, dtype = float)[:, :2]
+                                                for polygon in polygons for ring in polygon])
+    return boundaries
+
+
+#==============================================================================
+# Class PolygonIndex
+#==============================================================================
+
+class PolygonIndex(object):
+    """Class used to test whether points lie within given boundaries.
+
+        >>> index = PolygonIndex(loadBoundaries(src), strip = STRIP, cell = CELL)
+        >>> inside = index.contains(codes, lon, lat)
+        >>> codes = index.locate(lon, lat)
+    """
+
+    #/************************************************************************/
+    def __init__(self, boundaries, strip = STRIP, cell = CELL):
+        self.strip, self.cell = strip, cell
+        self.cells = None
+        self.bbox, self.edges, self.strips, self.segments, self.segstrips = {}, {}, {}, {}, {}
+        for (code, rings) in boundaries.items():
+            rings = [r for r in rings if len(r) > 2]
+            if rings == []:
+                continue
+            # edges (x1, y1, x2, y2) of all rings, holes included: the even-odd
+            # rule takes care of them
+            edges = np.concatenate([np.hstack([r, np.roll(r, -1, axis = 0)]) for r in rings])
+            self.segments[code] = edges
+            edges = edges[edges[:, 1] != edges[:, 3]]
+            self.edges[code] = edges
+            vertices = np.concatenate(rings)
+            self.bbox[code] = np.concatenate([vertices.min(axis = 0), vertices.max(axis = 0)])
+            # index of the edges (and of all segments) by strips of latitude
+            self.strips[code] = self.stripIndex(edges)
+            self.segstrips[code] = self.stripIndex(self.segments[code])
+
+    #/************************************************************************/
+    def band(self, y):
+        return np.floor(np.asarray(y) / self.strip).astype(np.int64)
+
+    #/************************************************************************/
+    def stripIndex(self, edges):
+        """Map every strip of latitude onto the array of the positions of the
+        edges crossing it.
+        """
+        ymin = np.minimum(edges[:, 1], edges[:, 3])
+        ymax = np.maximum(edges[:, 1], edges[:, 3])
+        lo, hi = self.band(ymin), self.band(ymax)
+        counts = hi - lo + 1
+        bands = np.repeat(lo, counts) + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        ids = np.repeat(np.arange(len(edges)), counts)
+        order = np.argsort(bands, kind = 'stable')
+        bands, ids = bands[order], ids[order]
+        keys, starts = np.unique(bands, return_index = True)
+        return dict(zip(keys.tolist(), np.split(ids, starts[1:])))
+
+    #/************************************************************************/
+    def __contains__(self, code):
+        return code in self.edges
+
+    #/************************************************************************/
+    def contains(self, codes, lon, lat):
+        """Test whether the points (:data:`lon`, :data:`lat`) lie within the
+        boundaries identified by :data:`codes` (one per point).
+
+        Returns a float array: 1 inside, 0 outside, NaN when the coordinates are
+        missing or the boundary unknown.
+        """
+        codes = np.asarray(codes, dtype = object)
+        lon, lat = np.asarray(lon, dtype = float), np.asarray(lat, dtype = float)
+        res = np.full(len(lon), np.nan)
+        valid = np.flatnonzero(~(np.isnan(lon) | np.isnan(lat)))
+        # points grouped by code at once
+        labels, uniques = pd.factorize(codes[valid])
+        order = np.argsort(labels, kind = 'stable')
+        starts = np.searchsorted(labels[order], np.arange(len(uniques) + 1))
+        for (k, code) in enumerate(uniques):
+            if code not in self.edges:
+                continue
+            sel = valid[order[starts[k]:starts[k+1]]]
+            x, y = lon[sel], lat[sel]
+            xmin, ymin, xmax, ymax = self.bbox[code]
+            # bounding box prefilter
+            inbox = (x >= xmin) & (x <= xmax) & (y >= ymin) & (y <= ymax)
+            res[sel] = 0
+            cand = sel[inbox]
+            bands = self.band(lat[cand])
+            edges, strips = self.edges[code], self.strips[code]
+            for b in np.unique(bands):
+                pts = cand[bands == b]
+                ids = strips.get(int(b))
+                if ids is None:
+                    continue
+                e = edges[ids]
+                px, py = lon[pts][:, None], lat[pts][:, None]
+                x1, y1, x2, y2 = e[:, 0], e[:, 1], e[:, 2], e[:, 3]
+                # even-odd rule: count the edges crossed by a ray cast eastwards
+                cross = (y1 > py) != (y2 > py)
+                xint = x1 + (py - y1) * (x2 - x1) / (y2 - y1)
+                res[pts] = ((cross & (px < xint)).sum(axis = 1) % 2).astype(float)
+        return res
+
+    #/************************************************************************/
+    def grid(self):
+        """Index the bounding boxes of the boundaries by the cells of a regular
+        grid (built once, on first use): every cell maps onto the array of the
+        positions (in :data:`codes`) of the boundaries whose bounding box
+        intersects it.
+        """
+        if self.cells is None:
+            self.codes = np.empty(len(self.bbox), dtype = object)
+            self.codes[:] = list(self.bbox.keys())
+            self.bboxes = np.asarray([self.bbox[c] for c in self.codes]).reshape(-1, 4)
+            cells = {}
+            for (i, (xmin, ymin, xmax, ymax)) in enumerate(self.bboxes):
+                cx = np.arange(np.floor(xmin / self.cell), np.floor(xmax / self.cell) + 1)
+                cy = np.arange(np.floor(ymin / self.cell), np.floor(ymax / self.cell) + 1)
+                for key in zip(np.repeat(cx, len(cy)).tolist(), np.tile(cy, len(cx)).tolist()):
+                    cells.setdefault(key, []).append(i)
+            self.cells = {key: np.asarray(ids, dtype = np.int64) for (key, ids) in cells.items()}
+        return self.cells
+
+    #/************************************************************************/
+    def locate(self, lon, lat):
+        """Return the code of the boundary containing every point (None when the
+        point lies in none), assuming the boundaries do not overlap.
+
+        All the points are queried at once: the candidate boundaries of a point
+        are those whose bounding box intersects its cell of the grid and contains
+        it, and the candidate pairs are then tested with :meth:`contains`.
+        """
+        lon, lat = np.asarray(lon, dtype = float), np.asarray(lat, dtype = float)
+        res = np.full(len(lon), None, dtype = object)
+        valid = np.flatnonzero(~(np.isnan(lon) | np.isnan(lat)))
+        if len(valid) == 0:
+            return res
+        cells = self.grid()
+        keys = np.stack([np.floor(lon[valid] / self.cell), np.floor(lat[valid] / self.cell)], axis = 1)
+        ukeys, inverse = np.unique(keys, axis = 0, return_inverse = True)
+        inverse = inverse.ravel()
+        order = np.argsort(inverse, kind = 'stable')
+        starts = np.searchsorted(inverse[order], np.arange(len(ukeys) + 1))
+        pts, ids = [], []
+        for (k, key) in enumerate(map(tuple, ukeys.tolist())):
+            cand = cells.get(key)
+            if cand is None:
+                continue
+            members = valid[order[starts[k]:starts[k+1]]]
+            pts.append(np.repeat(members, len(cand)))
+            ids.append(np.tile(cand, len(members)))
+        if pts == []:
+            return res
+        pts, ids = np.concatenate(pts), np.concatenate(ids)
+        # bounding box prefilter of the candidate pairs, then point-in-polygon
+        bbox, x, y = self.bboxes[ids], lon[pts], lat[pts]
+        inbox = (x >= bbox[:, 0]) & (x <= bbox[:, 2]) & (y >= bbox[:, 1]) & (y <= bbox[:, 3])
+        pts, codes = pts[inbox], self.codes[ids[inbox]]
+        inside = self.contains(codes, lon[pts], lat[pts]) == 1
+        res[pts[inside]] = codes[inside]
+        return res
+
+    #/************************************************************************/
+    def distance(self, codes, lon, lat, maxdist = None):
+        """Return the distance (in degrees) of the points to the edges of the
+        boundaries identified by :data:`codes` (NaN when unknown).
+
+        The points are processed at once per boundary and strip of latitude. With
+        :data:`maxdist` set, only the segments of the strips within that distance
+        of a point are searched, and the points farther away from any edge get an
+        infinite distance.
+        """
+        codes = np.asarray(codes, dtype = object)
+        lon, lat = np.asarray(lon, dtype = float), np.asarray(lat, dtype = float)
+        res = np.full(len(lon), np.nan)
+        valid = np.flatnonzero(~(np.isnan(lon) | np.isnan(lat)))
+        labels, uniques = pd.factorize(codes[valid])
+        order = np.argsort(labels, kind = 'stable')
+        starts = np.searchsorted(labels[order], np.arange(len(uniques) + 1))
+        for (k, code) in enumerate(uniques):
+            if code not in self.segments:
+                continue
+            sel = valid[order[starts[k]:starts[k+1]]]
+            segments = self.segments[code]
+            if maxdist is None:
+                groups = [(sel, segments)]
+            else:
+                res[sel] = np.inf
+                bands, span = self.band(lat[sel]), int(np.ceil(maxdist / self.strip))
+                strips, groups = self.segstrips[code], []
+                for b in np.unique(bands).tolist():
+                    ids = [strips[n] for n in range(b - span, b + span + 1) if n in strips]
+                    if ids != []:
+                        groups.append((sel[bands == b], segments[np.unique(np.concatenate(ids))]))
+            for (pts, e) in groups:
+                dx, dy = e[:, 2] - e[:, 0], e[:, 3] - e[:, 1]
+                norm = np.where(dx**2 + dy**2 > 0, dx**2 + dy**2, 1)
+                # blocks of points so that the pairs fit in memory
+                step = max(1, BLOCKSIZE // len(e))
+                for i in range(0, len(pts), step):
+                    px, py = lon[pts[i:i+step]][:, None], lat[pts[i:i+step]][:, None]
+                    t = np.clip(((px - e[:, 0]) * dx + (py - e[:, 1]) * dy) / norm, 0, 1)
+                    res[pts[i:i+step]] = np.sqrt((e[:, 0] + t * dx - px)**2
+                                                 + (e[:, 1] + t * dy - py)**2).min(axis = 1)
+        if maxdist is not None:
+            # the segments of the strips searched may lie farther away
+            res[res > maxdist] = np.inf
+        return res
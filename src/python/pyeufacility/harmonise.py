@@ -9,7 +9,8 @@ from all member states.
 
 **Dependencies**
 
-*require*:      :mod:`os`, :mod:`sys`, :mod:`collections`, :mod:`json`, :mod:`sys`
+*require*:      :mod:`os`, :mod:`sys`, :mod:`collections`, :mod:`json`, :mod:`sys`,
+                :mod:`concurrent.futures`
 
 *optional*:     :mod:`importlib`, :mod:`importlib`
 
@@ -24,12 +25,17 @@ from all member states.
 #%%
 
 from os import path as osp
+import os
 import inspect
 from sys import modules as sysmod#analysis:ignore
 import logging
 
-from collections import Mapping, Sequence
+from collections import Mapping, Sequence, OrderedDict
 from six import string_types
+from copy import deepcopy
+from contextlib import ExitStack
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 try:
     from optparse import OptionParser
@@ -44,11 +50,19 @@ except:
     import_module = lambda _mod, pack: exec('from %s import %s' % (pack, _mod.split('.')[1])) or None
 
 from pyeudatnat import COUNTRIES, AREAS
-from pyeudatnat.io import Json
 from pyeudatnat.base import PROCESSES
 
-from pyeufacility import PACKNAME, BASENAME, HARMONISE, FACILITIES
-from pyeufacility.config import MetaDatNatFacility, facilityFactory
+from pyeufacility import PACKNAME, PACKPATH, BASENAME, HARMONISE, FACILITIES
+from pyeufacility.config import FACMETADATA, MetaDatNatFacility, facilityFactory, loadMetadataFile, \
+    metadataHash
+from pyeufacility.manifest import BuildManifest
+from pyeufacility.instrument import Instrument
+from pyeufacility.stream import STREAMFMTS, readChunks, ChunkWriter
+from pyeufacility.transform import UNSTREAMABLE, transformPrepare
+from pyeufacility.schema import loadOptions, typeData
+from pyeufacility.checkpoint import Checkpoint
+from pyeufacility.regions import assignRegions
+from pyeufacility.geocache import GeocodeCache, openCache, cachedLocate
 
 __THISDIR       = osp.dirname(__file__)
 
@@ -99,12 +113,63 @@ def harmoniseFacilityData(facility, metadata, **kwargs):
             assert set(list(methods.keys())).difference(PROCESSES) == set()
         except:
             raise IOError("Wrong keys for METHODS - must be any from the list '%s'" % PROCESSES)
+    instrument = kwargs.pop('instrument', None)
+    try:
+        assert instrument is None or isinstance(instrument, Instrument)
+    except:
+        raise TypeError("Wrong INSTRUMENT - must be an instance of '%s'" % Instrument.__name__)
+    chunksize = kwargs.pop('chunksize', None)
+    try:
+        assert chunksize is None or (isinstance(chunksize, int) and chunksize > 0)
+    except:
+        raise TypeError("Wrong CHUNKSIZE - must be a positive integer")
+    else:
+        if chunksize is not None and on_disk is not True:
+            raise IOError("Streaming harmonisation only supported with ON_DISK flag set to True")
+    checkpoint = kwargs.pop('checkpoint', False)
+    try:
+        assert isinstance(checkpoint, bool)
+    except:
+        raise TypeError("Wrong CHECKPOINT flag")
+    resume_from = kwargs.pop('resume_from', None)
+    try:
+        assert resume_from is None or resume_from is True or resume_from in PROCESSES
+    except:
+        raise IOError("Wrong RESUME_FROM stage - must be True or any from the list '%s'" % PROCESSES)
+    regions = kwargs.pop('regions', None)
+    try:
+        assert regions is None or (isinstance(regions, Mapping)
+                                   and set(regions.keys()).difference({'nuts', 'lau'}) == set())
+    except:
+        raise TypeError("Wrong REGIONS - must be a dictionary of 'nuts'/'lau' boundary files")
+    geocache = kwargs.pop('geocache', None)
+    try:
+        assert geocache in (None, False, True) or isinstance(geocache, (string_types, GeocodeCache))
+    except:
+        raise TypeError("Wrong GEOCACHE - must be a flag, a cache file or a cache instance")
+    else:
+        if geocache is True or isinstance(geocache, string_types):
+            geocache = openCache(None if geocache is True else geocache)
+    compact = kwargs.pop('compact', False)
+    try:
+        assert isinstance(compact, bool)
+    except:
+        raise TypeError("Wrong COMPACT flag")
+    if chunksize is not None and any(t.get('op') in UNSTREAMABLE for t in metadata.get('transform') or []):
+        logging.warning("\n! Transforms %s not supported when streaming - harmonised in memory !" % UNSTREAMABLE)
+        chunksize = None
+    if chunksize is not None and (checkpoint is True or resume_from is not None):
+        logging.warning("\n! Checkpoints not supported when streaming - ignored !")
+        checkpoint, resume_from = False, None
+    country = kwargs.get('country')
+    country = country.get('code') if isinstance(country, Mapping) else country
     # create facility
     try:
         Facility = facilityFactory(cat = facility, meta = metadata, **kwargs)
     except:
         raise IOError("Impossible to create specific country class")
     # check wether some processes have been parsed
+    overrides = {}
     for proc, proc_data in methods.items():
         if proc_data is None:   continue
         try:
@@ -114,35 +179,162 @@ def harmoniseFacilityData(facility, metadata, **kwargs):
         else:
             logging.warning("Overriding country-specific method '%s_data' loaded" % proc)
             # for instance = Facility.prepare_data = prepare_data
-            setattr(Facility, '%s_data' % proc, proc_data)
+            overrides.update({'%s_data' % proc: proc_data})
+    # declarative transforms of the metadata run first in the prepare stage
+    transforms = metadata.get('transform')
+    if transforms:
+        overrides.update({'prepare_data': transformPrepare(transforms,
+                                                           overrides.get('prepare_data') or Facility.prepare_data)})
+    # addresses already geocoded are located from the cache
+    if geocache:
+        overrides.update({'locate_data': cachedLocate(geocache,
+                                                      overrides.get('locate_data') or Facility.locate_data)})
+    if overrides != {}:
+        # derive a subclass instead of patching Facility in place: concurrent
+        # runs (workers, notebooks) never share an overridden class
+        Facility = type(Facility.__name__, (Facility,), overrides)
     # create an country instance
     try:
         natFacility = Facility()
     except:
         raise IOError("Impossible to create specific facility instance")
     # process...
+    latlon = [FACMETADATA[facility].get('index', {}).get(l, {}).get('name', l) for l in ['lat', 'lon']]
+    def regions_data(**opts):
+        # not a method of the instance: the regions are added to the harmonised data
+        natFacility.data = assignRegions(natFacility.data, latlon = latlon, **opts)
+    def process(proc, **opts):
+        method = regions_data if proc == 'regions' else getattr(natFacility, '%s_data' % proc)
+        if instrument is None:
+            return method(**opts)
+        with instrument.stage(facility, getattr(natFacility, 'cc', None) or country,
+                              proc, natFacility):
+            return method(**opts)
+    if (checkpoint is True or resume_from is not None) and country is None:
+        raise IOError("Checkpoints only supported when the COUNTRY is set")
+    # the run options are part of the checkpoint key, e.g. a different geocoder
+    # or different regions invalidate the checkpoints
+    runopts = {'options': {proc: {k: v for (k, v) in (opts or {}).items() if k != 'usecols'}
+                           for (proc, opts) in options.items()},
+               'methods': {proc: '%s.%s' % (getattr(m, '__module__', None),
+                                            getattr(m, '__qualname__', type(m).__name__))
+                           for (proc, m) in methods.items() if m is not None},
+               'metadata': metadataHash(metadata.to_dict() if hasattr(metadata, 'to_dict') else metadata),
+               'regions': regions,
+               'geocache': bool(geocache)}
+    dumping = checkpoint is True
+    checkpoint = Checkpoint(facility, country, options = runopts) \
+        if checkpoint is True or resume_from is not None else None
+    # restart after the last good checkpoint (preceding RESUME_FROM stage)
+    restored = None
+    if resume_from is not None:
+        restored = checkpoint.restore(natFacility, before = None if resume_from is True else resume_from)
+        if restored is None:
+            logging.warning("\n! No checkpoint available - harmonisation run from start !")
     # fetch the data
-    try:
-        natFacility.fetch_data(**options.get('fetch',{}))
-    except:     pass
-    # load the actual data
-    natFacility.load_data(**options.get('load',{}))
-    # prepare/update the data
-    natFacility.prepare_data(**options.get('prepare',{}))
-    # geolocalise the data
-    natFacility.locate_data(**options.get('locate',{}))
-    # format/harmonise the data
+    if restored is None:
+        try:
+            process('fetch', **options.get('fetch',{}))
+        except:     pass
+    if chunksize is not None:
+        return streamFacilityData(facility, natFacility, chunksize, process,
+                                  dest = dest, options = options, regions = regions)
     opts = {'keep': True, 'force': True}
     opts.update(options.get('format',{}))
-    natFacility.format_data(**opts)
+    # load the actual data, prepare/update it, geolocalise it and format/harmonise it
+    stages = [('load', options.get('load',{})), ('prepare', options.get('prepare',{})),
+              ('locate', options.get('locate',{})), ('format', opts)]
+    if restored is not None:
+        stages = stages[[s for (s, _) in stages].index(restored)+1:]
+    for (proc, opts) in stages:
+        process(proc, **opts)
+        if dumping is True:
+            checkpoint.dump(proc, natFacility)
+    # assign the administrative regions of the located (and harmonised) data
+    if regions:
+        process('regions', **regions)
+    # compact the types of the data kept in memory only (on request): the
+    # published outputs keep their float64 coordinates and plain values
+    if compact is True and on_disk is None:
+        natFacility.data = typeData(natFacility.data, FACMETADATA[facility])
     # save the data
     if on_disk is None:
-        return natFacility
+        res = natFacility
     elif on_disk is False:
-        return natFacility.dump_data(**options.get('dump',{}))
+        res = process('dump', **options.get('dump',{}))
     else:
-        natFacility.save_data(dest = dest, **options.get('save',{}))
-        return natFacility
+        process('save', dest = dest, **options.get('save',{}))
+        res = natFacility
+    # all stages went through: checkpoints are no longer needed
+    if checkpoint is not None:
+        checkpoint.clear()
+    return res
+
+
+#%%
+#==============================================================================
+# Function streamFacilityData
+#==============================================================================
+
+def streamFacilityData(facility, natFacility, chunksize, process, dest = None, options = None,
+                       regions = None):
+    """Harmonise the data of a facility instance by chunks of rows: every chunk
+    is loaded, prepared, located, formatted and appended to the output file(s)
+    in turn so that the memory used does not depend on the size of the input.
+
+        >>> streamFacilityData(facility, natFacility, chunksize, process,
+                               dest = None, options = None, regions = None)
+
+    Country-specific :meth:`prepare_data` methods receive one chunk at a time
+    (as :data:`natFacility.data`). Only delimited text inputs and CSV/GeoJSON
+    outputs are supported.
+    """
+    options = options or {}
+    src = getattr(natFacility, 'file', None)
+    if src is not None and not osp.isabs(src):
+        src = osp.join(PACKPATH, getattr(natFacility, 'path', '') or '', src)
+    loadopts = dict((getattr(natFacility, 'options', None) or {}).get('load') or {})
+    loadopts.update(options.get('load', {}))
+    cfg = FACMETADATA[facility]
+    fmts = options.get('save', {}).get('fmt', STREAMFMTS)
+    fmts = [fmts,] if isinstance(fmts, string_types) else fmts
+    try:
+        assert set(fmts).difference(STREAMFMTS) == set()
+    except:
+        raise IOError("Wrong output formats '%s' - must be any from the list '%s'" % (fmts, STREAMFMTS))
+    if dest is None:
+        cc = getattr(natFacility, 'cc', None)
+        dest = {fmt: osp.join(PACKPATH, cfg.get('path', ''), fmt,
+                              '%s.%s' % (cc, cfg.get('options', {}).get('fmt', {}).get(fmt, fmt)))
+                for fmt in fmts}
+    elif len(fmts) == 1:
+        dest = {fmts[0]: dest}
+    else:
+        dest = {fmt: '%s.%s' % (osp.splitext(dest)[0], fmt) for fmt in fmts}
+    latlon = [cfg.get('index', {}).get(l, {}).get('name', l) for l in ['lat', 'lon']]
+    writers = [ChunkWriter(dest[fmt], fmt = fmt, latlon = latlon,
+                           sep = cfg.get('options', {}).get('sep', ','),
+                           encoding = cfg.get('options', {}).get('encoding', 'utf-8'))
+               for fmt in fmts]
+    # the processing methods (including country-specific ones) update the
+    # columns and indexes of the instance: restore them for every chunk
+    state = {attr: deepcopy(getattr(natFacility, attr)) for attr in ('cols', 'idx')
+             if hasattr(natFacility, attr)}
+    opts = {'keep': True, 'force': True}
+    opts.update(options.get('format',{}))
+    with ExitStack() as stack:
+        [stack.enter_context(writer) for writer in writers]
+        for chunk in readChunks(src, chunksize, **loadopts):
+            for (attr, value) in state.items():
+                setattr(natFacility, attr, deepcopy(value))
+            natFacility.data = chunk
+            process('prepare', **options.get('prepare',{}))
+            process('locate', **options.get('locate',{}))
+            process('format', **opts)
+            if regions:
+                process('regions', **regions)
+            [writer.write(natFacility.data) for writer in writers]
+    return natFacility
 
 
 #%%
@@ -150,10 +342,72 @@ def harmoniseFacilityData(facility, metadata, **kwargs):
 # Function harmoniseService
 #==============================================================================
 
+def _harmoniseWorker(facility, country, gc, kwargs):
+    """Run the harmonisation of a single country in a worker process.
+    """
+    # the instrument is a copy of the parent's one: start afresh and send the
+    # records back
+    instrument = kwargs.get('instrument')
+    if instrument is not None:
+        instrument.records = []
+    try:
+        res = harmoniseService(facility, country = country, gc = gc, **kwargs)
+    except Exception as e:
+        return e, getattr(instrument, 'records', None)
+    # facility instances derive from classes generated on the fly, hence they
+    # cannot be sent back to the parent process: only dumped data are returned
+    return (res if kwargs.get('on_disk') is False else None), getattr(instrument, 'records', None)
+
+
 def harmoniseService(facility, country = None, gc = None, **kwargs):
     """Generic harmonisation function.
 
-        >>> harmonise.harmoniseService(facility, country = None, gc = None, **kwargs)
+        >>> harmonise.harmoniseService(facility, country = None, gc = None,
+                                       workers = None, incremental = False, **kwargs)
+
+    When a list of countries is parsed, a summary dictionary is returned that
+    maps every country code onto either the output of the harmonisation or the
+    exception raised. With :data:`workers` > 1 (or 0 for all available cores),
+    each country is processed in a separate process; the harmonised instances
+    then stay in the workers and only dumped data (:data:`on_disk=False`) are
+    returned.
+
+    With :data:`chunksize` set (and :data:`on_disk` set to True), the input data
+    are harmonised by chunks of rows and appended to CSV/GeoJSON outputs; see
+    :meth:`streamFacilityData`. Countries whose transforms need all the rows at
+    once (e.g., `group-sum`) are harmonised in memory.
+
+    Unless a country-specific :meth:`load_data` method is used, only the input
+    columns declared in the country metadata are loaded, with the types of the
+    facility index; see :mod:`pyeufacility.schema`. With :data:`compact` set to
+    True, the categorical fields and coordinates of the data returned in memory
+    (:data:`on_disk` set to None) are stored compactly; the outputs written on
+    disk are never compacted.
+
+    With :data:`checkpoint` set to True, the state of the facility instance is
+    saved after every stage; a failed run can then be resumed with
+    :data:`resume_from` set to the stage to restart from (or True to restart
+    after the last good checkpoint), e.g. `resume_from='format'` so as not to
+    geocode again; see :class:`~pyeufacility.checkpoint.Checkpoint`. The
+    checkpoints are only reused by a run with the same sources and options.
+
+    With :data:`regions` set to a dictionary of local boundary files, e.g.
+    `{'nuts': 'NUTS_RG_01M_2021_4326.geojson', 'lau': 'LAU_RG_01M_2020_4326.geojson'}`,
+    the NUTS 0-3 (and LAU) codes of the located facilities are added to the
+    harmonised data; see :mod:`pyeufacility.regions`.
+
+    With :data:`geocache` set to True (or to a cache file), the facilities whose
+    address was already geocoded, in any run or dataset, are located from the
+    shared geocoding cache and only the others are geocoded; see
+    :mod:`pyeufacility.geocache`.
+
+    An :class:`~pyeufacility.instrument.Instrument` instance can be parsed through
+    :data:`instrument` so as to record the performance of every stage run.
+
+    With :data:`incremental` set to True (and :data:`on_disk` set to True), the
+    countries whose raw input, metadata, hook module and facility configuration
+    did not change since the last run are skipped (output None) and their
+    existing outputs reused; see :class:`~pyeufacility.manifest.BuildManifest`.
     """
     #if facility is None:
     #    facility = list(FACILITIES.keys())
@@ -161,21 +415,67 @@ def harmoniseService(facility, country = None, gc = None, **kwargs):
         raise TypeError("Wrong type for input service - must be the facility type")
     elif not facility in FACILITIES.keys():
         raise IOError("Service type not recognised - must be a string in the list '%s'" % list(FACILITIES.keys()))
+    workers = kwargs.pop('workers', None)
+    try:
+        assert workers is None or (isinstance(workers, int) and workers >= 0)
+    except:
+        raise TypeError("Wrong WORKERS number - must be a positive integer")
+    incremental = kwargs.pop('incremental', False)
+    try:
+        assert isinstance(incremental, bool)
+    except:
+        raise TypeError("Wrong INCREMENTAL flag")
+    if incremental is True and kwargs.get('on_disk') is not True:
+        logging.warning("\n! Incremental run ignored - outputs are not saved on disk !")
+        incremental = False
     if country is None:
         country = list(COUNTRIES.keys())
     if not isinstance(country, string_types) and isinstance(country, Sequence):
-        for ctry in country:
-            try:
-                harmoniseService(facility, country = ctry, gc = gc, **kwargs)
-            except:
-                continue
-        return
+        summary = OrderedDict([(ctry, None) for ctry in country])
+        manifest = BuildManifest(facility) if incremental is True else None
+        if manifest is not None:
+            country = [ctry for ctry in country if not manifest.uptodate(ctry)]
+            logging.warning("\n! Countries up-to-date - existing outputs reused: '%s' !"
+                            % [ctry for ctry in summary.keys() if ctry not in country])
+        if workers in (None, 1):
+            for ctry in country:
+                try:
+                    summary[ctry] = harmoniseService(facility, country = ctry, gc = gc, **kwargs)
+                except Exception as e:
+                    logging.warning("\n! Harmonisation failed for country '%s': %s !" % (ctry, e))
+                    summary[ctry] = e
+                else:
+                    if manifest is not None:    manifest.update(ctry)
+        else:
+            with ProcessPoolExecutor(max_workers = workers or os.cpu_count()) as pool:
+                futures = {pool.submit(_harmoniseWorker, facility, ctry, gc, kwargs): ctry
+                           for ctry in country}
+                for future in as_completed(futures):
+                    ctry = futures[future]
+                    try:
+                        res, records = future.result()
+                        if kwargs.get('instrument') is not None:
+                            kwargs['instrument'].extend(records)
+                        if isinstance(res, Exception):  raise res
+                        summary[ctry] = res
+                    except Exception as e:
+                        logging.warning("\n! Harmonisation failed for country '%s': %s !" % (ctry, e))
+                        summary[ctry] = e
+                    else:
+                        if manifest is not None:    manifest.update(ctry)
+        if manifest is not None:
+            manifest.dump()
+        return summary
     elif not isinstance(country, string_types):
         raise TypeError("Wrong type for input country code - must be the ISO 2-letter string")
     elif not country in COUNTRIES.keys():
         raise IOError("Country code not recognised - must be a code of the '%s' area(s)" % list(COUNTRIES.keys()))
     if not(gc is None or isinstance(gc, (string_types,Mapping))):
         raise TypeError("Coder type not recognised - must be a dictionary or a single string")
+    manifest = BuildManifest(facility) if incremental is True else None
+    if manifest is not None and manifest.uptodate(country):
+        logging.warning("\n! Country '%s' up-to-date - existing outputs reused !" % country)
+        return
     CC, METADATNAT = None, {}
     metadir = FACILITIES[facility].get('code')
     # generic name
@@ -183,6 +483,7 @@ def harmoniseService(facility, country = None, gc = None, **kwargs):
     # load country-dedicated module wmmhen available
     modname = ccname
     fname = '%s.py' % ccname
+    imp = None
     try:
         assert osp.exists(osp.join(__THISDIR, metadir, fname))
         # import_module('%s.%s' % (PACKNAME,modname) )
@@ -221,8 +522,8 @@ def harmoniseService(facility, country = None, gc = None, **kwargs):
         harmonise = harmoniseFacilityData
     else:
         logging.warning('\n! Country-specific formatting/harmonisation methods used !')
-    if 'methods' not in kwargs:
-        kwargs.update({'methods': {p:None for p in PROCESSES}})
+    # work on copies: the same kwargs are shared by all countries of a run
+    kwargs.update({'methods': dict(kwargs.get('methods') or {p:None for p in PROCESSES})})
     for proc in PROCESSES:
         try:
             # assert proc in dir(imp)
@@ -241,8 +542,7 @@ def harmoniseService(facility, country = None, gc = None, **kwargs):
     try:
         metafname = osp.join(__THISDIR, metadir, metafname)
         assert osp.exists(metafname)
-        with open(metafname, 'r') as fp:
-            metadata = Json.load(fp)
+        metadata = loadMetadataFile(metafname)
     except (AssertionError,FileNotFoundError):
         logging.warning("\n! No metadata JSON-file '%s' found - will proceed without !" % metafname)
     else:
@@ -253,18 +553,23 @@ def harmoniseService(facility, country = None, gc = None, **kwargs):
         raise IOError('No metadata parsed - this cannot end up well')
     try:
         kwargs.update({'country' : {'code': CC or country}})
-        if 'options' in kwargs.keys():
-            if 'locate' in kwargs['options'].keys():
-                kwargs['options']['locate'].update({'gc': gc})
-            else:
-                kwargs['options'].update({'locate': {'gc': gc}})
-        else:
-            kwargs.update({'options': {'locate': {'gc': gc}}})
+        options = {proc: dict(opts or {}) for (proc, opts) in kwargs.get('options', {}).items()}
+        options.setdefault('locate', {}).update({'gc': gc})
+        if kwargs['methods'].get('load') is None:
+            # load the columns used only, with the types of the schema
+            loadopts = loadOptions(metadata, FACMETADATA[facility],
+                                   hooked = any(m is not None for m in kwargs['methods'].values()))
+            loadopts.update(options.get('load', {}))
+            options.update({'load': loadopts})
+        kwargs.update({'options': options})
         res = harmonise(facility, metadata, **kwargs)
     except:
         raise IOError("Harmonisation process for country '%s' failed..." % country)
     else:
         logging.warning("\n! Harmonised data for country '%s' generated !" % country)
+    if manifest is not None:
+        manifest.update(country)
+        manifest.dump()
     return res
 
 
@@ -282,11 +587,12 @@ def __main():
         description=                                                        \
     """Harmonise input national data on facility services.""",
         usage=                                                              \
-    """usage:         harmonise facility <code> <gc> <key>
+    """usage:         harmonise facility <code> <gc> <key> <workers>
     facility :        Type of service.
     <code> :          Country code.
     <gc> ;            Geocoder.
-    <key> :           Geocoder key"""                                      \
+    <key> :           Geocoder key.
+    <workers> :       Number of worker processes."""                      \
                        )
 
     #parser.add_option("-s", "--service", action="store", dest="facility",
@@ -301,6 +607,36 @@ def __main():
     parser.add_option("-k", "--geokey", action="store", dest="key",
                       help="geocoder key.",
                       default=None)
+    parser.add_option("-w", "--workers", action="store", dest="workers",
+                      type="int", help="number of worker processes (0: all cores).",
+                      default=None)
+    parser.add_option("-i", "--incremental", action="store_true", dest="incremental",
+                      help="skip the countries whose inputs did not change (outputs saved on disk).",
+                      default=False)
+    parser.add_option("-n", "--chunksize", action="store", dest="chunksize",
+                      type="int", help="number of rows per chunk when streaming (outputs saved on disk).",
+                      default=None)
+    parser.add_option("--checkpoint", action="store_true", dest="checkpoint",
+                      help="save the state of the data after every stage.",
+                      default=False)
+    parser.add_option("--resume", action="store", dest="resume",
+                      help="stage to resume the harmonisation from (using checkpoints).",
+                      default=None)
+    parser.add_option("--nuts", action="store", dest="nuts",
+                      help="NUTS boundary file (GeoJSON) to assign the regions from.",
+                      default=None)
+    parser.add_option("--lau", action="store", dest="lau",
+                      help="LAU boundary file (GeoJSON) to assign the regions from.",
+                      default=None)
+    parser.add_option("--geocache", action="store_true", dest="geocache",
+                      help="locate the addresses already geocoded from the geocoding cache.",
+                      default=False)
+    parser.add_option("-p", "--profile", action="store", dest="profile",
+                      help="instrumentation report file (json, csv or prom).",
+                      default=None)
+    parser.add_option("-m", "--memory", action="store_true", dest="memory",
+                      help="trace memory peaks in the instrumentation report.",
+                      default=False)
     #parser.add_option("-r", "--dry-run", action="store_true", dest="dryrun",
     #                  help="run the script without creating the file")
     (opts, args) = parser.parse_args()
@@ -315,7 +651,7 @@ def __main():
     country = opts.country
     if isinstance(country, string_types):
         if country.upper() == 'ALL':
-            country = None
+            country = list(COUNTRIES.keys())
         elif country.upper() in AREAS:
             country = AREAS.get(country)
     elif country is not None:
@@ -330,13 +666,37 @@ def __main():
     elif gc is not None:
         parser.error("geocoder is required.")
 
+    resume = opts.resume
+    if resume is not None and resume not in PROCESSES:
+        parser.error("resume stage must be any from the list '%s'." % PROCESSES)
+
+    regions = {k: v for (k, v) in (('nuts', opts.nuts), ('lau', opts.lau)) if v is not None}
+
+    instrument = Instrument(memory = opts.memory) if opts.profile else None
+
+    # the data are only built in memory, unless the incremental or streamed
+    # runs need the outputs saved on disk
+    on_disk = True if opts.incremental or opts.chunksize is not None else None
+
     # run the generator
     try:
-        run(facility, country, gc)
+        res = run(facility, country, gc, workers = opts.workers,
+                  incremental = opts.incremental, on_disk = on_disk,
+                  chunksize = opts.chunksize, instrument = instrument,
+                  checkpoint = opts.checkpoint, resume_from = resume,
+                  regions = regions or None, geocache = opts.geocache or None)
     except IOError:
         logging.warning('\n!!!  ERROR: data file not created !!!')
     else:
-        logging.warning('\n!  OK: data file correctly created !')
+        failed = [ctry for (ctry, r) in res.items() if isinstance(r, Exception)] \
+            if isinstance(res, Mapping) else []
+        if failed != []:
+            logging.warning("\n!!!  ERROR: data file not created for countries '%s' !!!" % failed)
+        else:
+            logging.warning('\n!  OK: data file correctly created !')
+    finally:
+        if instrument is not None:
+            instrument.report(opts.profile)
 
 #try:
 #    del(__THISDIR)
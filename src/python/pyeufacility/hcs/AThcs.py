@@ -21,6 +21,8 @@ import re
 import numpy as np#analysis:ignore
 import pandas as pd#analysis:ignore
 
+from pyeufacility.address import splitStreetNumberPostcodeCity
+
 
 #%%
 
@@ -76,8 +78,8 @@ class Prepare_data():
         #[df[col].replace('\s+',' ',regex=True,inplace=True) for col in ['left','right']]
         #facility.data[['street', 'number']] = df['left'].str.rsplit(pat=' ', n=1, expand=True)
         #facility.data[['postcode', 'city']] = df['right'].str.split(pat=' ', n=2, expand=True)
-        facility.data[new_cols] = facility.data.apply(
-                lambda row: pd.Series(self.split_address(row['Adresse'])), axis = 1)
+        # vectorised version of split_address
+        facility.data[new_cols] = splitStreetNumberPostcodeCity(facility.data['Adresse'])
         # add the columns as inputs (they were created)
         facility.icolumns.extend([{'en':c} for c in new_cols])
         # add the data as outputs (they will be stored)
@@ -25,6 +25,8 @@ import re
 import numpy as np
 import pandas as pd
 
+from pyeufacility.address import splitStreetCommaNumber
+
 
 #%%
 
@@ -61,10 +63,8 @@ class Prepare_data():
         new_cols = ['street', 'number']
         facility.data.reindex(columns = [*cols, *new_cols], fill_value = "")
         # facility.data[['street', 'number']] = facility.data['address'].str.split(pat=',', n=2, expand=True)
-        facility.data[new_cols] = (
-            facility.data
-            .apply(lambda row: pd.Series(self.split_address(row['address'])), axis=1)
-            )
+        # vectorised version of split_address
+        facility.data['street'], facility.data['number'] = splitStreetCommaNumber(facility.data['address'])
         # add the columns as inputs (they were created)
         facility.cols.extend([{'en':c} for c in new_cols])
         # add the data as outputs (they will be stored)
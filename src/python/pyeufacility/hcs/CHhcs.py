@@ -21,6 +21,8 @@ import re
 import numpy as np#analysis:ignore
 import pandas as pd#analysis:ignore
 
+from pyeufacility.address import splitStreetNumber, splitPostcodeCity
+
 
 #%%
 
@@ -86,14 +88,10 @@ class Prepare_data():
         #facility.data[['postcode', 'city']] = df[1].str.split(pat=' ', n=2, expand=True)
         #facility.data['Adr'].replace('\s+',' ',regex=True,inplace=True)
         #facility.data[['street', 'number']] = facility.data['Adr'].str.split(pat=" ", n=2, expand=True)
-        facility.data[adr_cols] = (
-            facility.data
-            .apply(lambda row: pd.Series(self.split_adr(row['Adr'])), axis=1)
-            )
-        facility.data[ort_cols] = (
-            facility.data
-            .apply(lambda row: pd.Series(self.split_ort(row['Ort'])), axis=1)
-            )
+        # vectorised versions of split_adr and split_ort
+        facility.data['street'], facility.data['number'] = splitStreetNumber(facility.data['Adr'],
+                                                                             numeric = False)
+        facility.data['postcode'], facility.data['city'] = splitPostcodeCity(facility.data['Ort'])
         # add the columns as inputs (they were created)
         adr_cols.extend(ort_cols)
         facility.cols.extend([{'en':c} for c in adr_cols])
@@ -21,6 +21,8 @@ import re
 import numpy as np#analysis:ignore
 import pandas as pd#analysis:ignore
 
+from pyeufacility.address import splitTokensAddress
+
 
 #%%
 
@@ -72,10 +74,8 @@ class Prepare_data():
         cols = data.columns.tolist()
         new_cols = ['street', 'number', 'postcode', 'city']
         data.reindex(columns = [*cols, *new_cols], fill_value = "")
-        data[new_cols] =  (
-            data
-            .apply(lambda row: pd.Series(self.split_Adr(row['Address'])), axis=1)
-            )
+        # vectorised version of split_Adr
+        data[new_cols] = splitTokensAddress(data['Address'])
         return new_cols
 
     def set_pp(self, data):
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _instrument
+
+Module implementing the (opt-in) instrumentation of the harmonisation pipeline:
+wall time, CPU time, number of rows in/out and memory peak are recorded for
+every stage (`fetch`, `load`, `prepare`, `locate`, `format`, `save`) run on a
+given facility and country.
+
+**Dependencies**
+
+*require*:      :mod:`os`, :mod:`time`, :mod:`tracemalloc`, :mod:`json`, :mod:`csv`,
+                :mod:`contextlib`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 11:02:17 2026
+
+#%%
+
+from os import path as osp
+import os
+import logging
+import time
+import tracemalloc
+import json
+import csv
+
+from contextlib import contextmanager
+
+FIELDS          = ['facility', 'country', 'stage', 'status', 'wall', 'cpu',
+                   'rows_in', 'rows_out', 'mem_peak']
+"""Fields of the records reported for every stage.
+"""
+
+PROMPREFIX      = 'pyeufacility_stage'
+
+PROMLABELS      = ['facility', 'country', 'stage', 'status']
+
+PROMMETRICS     = {
+    'wall':     ('wall_seconds', "Wall time of a harmonisation stage."),
+    'cpu':      ('cpu_seconds', "CPU time of a harmonisation stage."),
+    'rows_in':  ('rows_in', "Number of rows before a harmonisation stage."),
+    'rows_out': ('rows_out', "Number of rows after a harmonisation stage."),
+    'mem_peak': ('memory_peak_bytes', "Memory peak (tracemalloc) of a harmonisation stage.")
+    }
+
+
+#%%
+#==============================================================================
+# Class Instrument
+#==============================================================================
+
+class Instrument(object):
+    """Class used to record performance metrics of the harmonisation stages.
+
+        >>> instrument = Instrument(memory = False)
+        >>> with instrument.stage(facility, country, 'load', natFacility):
+        ...     natFacility.load_data()
+        >>> instrument.report(dest, fmt = 'csv')
+    """
+
+    #/************************************************************************/
+    def __init__(self, memory = False):
+        self.memory = memory
+        self.records = []
+
+    #/************************************************************************/
+    @staticmethod
+    def rows(natFacility):
+        try:
+            return len(natFacility.data)
+        except:
+            return None
+
+    #/************************************************************************/
+    @contextmanager
+    def stage(self, facility, country, stage, natFacility = None):
+        """Context manager recording the metrics of a single stage run on
+        :data:`natFacility`, whether it succeeds or not.
+        """
+        record = dict.fromkeys(FIELDS)
+        record.update({'facility': facility, 'country': country, 'stage': stage,
+                       'rows_in': self.rows(natFacility), 'status': 'failed'})
+        tracing = self.memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        elif self.memory and hasattr(tracemalloc, 'reset_peak'):
+            # Python >= 3.9 only: the peak is otherwise that of the whole trace
+            tracemalloc.reset_peak()
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+            record['status'] = 'ok'
+        finally:
+            record.update({'wall': time.perf_counter() - wall,
+                           'cpu': time.process_time() - cpu,
+                           'rows_out': self.rows(natFacility)})
+            if self.memory:
+                record['mem_peak'] = tracemalloc.get_traced_memory()[1]
+            if tracing:
+                tracemalloc.stop()
+            self.records.append(record)
+
+    #/************************************************************************/
+    def extend(self, records):
+        """Append records collected elsewhere, e.g. in a worker process.
+        """
+        self.records.extend(records or [])
+
+    #/************************************************************************/
+    def report(self, dest, fmt = None):
+        """Save the records as a JSON, CSV or Prometheus textfile report; the
+        format is guessed from the extension of :data:`dest` when not set.
+        """
+        if fmt is None:
+            fmt = osp.splitext(dest)[1].lstrip('.').lower()
+        if fmt == 'json':
+            with open(dest, 'w') as fp:
+                json.dump(self.records, fp, indent = 4)
+        elif fmt == 'csv':
+            with open(dest, 'w', newline = '') as fp:
+                writer = csv.DictWriter(fp, fieldnames = FIELDS)
+                writer.writeheader()
+                writer.writerows(self.records)
+        elif fmt in ('prom', 'prometheus'):
+            self.prometheus(dest)
+        else:
+            raise IOError("Report format '%s' not recognised - must be any from 'json', 'csv' or 'prom'" % fmt)
+        logging.warning("\n! Instrumentation report '%s' created !" % dest)
+
+    #/************************************************************************/
+    def prometheus(self, dest):
+        """Save the records as a Prometheus textfile (e.g., for the textfile
+        collector of the node exporter); the file is replaced atomically.
+
+        The records sharing the same labels (e.g., the stages run on every chunk
+        when streaming) are aggregated into one sample: times and rows are
+        summed and the memory peak is the maximum.
+        """
+        samples = {}
+        for r in self.records:
+            labels = tuple(r.get(l) for l in PROMLABELS)
+            sample = samples.setdefault(labels, {})
+            for field in PROMMETRICS:
+                if r.get(field) is None:
+                    continue
+                elif field not in sample:
+                    sample[field] = r[field]
+                elif field == 'mem_peak':
+                    sample[field] = max(sample[field], r[field])
+                else:
+                    sample[field] += r[field]
+        escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        lines = []
+        for (field, (name, desc)) in PROMMETRICS.items():
+            values = [(labels, sample[field]) for (labels, sample) in samples.items() if field in sample]
+            if values == []:
+                continue
+            metric = '%s_%s' % (PROMPREFIX, name)
+            lines.extend(['# HELP %s %s' % (metric, desc), '# TYPE %s gauge' % metric])
+            lines.extend(['%s{%s} %s' % (metric, ','.join('%s="%s"' % (l, escape(v))
+                                                          for (l, v) in zip(PROMLABELS, labels)), value)
+                          for (labels, value) in values])
+        tmp = '%s.tmp' % dest
+        with open(tmp, 'w') as fp:
+            fp.write('\n'.join(lines) + '\n')
+        os.replace(tmp, dest)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _manifest
+
+Module implementing the build manifest used for incremental harmonisation: the
+content of all the files a country's output depends upon is fingerprinted so
+that unchanged countries are not processed again.
+
+**Dependencies**
+
+*require*:      :mod:`os`, :mod:`hashlib`, :mod:`json`, :mod:`datetime`
+
+*call*:         :mod:`pyeufacility`, :mod:`pyeufacility.config`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 10:12:41 2026
+
+#%%
+
+from os import path as osp
+import logging
+import hashlib
+import json
+
+from datetime import datetime
+
+from pyeufacility import PACKPATH, FACILITIES, BASENAME
+from pyeufacility.config import FACMETADATA, loadMetadataFile
+
+MANIFEST        = 'manifest.json'
+"""Name of the manifest file, stored alongside the harmonised outputs.
+"""
+
+BLOCKSIZE       = 2**20
+
+
+#%%
+#==============================================================================
+# Function fileHash
+#==============================================================================
+
+def fileHash(src, blocksize = BLOCKSIZE):
+    """Return the SHA-256 hexadecimal digest of the content of a file, or None
+    when the file does not exist.
+
+        >>> h = fileHash(src)
+    """
+    if src is None or not (osp.exists(src) and osp.isfile(src)):
+        return None
+    sha = hashlib.sha256()
+    with open(src, 'rb') as fp:
+        for block in iter(lambda: fp.read(blocksize), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+#==============================================================================
+# Class BuildManifest
+#==============================================================================
+
+class BuildManifest(object):
+    """Class used to represent the build manifest of a facility: for every
+    country, the fingerprint of its inputs and the list of outputs generated.
+
+        >>> manifest = BuildManifest(facility, src = None)
+        >>> if not manifest.uptodate(country):
+        ...     # harmonise country...
+        ...     manifest.update(country)
+        >>> manifest.dump()
+    """
+
+    #/************************************************************************/
+    def __init__(self, facility, src = None):
+        if not facility in FACMETADATA.keys():
+            raise IOError("Service type not recognised - must be a string in the list '%s'" % list(FACMETADATA.keys()))
+        self.facility = facility
+        self.config = FACMETADATA[facility]
+        self.metadir = osp.join(PACKPATH, FACILITIES[facility].get('code'))
+        self.src = src or osp.join(self.datadir, MANIFEST)
+        self.entries = {}
+        try:
+            with open(self.src, 'r') as fp:
+                self.entries = json.load(fp)
+        except FileNotFoundError:
+            pass
+        except ValueError:
+            logging.warning("\n! Manifest file '%s' corrupted - will be regenerated !" % self.src)
+
+    #/************************************************************************/
+    @property
+    def datadir(self):
+        return osp.abspath(osp.join(PACKPATH, self.config.get('path', '')))
+
+    #/************************************************************************/
+    def sources(self, country):
+        """Return the files the output of a country depends upon: its raw input,
+        its metadata file, its hook module and the facility configuration.
+        """
+        ccname = "%s%s" % (country, BASENAME.get(self.facility,''))
+        meta, inp = osp.join(self.metadir, '%s.json' % ccname), None
+        try:
+            metadata = loadMetadataFile(meta)
+        except (FileNotFoundError, ValueError):
+            pass
+        else:
+            fname = metadata.get('file') or ''
+            if not fname.startswith(('http://', 'https://', 'ftp://')):
+                inp = osp.abspath(osp.join(PACKPATH, metadata.get('path') or '', fname))
+        return {'input':    inp,
+                'metadata': meta,
+                'module':   osp.join(self.metadir, '%s.py' % ccname),
+                'config':   osp.join(PACKPATH, '%s.json' % BASENAME.get(self.facility,''))
+                }
+
+    #/************************************************************************/
+    def fingerprint(self, country):
+        """Return the content hashes of all the sources of a country.
+        """
+        return {k: fileHash(f) for (k, f) in self.sources(country).items()}
+
+    #/************************************************************************/
+    def outputs(self, country):
+        """Return the paths of the harmonised outputs of a country, one per
+        output format.
+        """
+        fmts = self.config.get('options', {}).get('fmt', {})
+        return [osp.join(self.datadir, fmt, '%s.%s' % (country, ext)) for (fmt, ext) in fmts.items()]
+
+    #/************************************************************************/
+    def uptodate(self, country, fingerprint = None):
+        """Check whether the outputs of a country were generated from the very
+        same sources and still exist.
+        """
+        entry = self.entries.get(country)
+        if entry is None:
+            return False
+        fingerprint = fingerprint or self.fingerprint(country)
+        # no raw input file available locally (e.g., fetched online): we
+        # cannot tell whether anything changed
+        if fingerprint.get('input') is None:
+            return False
+        return entry.get('fingerprint') == fingerprint                  \
+            and entry.get('outputs', []) != []                          \
+            and all(osp.exists(osp.join(self.datadir, f)) for f in entry.get('outputs', []))
+
+    #/************************************************************************/
+    def update(self, country, fingerprint = None):
+        """Record the current fingerprint of a country together with the outputs
+        available on disk.
+        """
+        self.entries[country] = {
+            'fingerprint':  fingerprint or self.fingerprint(country),
+            'outputs':      [osp.relpath(f, self.datadir) for f in self.outputs(country)
+                             if osp.exists(f)],
+            'date':         datetime.now().isoformat()
+            }
+
+    #/************************************************************************/
+    def dump(self, dest = None):
+        """Save the manifest as a JSON file.
+        """
+        with open(dest or self.src, 'w') as fp:
+            json.dump(self.entries, fp, indent = 4, sort_keys = True)
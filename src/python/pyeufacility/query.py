@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _query
+
+Module implementing an in-memory spatial index of the harmonised facilities, so
+that nearest, radius, bounding box and filtered queries are answered without
+scanning the data files.
+
+**Description**
+
+The harmonised table (e.g., `all.csv` in `data/healthcare/csv`) is loaded once
+and the locations are indexed with a KD-tree over their 3D unit vectors: the
+chord distance on the unit sphere is monotonic in the great-circle (haversine)
+distance, so that nearest and radius queries on the tree are exact. Queries
+accept arrays of locations (batched) and filters on the attributes of the
+facilities, e.g.:
+
+::
+
+    >>> index = loadFacilityIndex('HCS')
+    >>> dist, pos = index.nearest(lat, lon, k = 3, emergency = 'yes', min_cap_beds = 100)
+    >>> index.data.iloc[pos[0]]
+
+where the filters are given as :data:`column = value` (or list of values), or as
+:data:`min_column = value` / :data:`max_column = value` for numeric bounds. The
+KD-trees of the filtered subsets are cached, so that repeated filtered queries
+cost no more than unfiltered ones.
+
+**Dependencies**
+
+*require*:      :mod:`numpy`, :mod:`pandas`, :mod:`scipy`
+
+*call*:         :mod:`pyeufacility.config`, :mod:`pyeufacility.geometry`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 18:41:52 2026
+
+#%%
+
+from os import path as osp
+
+import numpy as np
+import pandas as pd
+
+from scipy.spatial import cKDTree
+
+from pyeufacility import PACKPATH
+from pyeufacility.config import FACMETADATA
+from pyeufacility.geometry import toCartesian, chordToMetres, metresToChord
+
+CACHESIZE       = 32
+"""Maximum number of KD-trees of filtered subsets kept in cache.
+"""
+
+
+#%%
+#==============================================================================
+# Class FacilityIndex
+#==============================================================================
+
+class FacilityIndex(object):
+    """Class used to query the harmonised facilities by location.
+
+        >>> index = FacilityIndex(data, config = FACMETADATA['HCS'])
+        >>> dist, pos = index.nearest(lat, lon, k = 1, **filters)
+        >>> dist, pos = index.within(lat, lon, radius, **filters)
+        >>> pos = index.bbox(lonmin, latmin, lonmax, latmax, **filters)
+
+    Positions returned refer to the rows of :data:`data` (-1 when there is no
+    match) and distances are in metres.
+    """
+
+    #/************************************************************************/
+    def __init__(self, data, config = None):
+        index = (config or {}).get('index', {})
+        lat = index.get('lat', {}).get('name', 'lat')
+        lon = index.get('lon', {}).get('name', 'lon')
+        self.config = config or {}
+        self.data = data.reset_index(drop = True)
+        self.lat = pd.to_numeric(self.data[lat], errors = 'coerce').to_numpy(dtype = float)
+        self.lon = pd.to_numeric(self.data[lon], errors = 'coerce').to_numpy(dtype = float)
+        self.located = ~(np.isnan(self.lat) | np.isnan(self.lon))
+        self.xyz = toCartesian(np.where(self.located, self.lat, 0), np.where(self.located, self.lon, 0))
+        # latitudes sorted once for the bounding box queries
+        self.order = np.flatnonzero(self.located)[np.argsort(self.lat[self.located], kind = 'stable')]
+        self.sortedlat = self.lat[self.order]
+        self.trees = {}
+
+    #/************************************************************************/
+    def __len__(self):
+        return len(self.data)
+
+    #/************************************************************************/
+    def select(self, **filters):
+        """Return the mask of the located facilities that satisfy the filters.
+        """
+        mask = self.located.copy()
+        for (key, value) in filters.items():
+            if value is None:
+                continue
+            bound, col = (key[:3], key[4:]) if key[:4] in ('min_', 'max_') else (None, key)
+            if col not in self.data.columns:
+                raise IOError("Filter column '%s' not found" % col)
+            if bound is not None:
+                values = pd.to_numeric(self.data[col], errors = 'coerce').to_numpy(dtype = float)
+                with np.errstate(invalid = 'ignore'):
+                    mask &= (values >= value) if bound == 'min' else (values <= value)
+            elif isinstance(value, (list, tuple, set, frozenset)):
+                mask &= self.data[col].isin(list(value)).to_numpy()
+            else:
+                mask &= (self.data[col] == value).to_numpy()
+        return mask
+
+    #/************************************************************************/
+    def tree(self, **filters):
+        """Return the KD-tree of the facilities satisfying the filters, the
+        positions of its points in :data:`data` and their mask; all are cached.
+        """
+        key = tuple(sorted((k, tuple(sorted(v)) if isinstance(v, (list, tuple, set, frozenset)) else v)
+                           for (k, v) in filters.items() if v is not None))
+        try:
+            return self.trees[key]
+        except KeyError:
+            pass
+        mask = self.select(**filters)
+        pos = np.flatnonzero(mask)
+        if len(self.trees) >= CACHESIZE:
+            self.trees.pop(next(iter(self.trees)))
+        self.trees[key] = (cKDTree(self.xyz[pos]) if len(pos) else None, pos, mask)
+        return self.trees[key]
+
+    #/************************************************************************/
+    def nearest(self, lat, lon, k = 1, **filters):
+        """Return the distances to and positions of the :data:`k` nearest facilities
+        of every location, as arrays of shape (n, k) (n the number of locations).
+        """
+        tree, pos, _ = self.tree(**filters)
+        xyz = toCartesian(np.atleast_1d(lat), np.atleast_1d(lon))
+        dist, res = np.full((len(xyz), k), np.inf), np.full((len(xyz), k), -1, dtype = np.int64)
+        if tree is None:
+            return dist, res
+        valid = ~np.isnan(xyz).any(axis = 1)
+        d, i = tree.query(xyz[valid], k = k)
+        d, i = d.reshape(-1, k), i.reshape(-1, k)
+        found = i < len(pos)
+        dist[valid] = np.where(found, chordToMetres(np.where(found, d, 0)), np.inf)
+        res[valid] = np.where(found, pos[np.minimum(i, len(pos) - 1)], -1)
+        return dist, res
+
+    #/************************************************************************/
+    def within(self, lat, lon, radius, sort = True, **filters):
+        """Return, for every location, the distances to and positions of the
+        facilities within :data:`radius` metres, as lists of arrays (sorted by
+        increasing distance unless :data:`sort` is False).
+        """
+        tree, pos, _ = self.tree(**filters)
+        xyz = toCartesian(np.atleast_1d(lat), np.atleast_1d(lon))
+        dist, res = [], []
+        for (p, ids) in zip(xyz, tree.query_ball_point(np.nan_to_num(xyz), metresToChord(radius))
+                            if tree is not None else [[]] * len(xyz)):
+            if np.isnan(p).any() or ids == []:
+                dist.append(np.empty(0))
+                res.append(np.empty(0, dtype = np.int64))
+                continue
+            ids = np.asarray(ids, dtype = np.int64)
+            d = chordToMetres(np.linalg.norm(self.xyz[pos[ids]] - p, axis = 1))
+            if sort is True:
+                o = np.argsort(d, kind = 'stable')
+                d, ids = d[o], ids[o]
+            dist.append(d)
+            res.append(pos[ids])
+        return dist, res
+
+    #/************************************************************************/
+    def bbox(self, lonmin, latmin, lonmax, latmax, **filters):
+        """Return the positions of the facilities within a bounding box (in
+        degrees).
+        """
+        lo = np.searchsorted(self.sortedlat, latmin, side = 'left')
+        hi = np.searchsorted(self.sortedlat, latmax, side = 'right')
+        cand = self.order[lo:hi]
+        lon = self.lon[cand]
+        cand = cand[(lon >= lonmin) & (lon <= lonmax)] if lonmin <= lonmax \
+            else cand[(lon >= lonmin) | (lon <= lonmax)]  # across the antimeridian
+        if filters:
+            cand = cand[self.tree(**filters)[2][cand]]
+        return np.sort(cand)
+
+
+#%%
+#==============================================================================
+# Function loadFacilityIndex
+#==============================================================================
+
+def loadFacilityIndex(facility, src = None, **kwargs):
+    """Load a harmonised data file (by default the file `all` gathering all the
+    countries) once into a :class:`FacilityIndex`.
+
+        >>> index = loadFacilityIndex(facility, src = None, **kwargs)
+
+    Keyword arguments are passed to :meth:`pandas.read_csv`.
+    """
+    cfg = FACMETADATA[facility]
+    options = cfg.get('options', {})
+    if src is None:
+        src = osp.join(PACKPATH, cfg.get('path', ''), 'csv',
+                       'all.%s' % options.get('fmt', {}).get('csv', 'csv'))
+    try:
+        assert osp.exists(src)
+    except:
+        raise FileNotFoundError("Input file '%s' not found" % src)
+    index = cfg.get('index', {})
+    kwargs.setdefault('dtype', {index.get(f, {}).get('name', f): str for f in ('id', 'postcode', 'number')})
+    data = pd.read_csv(src, encoding = options.get('encoding', 'utf-8'),
+                       sep = options.get('sep', ','), **kwargs)
+    return FacilityIndex(data, cfg)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _regions
+
+Module implementing the assignment of the administrative regions (NUTS 0 to 3
+and, when available, LAU) to the located facilities from local boundary files,
+e.g. the GISCO `NUTS_RG_01M_2021_4326.geojson` and `LAU_RG_01M_2020_4326.geojson`.
+
+**Description**
+
+NUTS codes are hierarchical (e.g., `BE`, `BE1`, `BE10`, `BE100`), so that every
+facility is only located in the NUTS 3 regions and the codes of the upper
+levels are derived from its NUTS 3 code by prefix. The point-in-polygon engine
+of :mod:`pyeufacility.geometry` is used: all the facilities are queried at once
+against a grid index of the bounding boxes of the regions. The spatial indexes
+of the boundaries are prepared once per file and kept in cache, so that the
+harmonisation of all countries prepares them only once per process.
+
+**Dependencies**
+
+*require*:      :mod:`os`, :mod:`numpy`, :mod:`pandas`
+
+*call*:         :mod:`pyeufacility.geometry`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 19:58:14 2026
+
+#%%
+
+from os import path as osp
+import logging
+
+import numpy as np
+import pandas as pd
+
+from pyeufacility.geometry import PolygonIndex, loadBoundaries
+
+NUTSKEY         = 'NUTS_ID'
+NUTSLEVEL       = 'LEVL_CODE'
+LAUKEY          = 'GISCO_ID'
+
+REGIONS         = ['nuts0', 'nuts1', 'nuts2', 'nuts3', 'lau']
+"""Output columns of the regions assigned.
+"""
+
+__INDEXES       = {}
+
+
+#%%
+#==============================================================================
+# Function regionIndex
+#==============================================================================
+
+def regionIndex(src, key, where = None):
+    """Return the spatial index of the boundaries of a file, prepared once and
+    kept in cache (as long as the file is unchanged).
+
+        >>> index = regionIndex(src, key, where = None)
+    """
+    src = osp.abspath(src)
+    try:
+        assert osp.exists(src)
+    except:
+        raise FileNotFoundError("Boundary file '%s' not found" % src)
+    ckey = (src, osp.getmtime(src), key, tuple(sorted((where or {}).items())))
+    if ckey not in __INDEXES:
+        __INDEXES[ckey] = PolygonIndex(loadBoundaries(src, key = key, where = where))
+        logging.warning("\n! Spatial index of %s regions prepared from '%s' !"
+                        % (len(__INDEXES[ckey].edges), src))
+    return __INDEXES[ckey]
+
+
+#==============================================================================
+# Function assignRegions
+#==============================================================================
+
+def assignRegions(data, nuts = None, lau = None, latlon = None):
+    """Add the NUTS 0 to 3 codes (from the boundary file :data:`nuts`) and the LAU
+    codes (from :data:`lau`) of the facilities as the columns :data:`REGIONS` of
+    a table (modified in place).
+
+        >>> data = assignRegions(data, nuts = None, lau = None, latlon = ['lat', 'lon'])
+
+    Facilities with no location, or located outside all regions, get no code.
+    """
+    if data is None or (nuts is None and lau is None):
+        return data
+    lat, lon = latlon or ['lat', 'lon']
+    y = pd.to_numeric(data[lat], errors = 'coerce').to_numpy(dtype = float)
+    x = pd.to_numeric(data[lon], errors = 'coerce').to_numpy(dtype = float)
+    if nuts is not None:
+        nuts3 = pd.Series(regionIndex(nuts, NUTSKEY, where = {NUTSLEVEL: 3}).locate(x, y),
+                          index = data.index, dtype = object)
+        for level in range(3):
+            data[REGIONS[level]] = nuts3.str[:level + 2]
+        data[REGIONS[3]] = nuts3
+    if lau is not None:
+        data[REGIONS[4]] = regionIndex(lau, LAUKEY).locate(x, y)
+    return data
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _schema
+
+Module implementing the schema-driven typing of the data: the facility index
+(e.g., `HCS` in :mod:`pyeufacility.hcs`) declares the type and allowed values of
+every output field, while the country metadata declare the input columns used.
+
+**Description**
+
+This is used to:
+
+* load only the input columns used (:data:`usecols`) with explicit types
+  (:data:`dtype`), so that unused raw columns are never materialised,
+* store the fields with few distinct values (:data:`CATEGORICALS`) as categoricals
+  and the geographical coordinates as `float32` (when the loss of precision is
+  negligible) in the harmonised data kept in memory, on request (the published
+  outputs are not compacted).
+
+**Dependencies**
+
+*require*:      :mod:`os`, :mod:`functools`, :mod:`operator`, :mod:`numpy`, :mod:`pandas`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 15:02:36 2026
+
+#%%
+
+from os import path as osp
+import logging
+
+from functools import partial
+from operator import contains
+
+import numpy as np
+import pandas as pd
+
+CATEGORICALS    = ['cc', 'country', 'PP', 'ER', 'geo_qual', 'type']
+"""Fields of the facility index stored as categoricals.
+"""
+
+COORDINATES     = ['lat', 'lon']
+"""Fields of the facility index stored as `float32` when precision allows.
+"""
+
+LATLONTOL       = 1e-5
+"""Maximum error (in degrees, i.e. about 1 m) tolerated when storing coordinates
+as `float32`.
+"""
+
+TYPEDFMTS       = ['.csv', '.txt', '.tsv', '.xls', '.xlsx']
+"""Input formats whose loading supports :data:`usecols` and :data:`dtype`.
+"""
+
+
+#%%
+#==============================================================================
+# Function usedColumns
+#==============================================================================
+
+def usedColumns(metadata):
+    """Return the set of input columns used by a country: those mapped onto the
+    output index, those declared in the `columns` section and those read by the
+    `transform` section of its metadata.
+
+        >>> used = usedColumns(metadata)
+    """
+    lang = (metadata.get('lang') or {}).get('code')
+    used = set([c for c in (metadata.get('index') or {}).values() if isinstance(c, str)])
+    used.update([col.get(lang) or col.get('en') for col in (metadata.get('columns') or [])
+                 if isinstance(col, dict)])
+    for transform in (metadata.get('transform') or []):
+        for key in ('column', 'columns', 'subset', 'by'):
+            cols = transform.get(key)
+            used.update([cols,] if isinstance(cols, str) else list(cols or []))
+    used.discard(None)
+    return used
+
+
+#==============================================================================
+# Function loadOptions
+#==============================================================================
+
+def loadOptions(metadata, config, hooked = False):
+    """Return the loading options derived from the schema: the columns used (as a
+    filter) and their types.
+
+        >>> options = loadOptions(metadata, config, hooked = False)
+
+    When the country has dedicated methods (e.g., :meth:`prepare_data` or
+    :meth:`format_data`, with :data:`hooked` set to True), the input columns these
+    methods need cannot be guessed: all columns are loaded, unless they are
+    declared in the `columns` section, and no column is loaded as categorical.
+    """
+    fname = metadata.get('file') or ''
+    if osp.splitext(fname)[1].lower() not in TYPEDFMTS:
+        return {}
+    options, index = {}, config.get('index', {})
+    dtype = {}
+    for (field, col) in (metadata.get('index') or {}).items():
+        if not isinstance(col, str) or field not in index:
+            continue
+        elif field in CATEGORICALS and hooked is False:
+            # hooks may assign new values (or fillna) on these columns
+            dtype.update({col: 'category'})
+        elif index[field].get('type') == str.__name__:
+            # e.g., postcodes and house numbers keep their leading zeros
+            dtype.update({col: str})
+    if dtype != {}:
+        options.update({'dtype': dtype})
+    if hooked is True and not metadata.get('columns'):
+        logging.warning("\n! Country-specific methods - all input columns loaded !")
+    else:
+        # a filter, rather than a list, ignores the columns missing in the data
+        options.update({'usecols': partial(contains, frozenset(usedColumns(metadata)))})
+    return options
+
+
+#==============================================================================
+# Function typeData
+#==============================================================================
+
+def typeData(data, config):
+    """Cast the harmonised data to compact types: categoricals for the fields in
+    :data:`CATEGORICALS` (with the allowed values declared first) and `float32`
+    for the coordinates when precision allows. The table is modified in place.
+
+        >>> data = typeData(data, config)
+    """
+    if data is None:
+        return data
+    index = config.get('index', {})
+    for field in CATEGORICALS:
+        col = index.get(field, {}).get('name', field)
+        if col not in data.columns or isinstance(data[col].dtype, pd.CategoricalDtype):
+            continue
+        values = list(index.get(field, {}).get('values') or [])
+        observed = [v for v in data[col].dropna().unique() if v not in values]
+        data[col] = pd.Categorical(data[col], categories = values + observed)
+    for field in COORDINATES:
+        col = index.get(field, {}).get('name', field)
+        if col not in data.columns:
+            continue
+        try:
+            coord = pd.to_numeric(data[col], errors = 'raise').astype(np.float64)
+        except (ValueError, TypeError):
+            continue
+        coord32 = coord.astype(np.float32)
+        err = np.abs(coord32.astype(np.float64) - coord)
+        if err.isnull().all() or err.max() <= LATLONTOL:
+            data[col] = coord32
+    return data
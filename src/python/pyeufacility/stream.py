@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _stream
+
+Module implementing chunked input/output so that very large national datasets
+can be harmonised with bounded memory: the input table is read by chunks of
+rows and the harmonised chunks are appended to the output files.
+
+**Dependencies**
+
+*require*:      :mod:`os`, :mod:`json`, :mod:`numpy`, :mod:`pandas`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 11:47:05 2026
+
+#%%
+
+from os import path as osp
+import logging
+import json
+
+import numpy as np
+import pandas as pd
+
+LOADOPTS        = ['sep', 'encoding', 'header', 'decimal', 'quotechar',
+                   'skiprows', 'usecols', 'dtype']
+"""Loading options parsed to :meth:`pandas.read_csv` when streaming.
+"""
+
+STREAMFMTS      = ['csv', 'geojson']
+"""Output formats supporting the appending of chunks.
+"""
+
+
+#%%
+#==============================================================================
+# Function readChunks
+#==============================================================================
+
+def readChunks(src, chunksize, **kwargs):
+    """Iterate over a delimited text file by chunks of :data:`chunksize` rows.
+
+        >>> for chunk in readChunks(src, chunksize, **options):
+        ...     pass
+    """
+    if osp.splitext(src)[1].lower() in ('.xls', '.xlsx', '.xml', '.html', '.json'):
+        raise IOError("Impossible to stream source data '%s' - only delimited text files supported" % src)
+    opts = {k: v for (k, v) in kwargs.items() if k in LOADOPTS and v is not None}
+    if 'enc' in kwargs and 'encoding' not in opts:
+        opts.update({'encoding': kwargs['enc']})
+    return pd.read_csv(src, chunksize = chunksize, **opts)
+
+
+#==============================================================================
+# Class ChunkWriter
+#==============================================================================
+
+class ChunkWriter(object):
+    """Class used to append chunks of data to an output CSV or GeoJSON file.
+
+        >>> with ChunkWriter(dest, fmt = 'geojson', latlon = ['lat', 'lon']) as writer:
+        ...     for chunk in chunks:
+        ...         writer.write(chunk)
+    """
+
+    #/************************************************************************/
+    def __init__(self, dest, fmt = 'csv', latlon = None, **kwargs):
+        if fmt not in STREAMFMTS:
+            raise IOError("Format '%s' not supported for streaming - must be any from the list '%s'" % (fmt, STREAMFMTS))
+        self.dest, self.fmt = dest, fmt
+        self.latlon = latlon or ['lat', 'lon']
+        self.sep = kwargs.pop('sep', ',')
+        self.encoding = kwargs.pop('encoding', 'utf-8')
+        self.columns, self.count = None, 0
+        self.fp = None
+
+    #/************************************************************************/
+    def __enter__(self):
+        self.fp = open(self.dest, 'w', encoding = self.encoding, newline = '')
+        if self.fmt == 'geojson':
+            self.fp.write('{"type": "FeatureCollection", "features": [\n')
+        return self
+
+    #/************************************************************************/
+    def __exit__(self, *exc):
+        if self.fmt == 'geojson':
+            self.fp.write('\n]}\n')
+        self.fp.close()
+        logging.warning("\n! %s rows written in output file '%s' !" % (self.count, self.dest))
+
+    #/************************************************************************/
+    def write(self, data):
+        """Append a chunk of data to the output file.
+        """
+        # the columns of the first chunk define the output schema
+        first = self.columns is None
+        if first:
+            self.columns = list(data.columns)
+        else:
+            data = data.reindex(columns = self.columns)
+        if self.fmt == 'csv':
+            data.to_csv(self.fp, sep = self.sep, header = first, index = False)
+        else:
+            lat, lon = self.latlon
+            props = [c for c in self.columns if c not in self.latlon]
+            records = (data[props]
+                       .astype(object)
+                       .where(data[props].notnull(), None)
+                       .to_dict('records'))
+            if lat in data.columns and lon in data.columns:
+                coords = data[[lon, lat]].to_numpy(dtype = float)
+            else:
+                coords = np.full((len(data), 2), np.nan)
+            features = [{'type': 'Feature',
+                         'geometry': None if np.isnan(xy).any() else
+                             {'type': 'Point', 'coordinates': xy.tolist()},
+                         'properties': rec}
+                        for (xy, rec) in zip(coords, records)]
+            if features != []:
+                self.fp.write(',\n' if self.count > 0 else '')
+                self.fp.write(',\n'.join(json.dumps(f, ensure_ascii = False, default = str)
+                                         for f in features))
+        self.count += len(data)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+.. _transform
+
+Module implementing the declarative column transforms run during the `prepare`
+stage of the harmonisation, as described in the `transform` section of the
+country metadata files (e.g., `HUhcs.json`).
+
+**Description**
+
+The `transform` section is a list of operations applied in turn on the whole
+input table, e.g.:
+
+::
+
+    "transform": [
+        {"op": "dropna-subset", "subset": ["A", "B"], "how": "all"},
+        {"op": "concat", "columns": ["Tel.körzet", "Telefonszám"], "sep": "-",
+         "into": "tel", "index": "tel"}
+    ]
+
+where the operations (:data:`op`) available are:
+
+* `concat`: join the string values of :data:`columns` with :data:`sep`,
+* `split`: split :data:`column` with the regular expression :data:`pat` (or with
+  any of the :mod:`pyeufacility.address` splitters, e.g. :data:`address` set to
+  `"splitStreetNumberPostcodeCity"`) into the list of columns :data:`into`,
+* `regex-extract`: extract the groups of the regular expression :data:`pat` from
+  :data:`column` into the columns :data:`into`,
+* `map-values`: map the values of :data:`column` through the dictionary
+  :data:`values` (other values set to :data:`default` when present),
+* `group-sum`: sum :data:`column` over the groups of rows sharing the same values
+  of :data:`by`,
+* `dropna-subset`: drop the rows with missing values (:data:`how` set to `"any"`
+  or `"all"`) in the :data:`subset` columns.
+
+The output column :data:`into` defaults to the input one; when :data:`index` is
+set, the output column is added to the harmonised fields under that name (like
+country hooks do with :data:`idx`).
+
+Transforms are run before the country-specific :meth:`prepare_data` method, if
+any. When streaming (see :meth:`~pyeufacility.harmonise.streamFacilityData`)
+they are run chunk by chunk, hence the datasets with operations that need all
+the rows at once (:data:`UNSTREAMABLE`, e.g. `group-sum`) are harmonised in
+memory instead.
+
+**Dependencies**
+
+*require*:      :mod:`numpy`, :mod:`pandas`
+
+*call*:         :mod:`pyeufacility.address`
+
+**Contents**
+"""
+
+# *since*:        Sun Oct 18 14:21:09 2026
+
+#%%
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from pyeufacility import address as addresses
+
+
+#%%
+#==============================================================================
+# Transform operations
+#==============================================================================
+
+def _columns(cols):
+    return [cols,] if isinstance(cols, str) else list(cols)
+
+
+def concat(data, columns, into, sep = '', strip = True, na = ''):
+    strings = [data[c].fillna(na).astype(str) for c in _columns(columns)]
+    if strip is True:
+        strings = [s.str.strip() for s in strings]
+    data[into] = strings[0].str.cat(strings[1:], sep = sep)
+    return [into,]
+
+
+def split(data, column, into, pat = r'\s*,\s*', address = None):
+    into = _columns(into)
+    if address is not None:
+        try:
+            splitter = getattr(addresses, address)
+        except AttributeError:
+            raise IOError("Address splitter '%s' not recognised" % address)
+        res = splitter(data[column])
+        res = res if isinstance(res, pd.DataFrame) else pd.concat(res, axis = 1)
+    else:
+        res = data[column].astype(str).str.split(pat, n = len(into) - 1, expand = True)
+    res = res.reindex(columns = res.columns[:len(into)])
+    res.columns = into[:res.shape[1]]
+    for c in into:
+        data[c] = res[c] if c in res.columns else np.nan
+    return into
+
+
+def extract(data, column, pat, into = None):
+    res = data[column].astype(str).str.extract(pat, expand = True)
+    into = _columns(into or column)
+    for (c, i) in zip(into, range(res.shape[1])):
+        data[c] = res[i]
+    return into
+
+
+def mapValues(data, column, values, into = None, **kwargs):
+    into = into or column
+    src = data[column]
+    if src.dtype != object:
+        # the keys of JSON dictionaries are strings
+        src = src.astype(str)
+    mask = src.isin(list(values.keys()))
+    data[into] = src.map(dict(values)).where(mask, kwargs.get('default', data[column]))
+    return [into,]
+
+
+def groupSum(data, column, by, into = None):
+    into = into or column
+    values = pd.to_numeric(data[column], errors = 'coerce')
+    data[into] = values.groupby([data[b] for b in _columns(by)], sort = False).transform('sum')
+    return [into,]
+
+
+def dropnaSubset(data, subset, how = 'any'):
+    data.dropna(subset = _columns(subset), how = how, inplace = True)
+    return []
+
+
+TRANSFORMS      = {'concat':            concat,
+                   'split':             split,
+                   'regex-extract':     extract,
+                   'map-values':        mapValues,
+                   'group-sum':         groupSum,
+                   'dropna-subset':     dropnaSubset
+                   }
+"""Operations available in the `transform` section of the metadata files.
+"""
+
+UNSTREAMABLE    = ['group-sum']
+"""Operations whose output depends on all the rows of the table, that cannot
+be run chunk by chunk.
+"""
+
+
+#%%
+#==============================================================================
+# Function transformData
+#==============================================================================
+
+def transformData(data, transforms):
+    """Run the declarative :data:`transforms` in turn on a table (modified in
+    place).
+
+        >>> index = transformData(data, transforms)
+
+    Returns the dictionary of output fields to add to the harmonised index.
+    """
+    index = {}
+    for (i, transform) in enumerate(transforms or []):
+        opts = dict(transform)
+        op = opts.pop('op', None)
+        try:
+            func = TRANSFORMS[op]
+        except KeyError:
+            raise IOError("Wrong transform operation '%s' - must be any from the list '%s'" % (op, list(TRANSFORMS.keys())))
+        field = opts.pop('index', None)
+        try:
+            into = func(data, **opts)
+        except KeyError as e:
+            raise IOError("Transform #%s ('%s') failed - column %s not found" % (i, op, e))
+        except TypeError:
+            raise IOError("Wrong arguments %s for transform '%s'" % (list(opts.keys()), op))
+        if field is not None:
+            field = _columns(field)
+            index.update({f: c for (f, c) in zip(field, into)})
+    logging.warning("\n! %s transform(s) run !" % len(transforms or []))
+    return index
+
+
+def transformPrepare(transforms, prepare):
+    """Wrap a :meth:`prepare_data` method so that the declarative :data:`transforms`
+    are run on the data before it.
+
+        >>> prepare_data = transformPrepare(transforms, prepare)
+    """
+    def prepare_data(self, *args, **kwargs):
+        index = transformData(self.data, transforms)
+        if index != {}:
+            # add the columns as inputs (they were created)
+            cols = [c.get('en') for c in self.cols if isinstance(c, dict)]
+            self.cols.extend([{'en': c} for c in index.values() if c not in cols])
+            # add the data as outputs (they will be stored)
+            self.idx.update(index)
+        return prepare(self, *args, **kwargs)
+    return prepare_data
@@ -8,7 +8,7 @@ Module data validation according to template.
 
 **Dependencies**
 
-*require*:      :mod:`os`, :mod:`sys`
+*require*:      :mod:`os`, :mod:`sys`, :mod:`json`, :mod:`functools`
 
 *optional*:     :mod:`A`
 
@@ -23,10 +23,15 @@ Module data validation according to template.
 #%%
 
 from os import path as osp
+import os
 import logging
 
-from collections import Mapping, Sequence#analysis:ignore
+from collections import Mapping, Sequence, OrderedDict#analysis:ignore
 from six import string_types
+from functools import partial
+import json
+
+from concurrent.futures import ProcessPoolExecutor
 
 import numpy as np#analysis:ignore
 import pandas as pd
@@ -37,106 +42,295 @@ except ImportError:
     logging.warning('\n! inline command deactivated !')
 
 from pyeudatnat import COUNTRIES, AREAS
-from pyeudatnat.misc import Type
 from pyeufacility.config import FACMETADATA
 from pyeudatnat.io import DEF_ENCODING, DEF_SEP
 
-from pyeufacility import PACKNAME, VALIDATE, FACILITIES
+from pyeufacility import PACKNAME, PACKPATH, VALIDATE, FACILITIES
+from pyeufacility.geometry import PolygonIndex, loadBoundaries
+from pyeufacility.duplicates import findDuplicates, RADIUS, THRESHOLD
 
 __THISDIR       = osp.dirname(__file__)
 
 MINMAX_LL = {'lat': [-90., 90.], 'lon': [-180., 180.]}
 
+TOLERANCE       = 0.01
+"""Distance (in degrees, i.e. about 1 km) to the border of its country within
+which a location is still deemed plausible, e.g. on the coast.
+"""
+
+BOUNDARYKEY     = 'CNTR_ID'
+"""Property identifying the countries in the boundary file.
+"""
+
+NSAMPLE         = 5
+"""Number of identifiers of failing rows reported per rule.
+"""
+
 
 #%%
 #==============================================================================
-# Function validateFacilityData
+# Class FacilitySchema
 #==============================================================================
 
-def validateFacilityData(facility, src):
-    ocfg = FACMETADATA[facility]
-    oopts = ocfg.get('options', {})
-    enc, sep = oopts.get('enc', DEF_ENCODING), oopts.get('sep', DEF_SEP)
-    #if not osp.exists(src):
-    #    raise FileNotFoundError('input file %s not found - nothing to check' % src)
-    try:
-        df = pd.read_csv(src, encoding = enc, sep = sep)
-    #except FileNotFoundError:      # we tested that already...
-    #    raise FileNotFoundError('input file %s not found - nothing to check' % src)
-    except:
-        try:
-            df = pd.read_table(src, encoding = enc, sep = sep, compression = 'infer')
-        except:     raise IOError("Impossible to load source data - format not recognised")
-    oindex = ocfg.get('index',{}).copy()
-    nindex = [col.get('name') for col in oindex.values()]
-    try:
-        columns = set(list(df.columns)).difference(set(nindex))
-        assert columns == set()
-    except AssertionError:
-        raise IOError("Unknown column present in the dataframe: '%s'" % list(columns))
-    else:
-        try:
-            columns = set(list(nindex)).difference(set(df.columns))
-            assert columns == set()
-        except AssertionError:
-            logging.warning("\n! Missing columns in source file: '%s' !" % list(columns))
-    nindex = {col.get('name'): col for col in oindex.values()}
-    for col in df.columns:
-        # check missing values
-        try:
-            assert df[col].isnull().any() is np.bool_(False)
-        except AssertionError:
-            try:
-                assert df[col].isnull().all() is np.bool_(False)
-            except AssertionError:
-                logging.warning("\n! Column '%s' empty - missing values only !" % col)
-                continue
-        else:
-            # logging.warning("\n! No missing values in column '%s' !" % col)
-            pass
-        # check type
-        dtype = nindex[col].get('type')
-        if dtype == 'str':
-            pass #
-        elif dtype is not None:
-            try:
-                assert df[col].dtype==object or df[col].dtype in Type.pytname2npt(dtype) # and dtype != object
-            except AssertionError:
-                logging.warning("\n! Unexpected type '%s' for column '%s' !" % (df[col].dtype,col))
-        # check values/format
-        dfmt = values = nindex[col].get('values')
-        if values is not None:
-            # check values range
-            if dtype == "datetime":
-                # check date format
-                try:
-                    pd.to_datetime(df[col], format=dfmt, errors='coerce').notnull().all() is True
-                except AssertionError:
-                    logging.warning("\n! Unexpected date format for column '%s' !" % col)
+class FacilitySchema(object):
+    """Class used to compile the index of a facility (see :data:`FACMETADATA`) into
+    a set of validation rules that are evaluated on a whole table at once.
+
+        >>> schema = FacilitySchema(facility)
+        >>> report = schema.validate(df)
+
+    Every entry of the report describes a rule that failed: its name (:data:`rule`),
+    the column checked (:data:`column`), its severity (:data:`level`, `error` or
+    `warning`), the number of failing rows (:data:`count`) and the identifiers
+    of a few of them (:data:`sample`).
+
+    With :data:`boundaries` (a GeoJSON file of country boundaries, or an already
+    built :class:`~pyeufacility.geometry.PolygonIndex`), the locations are also
+    checked against the boundary of their country (`outside` rule, with a
+    :data:`tolerance` in degrees) and for swapped coordinates (`swapped` rule).
+    """
+
+    KINDS = {'int': 'iu', 'float': 'iuf', 'datetime': 'M'}
+
+    #/************************************************************************/
+    def __init__(self, facility, nsample = NSAMPLE, boundaries = None, **kwargs):
+        self.facility, self.nsample = facility, nsample
+        self.config = FACMETADATA[facility]
+        options = self.config.get('options', {})
+        self.encoding = options.get('encoding', options.get('enc', DEF_ENCODING))
+        self.sep = options.get('sep', DEF_SEP)
+        index = self.config.get('index', {})
+        self.index = {col.get('name'): col for col in index.values()}
+        self.columns = list(self.index.keys())
+        self.id = index.get('id', {}).get('name')
+        self.latlon = {lL: index.get(lL, {}).get('name') for lL in MINMAX_LL}
+        # compile the row-wise rules: (rule, column(s), level, function of the
+        # column(s) returning the mask of failing rows)
+        self.rules = []
+        for (col, cfg) in self.index.items():
+            dtype, values = cfg.get('type'), cfg.get('values')
+            if values is None:
+                pass
+            elif dtype == 'datetime':
+                # the values store the date format
+                self.rules.append(('format', col, 'warning', partial(self.badDates, dfmt = values)))
             else:
-                try:
-                    values = [values,] if not isinstance(values, Sequence) else values
-                    assert df[col].dropna().isin(values).all()
-                except AssertionError:
-                    raise IOError("Wrong input values in column '%s'" % col)
-    # check id uniquiness
-    try: # note the use of INDEX here, not nindex, though the names end up being
-        # the same
-        assert df[oindex.get('id',{})['name']].dropna().is_unique is True
-    except AssertionError:
-        raise IOError("Duplicated identifier IDs")
-    # check geographical coordinates
-    for lL in ['lat','lon']:
-        col = oindex.get(lL,{})['name']
-        if col in df.columns:
+                values = [values,] if isinstance(values, string_types) or not isinstance(values, Sequence) \
+                    else list(values)
+                self.rules.append(('values', col, 'error', partial(self.badValues, values = values)))
+        for (lL, col) in self.latlon.items():
+            if col is not None:
+                self.rules.append(('range', col, 'error', partial(self.badRange, bounds = MINMAX_LL[lL])))
+        # spatial plausibility against the boundaries of the countries
+        self.boundaries, self.tolerance = None, kwargs.pop('tolerance', TOLERANCE)
+        self.located = None
+        cc = index.get('cc', {}).get('name')
+        if boundaries is not None and None not in (cc, *self.latlon.values()):
+            self.boundaries = boundaries if isinstance(boundaries, PolygonIndex)     \
+                else PolygonIndex(loadBoundaries(boundaries, key = kwargs.pop('key', BOUNDARYKEY)))
+            cols = [self.latlon['lat'], self.latlon['lon'], cc]
+            self.rules.append(('outside', cols, 'error', partial(self.badLocation, swapped = False)))
+            self.rules.append(('swapped', cols, 'error', partial(self.badLocation, swapped = True)))
+
+    #/************************************************************************/
+    @staticmethod
+    def badValues(s, values):
+        return s.notnull() & ~s.isin(values)
+
+    @staticmethod
+    def badDates(s, dfmt):
+        return s.notnull() & pd.to_datetime(s, format = dfmt, errors = 'coerce').isnull()
+
+    @staticmethod
+    def badRange(s, bounds):
+        s = pd.to_numeric(s, errors = 'coerce')
+        return s.notnull() & ~s.between(*bounds)
+
+    #/************************************************************************/
+    def locations(self, lat, lon, cc):
+        """Check that the locations lie within their country, up to the tolerance
+        :data:`self.tolerance`; return the masks of the locations outside and of
+        those that would lie within their country if latitude and longitude were
+        swapped.
+
+        Both the `outside` and `swapped` rules use these masks: they are computed
+        once per chunk, whose columns are passed as the same series to the rules.
+        """
+        if self.located is not None and all(a is b for (a, b) in zip(self.located[0], (lat, lon, cc))):
+            return self.located[1]
+        lat_ = pd.to_numeric(lat, errors = 'coerce').to_numpy(dtype = float)
+        lon_ = pd.to_numeric(lon, errors = 'coerce').to_numpy(dtype = float)
+        cc_ = cc.to_numpy(dtype = object)
+        bad = self.boundaries.contains(cc_, lon_, lat_) == 0
+        sel = np.flatnonzero(bad)
+        # coordinates swapped, e.g. in the input data
+        inverted = np.zeros(len(lat_), dtype = bool)
+        inverted[sel] = self.boundaries.contains(cc_[sel], lat_[sel], lon_[sel]) == 1
+        bad &= ~inverted
+        # locations close to the border, e.g. on the coast
+        sel = np.flatnonzero(bad)
+        bad[sel] = ~(self.boundaries.distance(cc_[sel], lon_[sel], lat_[sel],
+                                              maxdist = self.tolerance) <= self.tolerance)
+        self.located = ((lat, lon, cc), (bad, inverted))
+        return bad, inverted
+
+    #/************************************************************************/
+    def badLocation(self, lat, lon, cc, swapped = False):
+        """Return the mask of the locations outside their country (with
+        :data:`swapped` set to False) or of those with swapped coordinates (with
+        :data:`swapped` set to True); see :meth:`locations`.
+        """
+        return self.locations(lat, lon, cc)[1 if swapped is True else 0]
+
+    #/************************************************************************/
+    def badType(self, col, kinds, integral = True):
+        """Check the type of a column given the dtype kinds it was read with
+        (one per chunk): columns of strings are always accepted, as are integral
+        floats for integer columns (e.g., with missing values).
+        """
+        expected = self.KINDS.get(self.index[col].get('type'))
+        # the dtype a whole column would be read with
+        kind = 'O' if 'O' in kinds or ('b' in kinds and len(kinds) > 1)       \
+            else 'f' if 'f' in kinds else list(kinds)[0]
+        if expected is None or kind == 'O' or kind in expected:
+            return False
+        elif kind == 'f' and 'i' in expected:
+            return not integral
+        return True
+
+    #/************************************************************************/
+    def ids(self, df, mask):
+        return df.loc[mask, self.id] if self.id in df.columns else df.index[mask].to_series()
+
+    #/************************************************************************/
+    def entry(self, rule, col, level, count, sample = None):
+        return {'rule': rule, 'column': col, 'level': level, 'count': int(count),
+                'sample': list(sample or [])}
+
+    #/************************************************************************/
+    def validateColumns(self, columns):
+        """Check the columns of a table against the schema.
+        """
+        report = []
+        unknown = [c for c in columns if c not in self.index]
+        if unknown != []:
+            report.append(self.entry('unknown', unknown, 'error', len(unknown)))
+        missing = [c for c in self.columns if c not in columns]
+        if missing != []:
+            report.append(self.entry('missing', missing, 'warning', len(missing)))
+        return report
+
+    #/************************************************************************/
+    def validate(self, df):
+        """Evaluate all the rules on a table in a single pass and return the
+        report of the rules that failed.
+        """
+        return self.validateChunks([df,])
+
+    #/************************************************************************/
+    def validateChunks(self, chunks):
+        """Evaluate all the rules on a table read by chunks, keeping running
+        aggregates only (number of rows, null counts, failing row counts and
+        samples, occurrences of every identifier), and return the same report as
+        :meth:`validate` on the whole table.
+        """
+        report, columns, nrows = None, [], 0
+        nulls, kinds, integral = {}, {}, {}
+        fails = {i: [0, []] for i in range(len(self.rules))}
+        seen = {}
+        for df in chunks:
+            if report is None:
+                report = self.validateColumns(list(df.columns))
+                columns = [c for c in self.columns if c in df.columns]
+            nrows += len(df)
+            n = df[columns].isnull().sum()
+            for col in columns:
+                nulls[col] = nulls.get(col, 0) + n[col]
+                kinds.setdefault(col, set()).add(df[col].dtype.kind)
+                if df[col].dtype.kind == 'f':
+                    s = df[col].dropna()
+                    integral[col] = integral.get(col, True) and np.array_equal(s, np.floor(s))
+            # the very same series are passed to all the rules of the chunk
+            series = {c: df[c] for c in columns}
+            for (i, (rule, col, level, func)) in enumerate(self.rules):
+                cols = [col,] if isinstance(col, string_types) else col
+                if not all(c in columns for c in cols):
+                    continue
+                mask = np.asarray(func(*[series[c] for c in cols]), dtype = bool)
+                fails[i][0] += mask.sum()
+                if len(fails[i][1]) < self.nsample:
+                    sample = fails[i][1]
+                    sample.extend([x for x in self.ids(df, mask).drop_duplicates() if x not in sample])
+                    del sample[self.nsample:]
+            if self.id in columns:
+                # occurrences of the identifiers, in order of first appearance
+                codes, uniques = pd.factorize(df[self.id])
+                counts = np.bincount(codes[codes >= 0], minlength = len(uniques))
+                for (x, c) in zip(uniques, counts):
+                    seen[x] = seen.get(x, 0) + c
+        self.located = None
+        report = report or []
+        # empty columns are not checked any further
+        empty = [c for c in columns if nulls[c] == nrows]
+        report.extend([self.entry('empty', c, 'warning', nrows) for c in empty])
+        report.extend([self.entry('type', c, 'warning', nrows - nulls[c])
+                       for c in columns if c not in empty
+                       and self.badType(c, kinds[c], integral.get(c, True))])
+        report.extend([self.entry(rule, col, level, *fails[i])
+                       for (i, (rule, col, level, _)) in enumerate(self.rules)
+                       if all(c in columns and c not in empty
+                              for c in ([col,] if isinstance(col, string_types) else col))])
+        if self.id in columns:
+            dups = [(x, c) for (x, c) in seen.items() if c > 1]
+            report.append(self.entry('unique', self.id, 'error', sum(c for (_, c) in dups),
+                                     [x for (x, _) in dups[:self.nsample]]))
+        return [e for e in report if e['count'] != 0]
+
+    #/************************************************************************/
+    def read(self, src, **kwargs):
+        # identifiers are read as strings so that chunks agree on their type
+        kwargs.setdefault('dtype', {self.id: str})
+        try:
+            return pd.read_csv(src, encoding = self.encoding, sep = self.sep, **kwargs)
+        except:
             try:
-                assert (df[col]
-                        .dropna()
-                        .between(MINMAX_LL[lL][0],MINMAX_LL[lL][1])
-                        .all()) is np.bool_(True)
-            except AssertionError:
-                raise IOError("Wrong input values for %s geographical coordinate '%s'" % lL)
-    # something else to check?
+                return pd.read_table(src, encoding = self.encoding, sep = self.sep,
+                                     compression = 'infer', **kwargs)
+            except:     raise IOError("Impossible to load source data - format not recognised")
+
+
+#%%
+#==============================================================================
+# Function validateFacilityData
+#==============================================================================
+
+def validateFacilityData(facility, src, schema = None, chunksize = None):
+    """Validate a harmonised data file against the (compiled) facility schema.
+
+        >>> report = validateFacilityData(facility, src, schema = None, chunksize = None)
+
+    All the rules are evaluated: no exception is raised on invalid data, the
+    report listing every rule that failed is returned instead (see
+    :class:`FacilitySchema`). With :data:`chunksize` set, the file is streamed
+    by chunks of rows so that memory stays bounded, and the very same report is
+    returned.
+    """
+    schema = schema or FacilitySchema(facility)
+    if chunksize is None:
+        return schema.validate(schema.read(src))
+    return schema.validateChunks(schema.read(src, chunksize = chunksize))
+
+
+def logReport(report, src = None):
+    """Log the entries of a validation report and return whether it contains any
+    error.
+    """
+    for e in report:
+        logging.warning("\n! %s: rule '%s' failed on column '%s' for %s row(s)%s%s !"
+                        % (e['level'].upper(), e['rule'], e['column'], e['count'],
+                           " - e.g. %s" % e['sample'] if e['sample'] else '',
+                           " in '%s'" % src if src else ''))
+    return any(e['level'] == 'error' for e in report)
 
 
 #%%
@@ -144,46 +338,172 @@ def validateFacilityData(facility, src):
 # Function validateService
 #==============================================================================
 
+__SCHEMA        = None
+
+def _initWorker(schema):
+    """Set the schema compiled in the parent process once per worker process.
+    """
+    global __SCHEMA
+    __SCHEMA = schema
+
+
+def _validateWorker(src, chunksize = None):
+    """Validate a single file in a worker process.
+    """
+    try:
+        return validateFacilityData(__SCHEMA.facility, src, schema = __SCHEMA, chunksize = chunksize)
+    except Exception as e:
+        return e
+
+
+def facilitySource(facility, country, fmt = 'csv'):
+    """Return the path of the harmonised data file of a country.
+    """
+    cfg = FACMETADATA[facility]
+    return osp.join(PACKPATH, cfg.get('path', ''), fmt,
+                    '%s.%s' % (country, cfg.get('options', {}).get('fmt', {}).get(fmt, fmt)))
+
+
 def validateService(facility, country = None, **kwargs):
     """Generic validation function.
 
-        >>> validate.validateService(country, **kwargs)
+        >>> validate.validateService(facility, country = None, workers = None,
+                                     chunksize = None, boundaries = None,
+                                     report = None, **kwargs)
+
+    When :data:`country` is a list of countries, or None for all the countries
+    whose harmonised data file is available, the files are validated in batch
+    against one schema compiled once (see :class:`FacilitySchema`), possibly in
+    parallel over :data:`workers` processes (0 for all available cores). A
+    summary dictionary is then returned that maps every country code onto its
+    validation report (or the exception raised), and no exception is raised on
+    invalid data.
+
+    With :data:`chunksize` set, files are validated by chunks of rows (see
+    :meth:`FacilitySchema.validateChunks`).
+
+    With :data:`boundaries` set to a local GeoJSON file of country boundaries (e.g.,
+    GISCO `CNTR_RG_01M_2020_4326.geojson`), facilities located outside their
+    country, or with swapped coordinates, are also reported.
+
+    When :data:`report` is set, the report(s) are also saved as a JSON file.
     """
     if not isinstance(facility, string_types):
         raise TypeError("Wrong type for input service - must be the facility type")
     elif not facility in FACILITIES.keys():
         raise IOError("Service type not recognised - must be a string in the list '%s'" % list(FACILITIES.keys()))
+    workers = kwargs.pop('workers', None)
+    try:
+        assert workers is None or (isinstance(workers, int) and workers >= 0)
+    except:
+        raise TypeError("Wrong WORKERS number - must be a positive integer")
+    dest = kwargs.pop('report', None)
+    chunksize = kwargs.pop('chunksize', None)
+    try:
+        assert chunksize is None or (isinstance(chunksize, int) and chunksize > 0)
+    except:
+        raise TypeError("Wrong CHUNKSIZE - must be a positive integer")
+    # the schema is compiled once, e.g. with the spatial index of the boundaries
+    schema = FacilitySchema(facility, boundaries = kwargs.pop('boundaries', None))
     if country is None:
-        country = list(COUNTRIES.keys())
+        country = [ctry for ctry in COUNTRIES.keys() if osp.exists(facilitySource(facility, ctry))]
     if not isinstance(country, string_types) and isinstance(country, Sequence):
+        summary = OrderedDict([(ctry, None) for ctry in country])
+        sources = OrderedDict()
         for ctry in country:
-            try:
-                validateService(country=ctry, **kwargs)
-            except:
-                continue
-        return
+            src = facilitySource(facility, ctry)
+            if osp.exists(src):     sources[ctry] = src
+            else:                   summary[ctry] = FileNotFoundError("Input file '%s' not found" % src)
+        if workers in (None, 1):
+            for (ctry, src) in sources.items():
+                try:
+                    summary[ctry] = validateFacilityData(facility, src, schema = schema,
+                                                         chunksize = chunksize)
+                except Exception as e:
+                    summary[ctry] = e
+        else:
+            with ProcessPoolExecutor(max_workers = workers or os.cpu_count(),
+                                     initializer = _initWorker, initargs = (schema,)) as pool:
+                for (ctry, res) in zip(sources.keys(), pool.map(partial(_validateWorker, chunksize = chunksize),
+                                                             sources.values())):
+                    summary[ctry] = res
+        for (ctry, res) in summary.items():
+            if isinstance(res, Exception):
+                logging.warning("\n! Validation failed for country '%s': %s !" % (ctry, res))
+            else:
+                logReport(res, sources.get(ctry))
+        if dest is not None:
+            with open(dest, 'w') as fp:
+                json.dump({'facility': facility,
+                           'report': {ctry: ({'error': str(res)} if isinstance(res, Exception) else res)
+                                      for (ctry, res) in summary.items()}},
+                          fp, indent = 4, default = str)
+        return summary
     elif not isinstance(country, string_types):
         raise TypeError('wrong type for input country code - must the ISO 2-letter string')
     elif not country in COUNTRIES.keys():
         raise IOError('country code not recognised - must a code of the %s area' % list(COUNTRIES.keys()))
-    cfg = FACMETADATA[facility]
-    fmt = 'csv'
     src = kwargs.pop('src', None)
     if src is None:
-        src = osp.join(cfg.get('path'), fmt, cfg.get('file') % (country, cfg.get('fmt',{})[fmt]))
+        src = facilitySource(facility, country)
         logging.warning("\n! Input data file '%s' will be controlled for validation" % src)
     try:
         assert osp.exists(src)
     except:
         raise FileNotFoundError("Input file '%s' not found" % src)
-    validate = validateFacilityData
-    try:
-        validate(facility, src)
-    except:
+    report = validateFacilityData(facility, src, schema = schema, chunksize = chunksize)
+    if dest is not None:
+        with open(dest, 'w') as fp:
+            json.dump({'facility': facility, 'country': country, 'src': src, 'report': report},
+                      fp, indent = 4, default = str)
+    if logReport(report, src) is True:
         raise IOError("Data error detected - See warning/error reports")
     else:
         print("! Data passed validation (see warning reports) !")
-    return
+    return report
+
+
+#%%
+#==============================================================================
+# Function duplicateService
+#==============================================================================
+
+def duplicateService(facility, src = None, **kwargs):
+    """Detect the near-duplicate facilities of a harmonised data file, by default
+    the file `all` gathering all countries, so that duplicates across borders are
+    also found.
+
+        >>> validate.duplicateService(facility, src = None, radius = RADIUS,
+                                      threshold = THRESHOLD, dest = None)
+
+    Returns the candidate pairs with their scores (see
+    :meth:`~pyeufacility.duplicates.findDuplicates`); when :data:`dest` is set,
+    they are also saved as a CSV file.
+    """
+    if not isinstance(facility, string_types):
+        raise TypeError("Wrong type for input service - must be the facility type")
+    elif not facility in FACILITIES.keys():
+        raise IOError("Service type not recognised - must be a string in the list '%s'" % list(FACILITIES.keys()))
+    radius, threshold = kwargs.pop('radius', None) or RADIUS, kwargs.pop('threshold', None) or THRESHOLD
+    try:
+        assert isinstance(radius, (int, float)) and radius > 0
+    except:
+        raise TypeError("Wrong RADIUS - must be a positive number (in metres)")
+    src = src or facilitySource(facility, 'all')
+    try:
+        assert osp.exists(src)
+    except:
+        raise FileNotFoundError("Input file '%s' not found" % src)
+    schema = FacilitySchema(facility)
+    # postcodes keep their leading zeros
+    postcode = schema.config.get('index', {}).get('postcode', {}).get('name', 'postcode')
+    data = schema.read(src, dtype = {schema.id: str, postcode: str})
+    pairs = findDuplicates(data, schema.config, radius = radius, threshold = threshold)
+    logging.warning("\n! %s candidate pair(s) of duplicates found in '%s' !" % (len(pairs), src))
+    dest = kwargs.pop('dest', None)
+    if dest is not None:
+        pairs.to_csv(dest, index = False, encoding = schema.encoding, sep = schema.sep)
+    return pairs
 
 
 #%%
@@ -208,6 +528,24 @@ def __main():
     parser.add_option("-c", "--cc", action="store", dest="country",
                       help="Country.",
                       default=None)
+    parser.add_option("-w", "--workers", action="store", dest="workers",
+                      type="int", help="number of worker processes (0: all cores).",
+                      default=None)
+    parser.add_option("-n", "--chunksize", action="store", dest="chunksize",
+                      type="int", help="number of rows per chunk when streaming.",
+                      default=None)
+    parser.add_option("-b", "--boundaries", action="store", dest="boundaries",
+                      help="GeoJSON file of country boundaries for spatial checks.",
+                      default=None)
+    parser.add_option("-r", "--report", action="store", dest="report",
+                      help="validation report file (JSON).",
+                      default=None)
+    parser.add_option("-d", "--duplicates", action="store", dest="duplicates",
+                      help="file (CSV) of the candidate pairs of duplicates in all countries.",
+                      default=None)
+    parser.add_option("-R", "--radius", action="store", dest="radius",
+                      type="float", help="search radius (in metres) of the duplicates.",
+                      default=None)
     (opts, args) = parser.parse_args()
 
     if not args in (None,()):
@@ -216,24 +554,36 @@ def __main():
     #    facility = list(FACILITIES.keys())[0]
 
     country = opts.country
-    if isinstance(coder, string_types):
+    if isinstance(country, string_types):
         if country.upper() == 'ALL':
+            # all the countries with available data
             country = None
         elif country.upper() in AREAS:
             country = AREAS.get(country)
     elif country is not None:
         parser.error("country name is required.")
-    if country in (None,[]) :
+    else:
         # parser.error("country name is required.")
         country = list(COUNTRIES.values())[0]
 
+    if opts.duplicates is not None:
+        duplicateService(facility, dest = opts.duplicates, radius = opts.radius)
+        return
+
     # run the generator
     try:
-        run(facility, country)
+        res = run(facility, country, workers = opts.workers, chunksize = opts.chunksize,
+                  boundaries = opts.boundaries, report = opts.report)
     except IOError:
         logging.warning('\n!!!  ERROR: data file not validated !!!')
     else:
-        logging.warning('\n!  OK: data file correctly validated !')
+        failed = [ctry for (ctry, r) in res.items()
+                  if isinstance(r, Exception) or any(e['level'] == 'error' for e in r)] \
+            if isinstance(res, Mapping) else []
+        if failed != []:
+            logging.warning("\n!!!  ERROR: data files not validated for countries '%s' !!!" % failed)
+        else:
+            logging.warning('\n!  OK: data file correctly validated !')
 
 if __name__ == '__main__':
     __main()
@@ -42,11 +42,11 @@ VERSION             = None
 EMAIL               = 'jacopo.grazzini@ec.europa.eu'
 AUTHOR              = 'Jacopo Grazzini'
 
-REQUIRES_PYTHON = '>=3.6.0'
+REQUIRES_PYTHON = '>=3.7.0'
 
 # packages required for this module to be executed
 REQUIRED = [
-    'numpy', 'pandas', 'geopandas', 'requests', 'chardet'
+    'numpy', 'pandas', 'scipy', 'geopandas', 'requests', 'chardet'
 ]
 # in Python standard library (see https://docs.python.org/3/library/):
 # 'collections', 'collections.abc', 'json', 'urllib', 'zipfile',
@@ -159,7 +159,7 @@ setup(
                                         # Trove classifiers
                                         'Programming Language :: Python',
                                         'Programming Language :: Python :: 3',
-                                        'Programming Language :: Python :: 3.6',
+                                        'Programming Language :: Python :: 3.7',
                                         'Topic :: Database'
                                         # full list: https://pypi.python.org/pypi?%3Aaction=list_classifiers
                                         ],
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark of the vectorised address splitters of :mod:`pyeufacility.address`
+against the former row-wise methods (`DataFrame.apply` with one `pd.Series`
+per row) of the AT, BG, CH and LT hooks.
+
+The addresses are rebuilt from the harmonised data of every country (e.g.,
+`data/healthcare/csv/AT.csv`) and replicated to about :data:`ROWS` rows (the addresses on which the row-wise
+methods raise are left out):
+
+    python tests/bench_address.py [rows]
+
+with the package installed (or `PYTHONPATH=.` set in `src/python`).
+"""
+
+from os import path as osp
+import sys
+import time
+
+import pandas as pd
+
+from pyeufacility import address
+from pyeufacility.hcs import AThcs, BGhcs, CHhcs, LThcs
+
+DATADIR = osp.join(osp.dirname(__file__), '..', '..', '..', 'data', 'healthcare', 'csv')
+ROWS = 20000
+
+
+def addresses(country, method, rows):
+    data = pd.read_csv(osp.join(DATADIR, '%s.csv' % country), dtype = str).fillna('')
+    street = (data['street'] + ' ' + data['house_number']).str.strip()
+    town = (data['postcode'] + ' ' + data['city']).str.strip()
+    s = {'AT': street + ', ' + town, 'BG': data['street'] + ', ' + data['house_number'],
+         'CH': street, 'LT': street + ', ' + town}[country]
+    # the row-wise methods raise on some addresses (e.g., empty ones)
+    s = s[[ok(method, a) for a in s]]
+    return pd.concat([s] * (rows // max(len(s), 1) + 1), ignore_index = True)[:rows]
+
+
+def ok(method, a):
+    try:
+        method(a)
+    except Exception:
+        return False
+    return True
+
+
+def timeit(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def rowwise(method):
+    return lambda s: s.to_frame('a').apply(lambda row: pd.Series(method(row['a'])), axis = 1)
+
+
+CASES = [('AT', AThcs.Prepare_data.split_address, address.splitStreetNumberPostcodeCity),
+         ('BG', BGhcs.Prepare_data.split_address, address.splitStreetCommaNumber),
+         ('CH', CHhcs.Prepare_data.split_adr, lambda s: address.splitStreetNumber(s, numeric = False)),
+         ('LT', LThcs.Prepare_data.split_Adr, address.splitTokensAddress)]
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else ROWS
+    for (country, method, vectorised) in CASES:
+        s = addresses(country, method, rows)
+        before, after = timeit(rowwise(method), s), timeit(vectorised, s)
+        print('%s  %6.2fs -> %5.2fs  (x%.0f)' % (country, before, after, before / after))
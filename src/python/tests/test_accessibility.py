@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Nearest facility and 2SFCA accessibility of :mod:`pyeufacility.accessibility`
+on a small synthetic grid: brute-force nearest distances, conservation of the
+supply, and identical results whatever the number of workers and chunks.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyeudatnat')
+
+from pyeufacility import accessibility
+from pyeufacility.duplicates import haversine
+
+NCELLS, NFAC = 400, 30
+
+
+@pytest.fixture
+def files(tmp_path):
+    rnd = np.random.default_rng(0)
+    # 20x20 grid of cells of about 5 km
+    lat, lon = np.meshgrid(56. + 0.045 * np.arange(20), 24. + 0.08 * np.arange(20), indexing = 'ij')
+    cells = pd.DataFrame({'cell': np.arange(NCELLS), 'lat': lat.ravel(), 'lon': lon.ravel(),
+                          'TOT_P': rnd.integers(0, 1000, NCELLS)})
+    cells.loc[7, 'lat'] = np.nan
+    facilities = pd.DataFrame({'id': ['F%s' % i for i in range(NFAC)],
+                               'lat': rnd.uniform(55.9, 57, NFAC), 'lon': rnd.uniform(23.8, 25.7, NFAC),
+                               'cap_beds': rnd.integers(0, 300, NFAC),
+                               'emergency': rnd.choice(['yes', 'no'], NFAC)})
+    files = {'grid': str(tmp_path / 'grid.csv'), 'facilities': str(tmp_path / 'hcs.csv')}
+    cells.to_csv(files['grid'], index = False)
+    facilities.to_csv(files['facilities'], index = False)
+    return files, cells, facilities
+
+
+def run(func, files, tmp_path, name, **kwargs):
+    dest = str(tmp_path / ('%s.csv' % name))
+    count = func('HCS', files['grid'], dest, facilities = files['facilities'], **kwargs)
+    res = pd.read_csv(dest)
+    assert count == len(res) == NCELLS
+    return res
+
+
+@pytest.mark.parametrize('filters', [{}, {'emergency': 'yes'}])
+def test_nearest_brute_force(files, tmp_path, filters):
+    files, cells, facilities = files
+    res = run(accessibility.nearestService, files, tmp_path, 'nearest', chunksize = 64, **filters)
+    fac = facilities[facilities.emergency == filters['emergency']] if filters else facilities
+    d = haversine(cells.lat.to_numpy()[:, None], cells.lon.to_numpy()[:, None],
+                  fac.lat.to_numpy()[None, :], fac.lon.to_numpy()[None, :])
+    located = cells.lat.notnull().to_numpy()
+    np.testing.assert_allclose(res['nearest_dist'][located], d[located].min(axis = 1), rtol = 1e-6)
+    assert (res['nearest_id'][located] == fac.id.to_numpy()[d[located].argmin(axis = 1)]).all()
+    assert res['nearest_id'][~located].isnull().all()
+
+
+@pytest.mark.parametrize('decay', ['binary', 'gaussian'])
+def test_access_conserved(files, tmp_path, decay):
+    files, cells, facilities = files
+    catchments = str(tmp_path / 'catchments.csv')
+    res = run(accessibility.accessService, files, tmp_path, 'access', chunksize = 64,
+              catchment = 20000., decay = decay, catchments = catchments)
+    ratios = pd.read_csv(catchments)
+    # every bed is shared out among the population of its catchment
+    supplied = ratios.loc[ratios.demand > 0, 'cap_beds'].sum()
+    assert supplied > 0
+    np.testing.assert_allclose((res['access'] * cells['TOT_P']).sum(), supplied, rtol = 1e-9)
+
+
+@pytest.mark.parametrize('func, kwargs', [(accessibility.nearestService, {}),
+                                          (accessibility.accessService, {'catchment': 20000.})])
+def test_workers_chunks(files, tmp_path, func, kwargs):
+    files, _, _ = files
+    serial = run(func, files, tmp_path, 'serial', chunksize = 64, workers = 1, **kwargs)
+    pooled = run(func, files, tmp_path, 'pooled', chunksize = 64, workers = 3, **kwargs)
+    pd.testing.assert_frame_equal(serial, pooled)
+    for chunksize in [7, NCELLS]:
+        other = run(func, files, tmp_path, 'chunks', chunksize = chunksize, workers = 2, **kwargs)
+        pd.testing.assert_frame_equal(serial, other, check_exact = False, rtol = 1e-12)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Equivalence of the vectorised address splitters of :mod:`pyeufacility.address`
+with the former row-wise methods of the AT, BG, CH and LT hooks, on fuzzed
+address strings (strings on which the row-wise methods raise are skipped).
+"""
+
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyeufacility import address
+from pyeufacility.hcs import AThcs, BGhcs, CHhcs, LThcs
+
+TOKENS = ['Hauptstraße', 'ul.', 'Vilniaus g.', 'Weg', 'Rue', '12', '3a', '7', '1010', 'LT-01100',
+          'Wien', 'Sofia', 'A', 'B', '9', ',', ',', ' ', '  ', '']
+SIZE = 5000
+
+
+def fuzz(size = SIZE, seed = 0):
+    rnd = random.Random(seed)
+    return [''.join(rnd.choice(TOKENS) + rnd.choice([' ', '', ' ', ', '])
+                    for _ in range(rnd.randint(0, 6))) for _ in range(size)]
+
+
+def same(a, b):
+    return (pd.isna(a) and pd.isna(b)) if (pd.isna(a) or pd.isna(b)) else a == b
+
+
+def compare(rowwise, vectorised):
+    """Compare the outputs of the row-wise method on the strings it does not
+    raise on with the rows of the vectorised output.
+    """
+    strings, expected = [], []
+    for s in fuzz():
+        try:
+            expected.append(tuple(rowwise(s)))
+        except Exception:
+            continue
+        strings.append(s)
+    assert len(strings) > SIZE // 2
+    result = vectorised(pd.Series(strings))
+    result = list(result.itertuples(index = False, name = None)) if isinstance(result, pd.DataFrame) \
+        else list(zip(*result))
+    mismatches = [(s, e, r) for (s, e, r) in zip(strings, expected, result)
+                  if not all(same(x, y) for (x, y) in zip(e, r))]
+    assert mismatches == []
+
+
+def test_AT_split_address():
+    compare(AThcs.Prepare_data.split_address, address.splitStreetNumberPostcodeCity)
+
+
+def test_BG_split_address():
+    compare(BGhcs.Prepare_data.split_address, address.splitStreetCommaNumber)
+
+
+def test_CH_split_adr():
+    compare(CHhcs.Prepare_data.split_adr, lambda s: address.splitStreetNumber(s, numeric = False))
+
+
+def test_CH_split_ort():
+    compare(CHhcs.Prepare_data.split_ort, address.splitPostcodeCity)
+
+
+def test_LT_split_Adr():
+    compare(LThcs.Prepare_data.split_Adr, address.splitTokensAddress)
+
+
+def test_index_preserved():
+    s = pd.Series(['Hauptstraße 12, 1010 Wien', np.nan], index = [5, 3])
+    df = address.splitStreetNumberPostcodeCity(s)
+    assert df.index.tolist() == [5, 3]
+    assert df.loc[5].tolist() == ['Hauptstraße', '12', '1010', 'Wien']
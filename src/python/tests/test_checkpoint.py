@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Checkpoints of :mod:`pyeufacility.checkpoint`: the state restored is the last
+one preceding the stage resumed from, and states saved with other sources or
+options are ignored.
+"""
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyeudatnat')
+
+from pyeufacility.checkpoint import Checkpoint, STAGES
+
+
+class Facility(object):
+    def __init__(self, stage = None):
+        self.data = pd.DataFrame({'stage': [stage]})
+        self.cols, self.idx = [stage], {'stage': stage}
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    checkpoint = Checkpoint('HCS', 'XX', dest = str(tmp_path), options = {'gc': 'GISCO'})
+    for stage in STAGES:
+        checkpoint.dump(stage, Facility(stage))
+    return checkpoint
+
+
+@pytest.mark.parametrize('before, expected', [(None, 'format'), (True, 'format'), ('save', 'format'),
+                                              ('format', 'locate'), ('locate', 'prepare'),
+                                              ('prepare', 'load'), ('load', None)])
+def test_restore_before(checkpoint, before, expected):
+    natFacility = Facility()
+    assert checkpoint.restore(natFacility, before = before) == expected
+    assert natFacility.idx == {'stage': expected}
+    if expected is not None:
+        assert natFacility.data['stage'].tolist() == [expected]
+
+
+def test_restore_missing(checkpoint):
+    checkpoint.clear()
+    assert checkpoint.restore(Facility(), before = 'format') is None
+
+
+def test_restore_skips_corrupted(checkpoint):
+    with open(checkpoint.file('locate'), 'wb') as fp:
+        fp.write(b'corrupted')
+    assert checkpoint.restore(Facility(), before = 'format') == 'prepare'
+
+
+def test_other_options(checkpoint):
+    other = Checkpoint('HCS', 'XX', dest = checkpoint.dest, options = {'gc': 'Bing'})
+    assert other.key != checkpoint.key
+    assert other.restore(Facility()) is None
+    same = Checkpoint('HCS', 'XX', dest = checkpoint.dest, options = {'gc': 'GISCO'})
+    assert same.restore(Facility()) == 'format'
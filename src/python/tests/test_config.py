@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Memoisation of the classes generated by :meth:`pyeufacility.config.facilityFactory`.
+"""
+
+import pytest
+
+pytest.importorskip('pyeudatnat')
+
+from pyeufacility import config
+
+
+def test_memoised():
+    Facility = config.facilityFactory('HCS', country = 'AT')
+    assert config.facilityFactory('HCS', country = 'AT') is Facility
+    assert config.facilityFactory('HCS', country = 'BG') is not Facility
+    assert config.facilityFactory('HCS', country = 'AT', cache = False) is not Facility
+
+
+def test_not_serialisable():
+    size = len(config.FACREGISTRY)
+    for _ in range(3):
+        config.facilityFactory('HCS', country = 'AT', coder = {'GISCO': lambda x: x})
+    assert len(config.FACREGISTRY) == size
+
+
+def test_hash_strict():
+    assert config.metadataHash({'a': 1}, strict = True) == config.metadataHash({'a': 1})
+    with pytest.raises(TypeError):
+        config.metadataHash({'a': object()}, strict = True)
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Spatial blocking of :mod:`pyeufacility.duplicates` against the brute-force
+comparison of all the pairs, at high latitudes and away from longitude 0.
+"""
+
+import numpy as np
+import pytest
+
+from pyeufacility.duplicates import nearPairs, haversine
+
+
+def bruteForce(lat, lon, radius):
+    i, j = np.triu_indices(len(lat), k = 1)
+    dist = haversine(lat[i], lon[i], lat[j], lon[j])
+    keep = dist <= radius
+    return set(zip(i[keep].tolist(), j[keep].tolist()))
+
+
+@pytest.mark.parametrize('lat0, lon0', [(60., 25.), (45., -120.), (70., 179.99), (-35., 150.)])
+def test_pairs_brute_force(lat0, lon0, radius = 250.):
+    rnd = np.random.default_rng(0)
+    # dense clusters, so that many pairs lie close to the search radius
+    lat = lat0 + rnd.uniform(-0.02, 0.02, 2000)
+    lon = lon0 + rnd.uniform(-0.04, 0.04, 2000)
+    lon = (lon + 180) % 360 - 180
+    lat[::97] = np.nan
+    i, j, dist = nearPairs(lat, lon, radius = radius)
+    assert set(zip(i.tolist(), j.tolist())) == bruteForce(lat, lon, radius)
+    assert np.all(i < j) and np.all(dist <= radius)
+
+
+def test_pairs_none():
+    i, j, dist = nearPairs([50., np.nan], [10., 10.])
+    assert len(i) == len(j) == len(dist) == 0
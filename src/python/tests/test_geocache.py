@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Persistent geocoding cache of :mod:`pyeufacility.geocache`: expiry, eviction of
+the least recently used results, statistics, and the split of the facilities
+between the cache and the geocoder in :meth:`cachedLocate`.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pyeufacility import geocache
+from pyeufacility.geocache import GeocodeCache, cachedLocate, normaliseAddress
+
+
+class Clock(object):
+    def __init__(self, now = 1000.):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(geocache.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path):
+    with GeocodeCache(str(tmp_path / 'geocodes.sqlite'), ttl = 100, maxsize = 3) as cache:
+        yield cache
+
+
+def test_normalise():
+    assert normaliseAddress('Brīvības iela 19,  RĪGA, LV-1010') == 'brivibas iela 19 riga lv 1010'
+    assert normaliseAddress(['Main St', None, '', 12]) == 'main st 12'
+
+
+def test_get_put(cache, clock):
+    cache.put('Brīvības iela 19, Rīga', 'GISCO', 'lv', {'lat': 56.95, 'lon': 24.11})
+    # trivial variants of the address share the key, the engine and country are part of it
+    assert cache.get('BRIVIBAS IELA 19 RIGA', 'gisco', 'LV') == {'lat': 56.95, 'lon': 24.11}
+    assert cache.get('Brīvības iela 19, Rīga', 'Bing', 'LV') is None
+    assert cache.get('Brīvības iela 19, Rīga', 'GISCO', 'EE') is None
+    assert cache.get('', 'GISCO', 'LV') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['puts'], stats['size']) == (1, 2, 1, 1)
+    assert stats['hit_ratio'] == pytest.approx(1 / 3)
+
+
+def test_ttl(cache, clock):
+    cache.put('a', 'gisco', 'LV', {'lat': 1})
+    clock.now += 100
+    assert cache.get('a', 'gisco', 'LV') == {'lat': 1}
+    clock.now += 1
+    assert cache.get('a', 'gisco', 'LV') is None
+    assert cache.stats()['expired'] == 1 and len(cache) == 0
+
+
+def test_lru_eviction(cache, clock):
+    for (n, address) in enumerate('abc'):
+        clock.now += 1
+        cache.put(address, 'gisco', 'LV', {'n': n})
+    clock.now += 1
+    assert cache.get('a', 'gisco', 'LV') == {'n': 0}      # a is now the most recent
+    clock.now += 1
+    cache.put('d', 'gisco', 'LV', {'n': 3})
+    assert len(cache) == 3 and cache.stats()['evicted'] == 1
+    assert cache.get('b', 'gisco', 'LV') is None          # least recently used
+    assert [cache.get(a, 'gisco', 'LV')['n'] for a in 'acd'] == [0, 2, 3]
+
+
+def test_persistent(tmp_path):
+    src = str(tmp_path / 'geocodes.sqlite')
+    with GeocodeCache(src) as cache:
+        cache.put('a', 'gisco', 'LV', {'lat': 1})
+    with GeocodeCache(src) as cache:
+        assert cache.get('a', 'gisco', 'LV') == {'lat': 1}
+
+
+#%%
+
+class Facility(object):
+    cc = 'LV'
+
+    def __init__(self, data):
+        self.data = data
+        self.idx = {'street': 'street', 'city': 'city'}
+
+
+class Locate(object):
+    """Stub of a `locate_data` method: geocodes the facilities with no
+    coordinates (counting them), and adds a quality flag and a geometry (not
+    cached) to all.
+    """
+
+    def __init__(self, reset = False):
+        self.geocoded, self.calls, self.reset = [], 0, reset
+
+    def __call__(self, facility, **kwargs):
+        self.calls += 1
+        data = facility.data
+        if not ('lat' in data.columns and 'lon' in data.columns):
+            self.geocoded.extend(data['street'].tolist())
+            data['lat'] = [56. + len(s) for s in data['street']]
+            data['lon'] = [24. + len(c) for c in data['city']]
+            data['geo_qual'] = 1
+            data.loc[data['street'] == 'unknown', ['lat', 'lon']] = [pd.NA, np.nan]
+        data['geometry'] = [('POINT', x, y) for (x, y) in zip(data['lon'], data['lat'])]
+        if self.reset is True:
+            facility.data = data.reset_index(drop = True)
+        facility.idx.update({'lat': 'lat', 'lon': 'lon'})
+        return 'located'
+
+
+def facilities(streets, index = None):
+    return pd.DataFrame({'street': streets, 'city': ['Rīga'] * len(streets)}, index = index)
+
+
+@pytest.mark.parametrize('reset', [False, True])
+def test_cached_locate(cache, reset):
+    locate = Locate(reset = reset)
+    locate_data = cachedLocate(cache, locate)
+    index = ['f%s' % i for i in range(4)]
+    first = Facility(facilities(['a', 'bb', 'unknown', 'ccc'], index = index))
+    assert locate_data(first, gc = 'GISCO') == 'located'
+    assert locate.geocoded == ['a', 'bb', 'unknown', 'ccc']
+    # the missing locations are not cached
+    assert len(cache) == 3
+    # hits and misses are merged back on the index of the data, in order
+    second = Facility(facilities(['ccc', 'dddd', 'a', 'unknown'], index = index[::-1]))
+    assert locate_data(second, gc = 'GISCO') == 'located'
+    assert locate.geocoded[4:] == ['dddd', 'unknown']
+    data = second.data
+    assert data.index.tolist() == index[::-1]
+    assert data['lat'].tolist()[:3] == [59., 60., 57.]
+    assert data['lon'].tolist()[:3] == [28.] * 3
+    assert data[['lat', 'lon']].iloc[3].isna().all()
+    assert data['geo_qual'].tolist() == [1] * 4
+    # geometries are built for the facilities located from the cache too
+    assert data['geometry'].tolist()[:3] == [('POINT', 28., 59.), ('POINT', 28., 60.), ('POINT', 28., 57.)]
+    assert second.idx['lat'] == 'lat' and second.idx['lon'] == 'lon'
+
+
+def test_cached_locate_all_hits(cache):
+    locate = Locate()
+    locate_data = cachedLocate(cache, locate)
+    locate_data(Facility(facilities(['a', 'bb'])), gc = 'GISCO')
+    facility = Facility(facilities(['bb', 'a']))
+    # located from the cache, then passed through locate (not geocoded)
+    assert locate_data(facility, gc = 'GISCO') == 'located'
+    assert locate.geocoded == ['a', 'bb'] and locate.calls == 2
+    assert facility.data['lat'].tolist() == [58., 57.]
+    assert facility.data['geometry'].tolist() == [('POINT', 28., 58.), ('POINT', 28., 57.)]
+
+
+def test_cached_locate_passthrough(cache):
+    locate = Locate()
+    locate_data = cachedLocate(cache, locate)
+    located = facilities(['a']).assign(lat = [50.], lon = [10.])
+    facility = Facility(located)
+    assert locate_data(facility, gc = 'GISCO') == 'located'
+    assert locate.geocoded == [] and len(cache) == 0
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Point-in-polygon tests, grid location, border distances and `EPSG:3035`
+projection of :mod:`pyeufacility.geometry`.
+"""
+
+import numpy as np
+import pytest
+
+from pyeufacility.geometry import PolygonIndex, toLAEA, fromLAEA
+
+
+def square(x0, y0, size):
+    return np.array([[x0, y0], [x0 + size, y0], [x0 + size, y0 + size], [x0, y0 + size]], dtype = float)
+
+
+@pytest.fixture
+def index():
+    # A: square with a hole and an island in the hole; B: two squares, one
+    # of them next to A
+    return PolygonIndex({'A': [square(0, 0, 4), square(1, 1, 2), square(1.5, 1.5, 1)],
+                         'B': [square(4, 0, 2), square(10, 10, 1)],
+                         'C': [square(0, 0, 1)[:2]]})     # degenerate: ignored
+
+
+def test_even_odd(index):
+    lon = np.array([0.5, 1.2, 2.0, 3.5, 5.0, 10.5, np.nan, 0.5])
+    lat = np.array([0.5, 1.2, 2.0, 3.5, 1.0, 10.5, 1.0, 0.5])
+    codes = ['A', 'A', 'A', 'A', 'A', 'B', 'A', 'Z']
+    res = index.contains(codes, lon, lat)
+    np.testing.assert_array_equal(res[:6], [1, 0, 1, 1, 0, 1])
+    assert np.isnan(res[6]) and np.isnan(res[7])
+    assert 'A' in index and 'C' not in index
+
+
+def test_locate(index):
+    lon = np.array([0.5, 1.2, 2.0, 5.0, 10.5, 20., np.nan, 3.9])
+    lat = np.array([0.5, 1.2, 2.0, 1.0, 10.5, 20., 1.0, 0.1])
+    codes = index.locate(lon, lat)
+    assert codes.tolist() == ['A', None, 'A', 'B', 'B', None, None, 'A']
+    assert index.locate([], []).tolist() == []
+
+
+def test_locate_brute_force(index):
+    rnd = np.random.default_rng(0)
+    lon, lat = rnd.uniform(-1, 12, 2000), rnd.uniform(-1, 12, 2000)
+    codes = index.locate(lon, lat)
+    for code in ['A', 'B']:
+        inside = index.contains([code] * len(lon), lon, lat) == 1
+        np.testing.assert_array_equal(codes == code, inside)
+
+
+def test_distance(index):
+    lon, lat = np.array([-0.5, 2.0, 5.0, 2.0, 3.9]), np.array([2.0, 2.0, 1.0, 9.0, 0.1])
+    res = index.distance(['A', 'A', 'A', 'A', 'A'], lon, lat)
+    np.testing.assert_allclose(res, [0.5, 0.5, 1.0, 5.0, 0.1])
+    res = index.distance(['A', 'A', 'A', 'A', 'A'], lon, lat, maxdist = 0.6)
+    np.testing.assert_allclose(res, [0.5, 0.5, np.inf, np.inf, 0.1])
+    assert np.isnan(index.distance(['Z', 'A'], [0., np.nan], [0., 0.])).all()
+
+
+def test_distance_brute_force(index):
+    rnd = np.random.default_rng(1)
+    lon, lat = rnd.uniform(-1, 12, 500), rnd.uniform(-1, 12, 500)
+    e = index.segments['B']
+    expected = []
+    for (x, y) in zip(lon, lat):
+        dx, dy = e[:, 2] - e[:, 0], e[:, 3] - e[:, 1]
+        t = np.clip(((x - e[:, 0]) * dx + (y - e[:, 1]) * dy) / (dx**2 + dy**2), 0, 1)
+        expected.append(np.hypot(e[:, 0] + t * dx - x, e[:, 1] + t * dy - y).min())
+    expected = np.array(expected)
+    np.testing.assert_allclose(index.distance(['B'] * len(lon), lon, lat), expected)
+    res = index.distance(['B'] * len(lon), lon, lat, maxdist = 0.3)
+    np.testing.assert_allclose(res, np.where(expected <= 0.3, expected, np.inf))
+
+
+def test_laea():
+    # EPSG Guidance Note 7-2 example of the ETRS89-LAEA projection
+    x, y = toLAEA(50., 5.)
+    assert abs(x - 3962799.45) < 0.01 and abs(y - 2999718.85) < 0.01
+    x, y = toLAEA(52., 10.)
+    assert abs(x - 4321000.) < 1e-6 and abs(y - 3210000.) < 1e-6
+    rnd = np.random.default_rng(0)
+    lat, lon = rnd.uniform(27, 72, 1000), rnd.uniform(-30, 45, 1000)
+    lat_, lon_ = fromLAEA(*toLAEA(lat, lon))
+    np.testing.assert_allclose(lat_, lat, atol = 1e-7)
+    np.testing.assert_allclose(lon_, lon, atol = 1e-7)
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Incremental runs of :mod:`pyeufacility.manifest`: a country is up to date only
+when none of its input, metadata, hook module and configuration changed and its
+outputs still exist.
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip('pyeudatnat')
+
+from pyeufacility.manifest import BuildManifest
+
+SOURCES = ['input', 'metadata', 'module', 'config']
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    files = {k: str(tmp_path / ('%s.txt' % k)) for k in SOURCES}
+    for (k, f) in files.items():
+        with open(f, 'w') as fp:
+            fp.write(k)
+    output = str(tmp_path / 'XX.csv')
+    with open(output, 'w') as fp:
+        fp.write('id\n')
+    m = BuildManifest('HCS', src = str(tmp_path / 'manifest.json'))
+    m.sources = lambda country: files
+    m.outputs = lambda country: [output,]
+    m.update('XX')
+    return m, files, output
+
+
+def test_uptodate(manifest):
+    m, _, _ = manifest
+    assert m.uptodate('XX')
+    assert not m.uptodate('YY')
+
+
+@pytest.mark.parametrize('source', SOURCES)
+def test_source_changed(manifest, source):
+    m, files, _ = manifest
+    with open(files[source], 'a') as fp:
+        fp.write('changed')
+    assert not m.uptodate('XX')
+
+
+def test_output_removed(manifest):
+    m, _, output = manifest
+    os.remove(output)
+    assert not m.uptodate('XX')
+
+
+def test_no_local_input(manifest):
+    m, files, _ = manifest
+    files['input'] = None
+    m.update('XX')
+    assert not m.uptodate('XX')
+
+
+def test_dump(manifest):
+    m, _, _ = manifest
+    m.dump()
+    reloaded = BuildManifest('HCS', src = m.src)
+    reloaded.sources, reloaded.outputs = m.sources, m.outputs
+    assert reloaded.uptodate('XX')
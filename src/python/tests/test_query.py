@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Queries of :class:`pyeufacility.query.FacilityIndex` against the brute-force
+haversine distances, and cache of the KD-trees of the filtered subsets.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyeudatnat')
+
+from pyeufacility import query
+from pyeufacility.duplicates import haversine
+
+NFAC = 500
+
+
+@pytest.fixture
+def index():
+    rnd = np.random.default_rng(0)
+    lon = rnd.uniform(170, 190, NFAC)
+    data = pd.DataFrame({'lat': rnd.uniform(40, 70, NFAC),
+                         'lon': np.where(lon > 180, lon - 360, lon),   # across the antimeridian
+                         'emergency': rnd.choice(['yes', 'no'], NFAC),
+                         'cap_beds': rnd.integers(0, 500, NFAC)})
+    data.loc[::50, 'lat'] = np.nan
+    return query.FacilityIndex(data)
+
+
+def distances(index, lat, lon, mask):
+    d = haversine(lat, lon, index.lat, index.lon)
+    return np.where(mask & index.located, d, np.inf)
+
+
+@pytest.mark.parametrize('filters', [{}, {'emergency': 'yes', 'min_cap_beds': 100},
+                                     {'emergency': ['yes', 'no'], 'max_cap_beds': 10}])
+def test_nearest(index, filters):
+    rnd = np.random.default_rng(1)
+    lat, lon = rnd.uniform(40, 70, 50), rnd.uniform(-180, 180, 50)
+    dist, pos = index.nearest(lat, lon, k = 3, **filters)
+    mask = index.select(**filters)
+    for n in range(len(lat)):
+        d = distances(index, lat[n], lon[n], mask)
+        o = np.argsort(d, kind = 'stable')[:3]
+        np.testing.assert_allclose(dist[n], d[o], rtol = 1e-6)
+        assert np.all(mask[pos[n][pos[n] >= 0]])
+
+
+def test_nearest_missing(index):
+    dist, pos = index.nearest([np.nan, 50.], [10., 179.], k = 1, min_cap_beds = 1000)
+    assert np.isinf(dist).all() and (pos == -1).all()
+
+
+@pytest.mark.parametrize('filters', [{}, {'emergency': 'no'}])
+def test_within(index, filters):
+    rnd = np.random.default_rng(2)
+    lat, lon = rnd.uniform(40, 70, 50), rnd.uniform(170, 190, 50)
+    dist, pos = index.within(lat, lon, 200000., **filters)
+    mask = index.select(**filters)
+    for n in range(len(lat)):
+        d = distances(index, lat[n], lon[n], mask)
+        expected = np.flatnonzero(d <= 200000.)
+        assert set(pos[n].tolist()) == set(expected.tolist())
+        np.testing.assert_allclose(dist[n], np.sort(d[expected]), rtol = 1e-6)
+
+
+@pytest.mark.parametrize('box', [(172., 45., 178., 60.), (178., 45., -175., 60.)])
+def test_bbox(index, box):
+    lonmin, latmin, lonmax, latmax = box
+    inlon = (index.lon >= lonmin) & (index.lon <= lonmax) if lonmin <= lonmax \
+        else (index.lon >= lonmin) | (index.lon <= lonmax)
+    inbox = index.located & inlon & (index.lat >= latmin) & (index.lat <= latmax)
+    np.testing.assert_array_equal(index.bbox(*box), np.flatnonzero(inbox))
+    np.testing.assert_array_equal(index.bbox(*box, emergency = 'yes'),
+                                  np.flatnonzero(inbox & index.select(emergency = 'yes')))
+
+
+def test_tree_cache(index, monkeypatch):
+    monkeypatch.setattr(query, 'CACHESIZE', 2)
+    tree = index.tree(emergency = 'yes')
+    assert index.tree(emergency = 'yes') is tree
+    assert index.tree(emergency = ['no', 'yes']) is index.tree(emergency = ('yes', 'no'))
+    index.tree(min_cap_beds = 10)
+    assert len(index.trees) == 2
+    # the oldest tree is evicted
+    assert index.tree(emergency = 'yes') is not tree
+    assert len(index.trees) == 2
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Reports of :mod:`pyeufacility.validate`: the same file validated in one piece,
+by chunks of rows and in batch over worker processes gives the same report,
+including the duplicated identifiers spread over several chunks.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyeudatnat')
+
+from pyeufacility import validate
+from pyeufacility.geometry import PolygonIndex
+
+NROWS = 23
+
+
+def frame():
+    rnd = np.random.default_rng(0)
+    ids = np.arange(NROWS).astype(str)
+    ids[[7, 15, 22]] = ids[0]      # duplicates in several chunks
+    ids[12] = ids[3]
+    df = pd.DataFrame({'id': ids,
+                       'hospital_name': ['H%s' % i for i in range(NROWS)],
+                       'lat': rnd.uniform(56, 57.5, NROWS),
+                       'lon': rnd.uniform(22, 26, NROWS),
+                       'geo_qual': rnd.choice([1, 2, 3, 5], NROWS),
+                       'cc': 'LV',
+                       'cap_beds': rnd.integers(0, 500, NROWS).astype(float),
+                       'emergency': rnd.choice(['yes', 'no', 'maybe'], NROWS),
+                       'public_private': rnd.choice(['public', 'private', None], NROWS),
+                       'unknown': 0})
+    df.loc[[2, 18], 'lat'] = [95., np.nan]                  # out of range
+    df.loc[5, ['lat', 'lon']] = df.loc[5, ['lon', 'lat']].to_numpy()   # swapped
+    df.loc[9, ['lat', 'lon']] = [48., 2.]                   # outside
+    df.loc[[1, 20], 'cap_beds'] = np.nan
+    df.loc[11, 'cc'] = 'XX'
+    return df
+
+
+BOUNDARIES = PolygonIndex({'LV': [np.array([[21., 55.6], [28.3, 55.6], [28.3, 58.1], [21., 58.1]])]})
+
+
+@pytest.fixture
+def sources(tmp_path):
+    sources = {}
+    for ctry in ['AT', 'LV']:
+        sources[ctry] = str(tmp_path / ('%s.csv' % ctry))
+        frame().to_csv(sources[ctry], index = False)
+    return sources
+
+
+def test_chunks(sources):
+    schema = validate.FacilitySchema('HCS', boundaries = BOUNDARIES)
+    report = validate.validateFacilityData('HCS', sources['LV'], schema = schema)
+    assert {e['rule'] for e in report} >= {'unknown', 'missing', 'values', 'range', 'swapped',
+                                           'outside', 'unique'}
+    assert [e for e in report if e['rule'] == 'unique'][0]['count'] == 6
+    for chunksize in [1, 4, 7, NROWS]:
+        assert validate.validateFacilityData('HCS', sources['LV'], schema = schema,
+                                             chunksize = chunksize) == report
+    assert schema.validate(frame()) == report
+
+
+@pytest.mark.parametrize('chunksize', [None, 5])
+def test_workers(sources, monkeypatch, chunksize):
+    monkeypatch.setattr(validate, 'facilitySource', lambda facility, ctry, fmt = 'csv': sources[ctry])
+    serial = validate.validateService('HCS', country = ['AT', 'LV'], workers = 1,
+                                      chunksize = chunksize, boundaries = BOUNDARIES)
+    pooled = validate.validateService('HCS', country = ['AT', 'LV'], workers = 2,
+                                      chunksize = chunksize, boundaries = BOUNDARIES)
+    expected = validate.validateFacilityData('HCS', sources['LV'],
+                                             schema = validate.FacilitySchema('HCS', boundaries = BOUNDARIES))
+    assert serial == pooled == {'AT': expected, 'LV': expected}